@@ -0,0 +1,197 @@
+"""Serveur local compatible OpenAI qui renvoie des réponses préenregistrées
+
+Sert /v1/chat/completions et /v1/embeddings sans réseau ni coût : les benchmarks
+mesurent ainsi le temps passé dans le framework, indépendamment de la latence du LLM.
+
+Usage autonome :
+    python -m benchmarks.fake_openai_server --port 8765 --latency 0.05
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+EMBEDDING_DIMENSIONS = 1536
+
+CANNED_META_RESULT = """## ANALYSE DE LA PROBLÉMATIQUE
+Campagne de sensibilisation à fort enjeu RSE, cible B2B et particuliers.
+
+## ORDRE D'EXÉCUTION RECOMMANDÉ
+1. **Clara (Chercheuse web)** : veille et données de contexte
+2. **Julien (Analyste de contexte)** : adaptation RSE
+3. **Sophie (Rédactrice LinkedIn)** : rédaction des posts
+
+## TÂCHE POUR CLARA - DÉTECTIVE DIGITALE
+Identifier les tendances et 3 campagnes de référence.
+
+## TÂCHE POUR JULIEN - ANALYSTE STRATÉGIQUE RSE
+Adapter les enseignements aux valeurs de l'entreprise.
+
+## TÂCHE POUR SOPHIE - PLUME SOLIDAIRE
+Rédiger 3 posts LinkedIn et 2 posts Instagram.
+"""
+
+CANNED_JSON_PLAN = {
+    "execution_type": "async",
+    "execution_order": ["clara_detective_digitale", "julien_analyste_strategique", "sophie_plume_solidaire"],
+    "tasks": {
+        "clara_detective_digitale": {
+            "objective": "Veille", "instructions": "Rechercher les tendances",
+            "expected_output": "Synthèse de veille", "dependencies": [], "can_run_parallel": True, "priority": 1
+        },
+        "julien_analyste_strategique": {
+            "objective": "Analyse", "instructions": "Analyser le contexte RSE",
+            "expected_output": "Analyse RSE", "dependencies": [], "can_run_parallel": True, "priority": 1
+        },
+        "sophie_plume_solidaire": {
+            "objective": "Rédaction", "instructions": "Rédiger les posts",
+            "expected_output": "Posts LinkedIn", "dependencies": ["clara_detective_digitale", "julien_analyste_strategique"],
+            "can_run_parallel": False, "priority": 2
+        },
+    },
+    "crew_configuration": {"process": "async", "verbose": True},
+}
+
+CANNED_AGENT_RESULT = """**Post LinkedIn 1**
+Ce mois-ci, nous nous engageons aux côtés de celles et ceux qui luttent. #OctobreRose
+---
+**Post LinkedIn 2**
+Le dépistage sauve des vies : nos équipes se mobilisent.
+---
+**Post Instagram 1**
+Un ruban rose dans chaque atelier 🎀
+"""
+
+
+def canned_completion(messages) -> str:
+    """Choisit une réponse préenregistrée selon le prompt (format ReAct de CrewAI)"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages).lower()
+    if "plan json" in prompt or "execution_order" in prompt:
+        answer = json.dumps(CANNED_JSON_PLAN, ensure_ascii=False)
+    elif "ordre d'exécution recommandé" in prompt:
+        answer = CANNED_META_RESULT
+    else:
+        answer = CANNED_AGENT_RESULT
+    return f"Thought: J'ai toutes les informations nécessaires.\nFinal Answer: {answer}"
+
+
+def fake_embedding(text: str) -> list:
+    """Vecteur déterministe dérivé du hash du texte"""
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    return [((seed[i % len(seed)] + i) % 255) / 255.0 - 0.5 for i in range(EMBEDDING_DIMENSIONS)]
+
+
+class FakeOpenAIStats:
+    """Compteurs du serveur : le temps passé ici est du temps « LLM », pas du framework"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.server_seconds = 0.0
+
+    def record(self, endpoint: str, seconds: float):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.server_seconds += seconds
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {"requests": dict(self.requests), "server_seconds": round(self.server_seconds, 4)}
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.server_seconds = 0.0
+
+
+def _make_handler(stats: FakeOpenAIStats, latency: float):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload: Dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json({"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+            else:
+                self._send_json({"error": {"message": "not found"}}, status=404)
+
+        def do_POST(self):
+            started_at = time.perf_counter()
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if latency:
+                time.sleep(latency)
+
+            if self.path.endswith("/chat/completions"):
+                endpoint = "chat.completions"
+                content = canned_completion(request.get("messages", []))
+                prompt_tokens = sum(len(str(message.get("content", ""))) for message in request.get("messages", [])) // 4
+                payload = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "gpt-4o-mini"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4},
+                }
+            elif self.path.endswith("/embeddings"):
+                endpoint = "embeddings"
+                inputs = request.get("input", [])
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                payload = {
+                    "object": "list",
+                    "model": request.get("model", "text-embedding-3-small"),
+                    "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(str(text))}
+                             for i, text in enumerate(inputs)],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                }
+            else:
+                self._send_json({"error": {"message": f"endpoint non simulé : {self.path}"}}, status=404)
+                return
+
+            self._send_json(payload)
+            stats.record(endpoint, time.perf_counter() - started_at)
+
+    return FakeOpenAIHandler
+
+
+def start_fake_openai_server(port: int = 0, latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str, FakeOpenAIStats]:
+    """Démarre le serveur dans un thread de fond
+
+    Returns:
+        Tuple: (serveur, URL de base à passer en OPENAI_BASE_URL, compteurs)
+    """
+    stats = FakeOpenAIStats()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(stats, latency))
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", stats
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Serveur OpenAI factice pour les benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence simulée par requête (secondes)")
+    args = parser.parse_args(argv)
+
+    server, base_url, _ = start_fake_openai_server(args.port, args.latency)
+    print(f"🤖 Serveur OpenAI factice sur {base_url} (Ctrl+C pour arrêter)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
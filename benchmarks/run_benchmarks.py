@@ -0,0 +1,291 @@
+"""Benchmarks hors ligne du coût d'orchestration (sans appel réseau réel)
+
+Toutes les mesures tournent dans un espace de travail temporaire, face au serveur
+OpenAI factice : le rapport JSON distingue le temps du framework de la latence LLM.
+
+Usage :
+    python -m benchmarks.run_benchmarks --repeats 20 --output rapport.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/reports/reference.json
+"""
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_openai_server import (  # noqa: E402
+    start_fake_openai_server, CANNED_META_RESULT, CANNED_JSON_PLAN, CANNED_AGENT_RESULT
+)
+
+REPORTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "reports")
+# PDF minimal valide : les benchmarks d'outils ne lisent que la liste et les métadonnées des fichiers
+MINIMAL_PDF = b"%PDF-1.4\n1 0 obj<< /Type /Catalog >>endobj\ntrailer<< /Root 1 0 R >>\n%%EOF\n"
+PDF_COUNTS = [0, 10, 50]
+PROBLEM_STATEMENT = "Lancer une campagne Octobre Rose pour une menuiserie artisanale"
+COMPANY_CONTEXT = "PROFERM - menuiserie sur mesure, valeurs de proximité et d'engagement social"
+
+
+@dataclass
+class BenchmarkResult:
+    """Mesures d'un benchmark (en millisecondes)"""
+    name: str
+    params: Dict = field(default_factory=dict)
+    timings_ms: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        timings = sorted(self.timings_ms)
+        return {
+            "name": self.name,
+            "params": self.params,
+            "repeats": len(timings),
+            "min_ms": round(timings[0], 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.mean(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        }
+
+    @property
+    def key(self) -> str:
+        params = ",".join(f"{name}={value}" for name, value in sorted(self.params.items()))
+        return f"{self.name}[{params}]" if params else self.name
+
+
+def measure(name: str, fn: Callable, repeats: int, setup: Optional[Callable] = None, **params) -> BenchmarkResult:
+    """Exécute fn `repeats` fois (setup éventuel hors chronométrage), sorties console masquées"""
+    result = BenchmarkResult(name=name, params=params)
+    for _ in range(repeats):
+        with redirect_stdout(io.StringIO()):
+            if setup:
+                setup()
+            started_at = time.perf_counter()
+            fn()
+            result.timings_ms.append((time.perf_counter() - started_at) * 1000)
+    print(f"⏱️ {result.key:<60} médiane {result.summary()['median_ms']:>10.3f} ms")
+    return result
+
+
+def prepare_workspace(base_url: str) -> str:
+    """Crée un espace de travail isolé et configure l'environnement avant l'import de src"""
+    workspace = tempfile.mkdtemp(prefix="crewai-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_BASE": base_url,
+        "OPENAI_MODEL": "gpt-4o-mini",
+        "CREWAI_TELEMETRY": "False",
+        "OTEL_SDK_DISABLED": "true",
+        "KNOWLEDGE_INDEX_DIR": os.path.join(workspace, "knowledge_index"),
+        "PLAN_CACHE_DB": os.path.join(workspace, "cache", "meta_plans.db"),
+        "CONTEXT_SUMMARY_DIR": os.path.join(workspace, "cache", "context_summaries"),
+        "RUNS_DIR": os.path.join(workspace, "runs"),
+        "TRACE_FILE": os.path.join(workspace, "traces", "spans.jsonl"),
+    })
+    # Pas de recherche web réelle pendant les benchmarks
+    os.environ.pop("SERPER_API_KEY", None)
+    os.chdir(workspace)
+    return workspace
+
+
+def populate_knowledge(pdf_count: int):
+    """Remplit knowledge/ avec pdf_count PDFs minimaux"""
+    shutil.rmtree("knowledge", ignore_errors=True)
+    os.makedirs("knowledge")
+    for i in range(pdf_count):
+        with open(os.path.join("knowledge", f"document_{i:03d}.pdf"), "wb") as f:
+            f.write(MINIMAL_PDF)
+
+
+def run_micro_benchmarks(repeats: int) -> List[BenchmarkResult]:
+    """Benchmarks du framework seul (aucun appel LLM)"""
+    from src.agent_config import AgentConfigManager
+    from src.tools import get_available_tools, get_tool_registry
+    from src.crew import build_two_phase_marketing_crew
+    from src.sequential_tasks import SequentialTaskManager
+    from src.result_parser import parse_markdown_result, smart_parse_result, format_markdown_text, clear_parse_cache
+
+    registry = get_tool_registry()
+    results = []
+
+    populate_knowledge(0)
+    results.append(measure("AgentConfigManager()", AgentConfigManager, repeats, setup=registry.clear, registry="cold"))
+    results.append(measure("AgentConfigManager()", AgentConfigManager, repeats, registry="warm"))
+
+    for pdf_count in PDF_COUNTS:
+        populate_knowledge(pdf_count)
+        results.append(measure("get_available_tools", get_available_tools, repeats, setup=registry.clear,
+                               pdfs=pdf_count, registry="cold"))
+        results.append(measure("get_available_tools", get_available_tools, repeats, pdfs=pdf_count, registry="warm"))
+
+    populate_knowledge(0)
+    config_manager = AgentConfigManager()
+    build = lambda manager: build_two_phase_marketing_crew(PROBLEM_STATEMENT, COMPANY_CONTEXT, manager)
+    fresh_managers = []
+    results.append(measure(
+        "build_two_phase_marketing_crew",
+        lambda: build(fresh_managers[-1]),
+        repeats,
+        setup=lambda: fresh_managers.append(AgentConfigManager()),
+        agent_cache="cold"
+    ))
+    results.append(measure("build_two_phase_marketing_crew", lambda: build(config_manager), repeats, agent_cache="warm"))
+
+    task_manager = SequentialTaskManager(config_manager)
+    available_agents = ["clara_detective_digitale", "julien_analyste_strategique", "sophie_plume_solidaire"]
+    results.append(measure(
+        "parse_recommended_order",
+        lambda: task_manager.parse_recommended_order(CANNED_META_RESULT, available_agents),
+        repeats
+    ))
+
+    for execution_type in ["sequential", "async"]:
+        plan = json.dumps(dict(CANNED_JSON_PLAN, execution_type=execution_type), ensure_ascii=False)
+        results.append(measure(
+            "parse_json_plan_and_create_tasks",
+            lambda: task_manager.parse_json_plan_and_create_tasks(plan, PROBLEM_STATEMENT, COMPANY_CONTEXT),
+            repeats,
+            execution_type=execution_type
+        ))
+
+    for size in [1, 50]:
+        campaign_result = f"{CANNED_META_RESULT}\n\n---\n\nRÉSULTATS DES AGENTS:\n\n" + CANNED_AGENT_RESULT * size
+        results.append(measure("parse_markdown_result", lambda: parse_markdown_result(campaign_result), repeats,
+                               setup=clear_parse_cache, result_copies=size, parse_cache="cold"))
+        results.append(measure("smart_parse_result", lambda: smart_parse_result(campaign_result), repeats,
+                               setup=clear_parse_cache, result_copies=size, parse_cache="cold"))
+        results.append(measure("smart_parse_result", lambda: smart_parse_result(campaign_result), repeats,
+                               result_copies=size, parse_cache="warm"))
+        results.append(measure("format_markdown_text", lambda: format_markdown_text(campaign_result), repeats, result_copies=size))
+
+    return results
+
+
+def run_campaign_benchmark(repeats: int, stats, cassette_path: str = None) -> Dict:
+    """Campagne complète face au LLM factice : temps total, temps LLM et surcoût du framework
+
+    Avec cassette_path, les réponses LLM et outils d'une vraie campagne enregistrée sont
+    rejouées : le framework est mesuré sur des charges réalistes, toujours sans réseau.
+    """
+    from src.agent_config import AgentConfigManager
+    from src.campaign_runner import run_two_phase_campaign
+    from src.cassette import activate_cassette
+
+    populate_knowledge(0)
+    config_manager = AgentConfigManager()
+    runs = []
+    for _ in range(repeats):
+        stats.reset()
+        if cassette_path:
+            activate_cassette(cassette_path, "replay")
+        with redirect_stdout(io.StringIO()):
+            started_at = time.perf_counter()
+            run_two_phase_campaign(PROBLEM_STATEMENT, COMPANY_CONTEXT, config_manager, use_plan_cache=False)
+            wall_seconds = time.perf_counter() - started_at
+        server = stats.snapshot()
+        runs.append({
+            "wall_seconds": round(wall_seconds, 4),
+            "llm_seconds": server["server_seconds"],
+            "framework_seconds": round(wall_seconds - server["server_seconds"], 4),
+            "requests": server["requests"],
+        })
+
+    framework_median = statistics.median(run["framework_seconds"] for run in runs)
+    print(f"⏱️ {'campagne complète (surcoût framework)':<60} médiane {framework_median * 1000:>10.3f} ms")
+    return {
+        "repeats": repeats,
+        "median_wall_seconds": round(statistics.median(run["wall_seconds"] for run in runs), 4),
+        "median_llm_seconds": round(statistics.median(run["llm_seconds"] for run in runs), 4),
+        "median_framework_seconds": round(framework_median, 4),
+        "runs": runs,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(report: Dict, baseline_path: str, threshold: float) -> List[str]:
+    """Liste les benchmarks dont la médiane a régressé de plus de `threshold` par rapport à la référence"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    key = lambda entry: (entry["name"], json.dumps(entry["params"], sort_keys=True))
+    baseline_medians = {key(entry): entry["median_ms"] for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in report["results"]:
+        reference = baseline_medians.get(key(entry))
+        if reference and entry["median_ms"] > reference * (1 + threshold):
+            regressions.append(f"{entry['name']} {entry['params']} : {reference:.3f} → {entry['median_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne du coût d'orchestration")
+    parser.add_argument("--repeats", type=int, default=10, help="Répétitions par micro-benchmark")
+    parser.add_argument("--campaign-repeats", type=int, default=3, help="Répétitions de la campagne complète")
+    parser.add_argument("--skip-campaign", action="store_true", help="Ne pas exécuter la campagne complète")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latence simulée du LLM factice (secondes)")
+    parser.add_argument("--cassette", help="Cassette enregistrée à rejouer pour la campagne complète")
+    parser.add_argument("--output", help="Rapport JSON (défaut : benchmarks/reports/<date>.json)")
+    parser.add_argument("--compare", help="Rapport de référence : signale les régressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Régression tolérée (0.2 = +20 %%)")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output or os.path.join(REPORTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json"))
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    cassette_path = os.path.abspath(args.cassette) if args.cassette else None
+
+    server, base_url, stats = start_fake_openai_server(latency=args.llm_latency)
+    workspace = prepare_workspace(base_url)
+    print(f"🧪 Benchmarks dans {workspace} (LLM factice : {base_url})")
+
+    try:
+        results = run_micro_benchmarks(args.repeats)
+        report = {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {"repeats": args.repeats, "llm_latency": args.llm_latency, "cassette": cassette_path},
+            "results": [result.summary() for result in results],
+        }
+        if not args.skip_campaign:
+            report["campaign"] = run_campaign_benchmark(args.campaign_repeats, stats, cassette_path)
+    finally:
+        server.shutdown()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 Rapport écrit dans {output_path}")
+
+    if baseline_path:
+        regressions = compare_reports(report, baseline_path, args.threshold)
+        for regression in regressions:
+            print(f"❌ Régression : {regression}")
+        if regressions:
+            return 1
+        print("✅ Aucune régression par rapport à la référence")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
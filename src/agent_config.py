@@ -1,6 +1,7 @@
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, fields, replace
 from src.tools import get_available_tools, DEFAULT_AGENT_TOOLS
+from src.config_store import ConfigStore, get_config_store
 
 @dataclass
 class AgentConfig:
@@ -14,19 +15,43 @@ class AgentConfig:
     max_iter: int = 3
     memory: bool = False  # Désactivé pour éviter les problèmes d'événements
     allow_delegation: bool = False
+    context_token_budget: Optional[int] = None  # Budget de contexte amont en tokens (None = global, 0 = illimité)
+    knowledge_collections: Optional[List[str]] = None  # Sous-dossiers ou motifs de knowledge/ (None = tous les PDFs, [] = aucun)
+    llm_model: Optional[str] = None  # Modèle LLM de l'agent (None = OPENAI_MODEL)
+    temperature: Optional[float] = None  # None = valeur par défaut du modèle
+    max_tokens: Optional[int] = None  # Longueur maximale d'une réponse (None = pas de limite)
 
 class AgentConfigManager:
-    """Gestionnaire de configuration des agents"""
+    """Gestionnaire de configuration des agents
     
-    def __init__(self):
-        self.agents_config: Dict[str, AgentConfig] = {}
+    Les configurations sont lues dans le stockage persistant partagé par le processus :
+    une modification faite dans une session (ou un autre processus) est vue par toutes.
+    """
+    
+    def __init__(self, store: ConfigStore = None):
+        self.store = store or get_config_store()
+        self.store.register_kind("agent", AgentConfig)
+        # Éléments construits des agents CrewAI : nom -> (clé de configuration, outils / connaissances / LLM)
+        self.agent_cache: Dict[str, Tuple[str, Any]] = {}
         self.available_tools = get_available_tools()
         self._init_default_configs()
+        self.store.add_listener(self._on_config_change)
+    
+    @property
+    def agents_config(self) -> Dict[str, AgentConfig]:
+        return self.store.get_all("agent")
+    
+    def _on_config_change(self, kind: str, name: str):
+        """Invalide l'agent construit dont la configuration a changé"""
+        if kind == "agent":
+            self.invalidate_agent_cache(name)
     
     def create_new_agent(self, name: str, role: str, goal: str, backstory: str, 
                         enabled_tools: List[str] = None, verbose: bool = True, 
                         max_iter: int = 3, memory: bool = False, 
-                        allow_delegation: bool = False) -> str:
+                        allow_delegation: bool = False, context_token_budget: Optional[int] = None,
+                        knowledge_collections: Optional[List[str]] = None, llm_model: Optional[str] = None,
+                        temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
         """Crée un nouvel agent avec un nom unique"""
         # Générer un nom unique si nécessaire
         original_name = name
@@ -45,36 +70,54 @@ class AgentConfigManager:
             verbose=verbose,
             max_iter=max_iter,
             memory=memory,
-            allow_delegation=allow_delegation
+            allow_delegation=allow_delegation,
+            context_token_budget=context_token_budget,
+            knowledge_collections=knowledge_collections,
+            llm_model=llm_model,
+            temperature=temperature,
+            max_tokens=max_tokens
         )
         
-        self.agents_config[name] = config
+        self.store.put("agent", name, config)
         return name
     
     def delete_agent(self, agent_name: str) -> bool:
         """Supprime un agent"""
         if agent_name in self.agents_config:
-            del self.agents_config[agent_name]
+            self.store.delete("agent", agent_name)
+            self.invalidate_agent_cache(agent_name)
             return True
         return False
     
     def _init_default_configs(self):
-        """Initialise les configurations par défaut"""
-        default_configs = {
+        """Initialise les configurations par défaut (une seule fois, dans le stockage partagé)"""
+        self.store.seed("agent", self._build_default_configs())
+    
+    def reset_to_defaults(self):
+        """Remplace toutes les configurations par celles par défaut"""
+        self.store.replace_all("agent", self._build_default_configs())
+        self.invalidate_agent_cache()
+    
+    @staticmethod
+    def _build_default_configs() -> Dict[str, AgentConfig]:
+        """Configurations par défaut des agents"""
+        return {
             "meta_manager_agent": AgentConfig(
                 name="Meta Agent Manager",
                 role="Directeur Marketing Stratégique & Orchestrateur d'Équipe",
                 goal="Analyser en profondeur les problématiques marketing complexes, décomposer les défis en tâches stratégiques spécifiques, et orchestrer le travail collaboratif d'une équipe d'experts spécialisés pour livrer des solutions marketing complètes et cohérentes.",
                 backstory="Avec plus de 15 ans d'expérience dans le marketing digital et la gestion d'équipes créatives, ce directeur marketing a orchestré des campagnes pour des marques internationales. Diplômé en stratégie marketing et passionné par l'innovation, il excelle dans l'analyse systémique des défis marketing. Son approche méthodique lui permet de transformer une problématique complexe en un plan d'action structuré, en identifiant précisément quels experts mobiliser et dans quel ordre. Il possède une vision 360° du marketing moderne, maîtrise les enjeux RSE, la communication digitale, et l'analyse de données. Sa force réside dans sa capacité à créer des synergies entre différents domaines d'expertise pour maximiser l'impact des stratégies marketing.",
                 enabled_tools=[],
-                allow_delegation=True
+                allow_delegation=True,
+                knowledge_collections=[]  # Planifie sans lire les documents
             ),
             "clara_detective_digitale": AgentConfig(
                 name="Clara - Détective Digitale",
                 role="Spécialiste Veille Stratégique & Intelligence Concurrentielle",
                 goal="Conduire des recherches approfondies sur les tendances marketing émergentes, analyser les stratégies concurrentielles innovantes, identifier les opportunités de marché, et fournir des insights data-driven pour alimenter la prise de décision stratégique.",
                 backstory="Clara, 32 ans, est une ancienne journaliste tech devenue experte en intelligence marketing. Après avoir couvert l'écosystème startup pendant 8 ans, elle a rejoint une agence de conseil en stratégie digitale où elle a développé une méthode unique de veille concurrentielle. Elle maîtrise parfaitement les outils d'analyse web, les réseaux sociaux, et les bases de données sectorielles. Son réseau étendu dans l'écosystème tech lui permet d'accéder à des informations exclusives et des tendances avant qu'elles ne deviennent mainstream. Clara excelle dans l'art de transformer des données brutes en insights actionnables. Elle a un œil particulier pour détecter les signaux faibles, les nouvelles pratiques marketing, et les opportunités de différenciation. Sa passion pour l'innovation et son approche méthodique en font une chercheuse redoutable qui ne laisse rien au hasard.",
-                enabled_tools=["serper_search", "website_search", "scrape_website"]
+                enabled_tools=["batch_web_research", "serper_search", "website_search", "scrape_website"],
+                knowledge_collections=[]  # Recherche sur le web uniquement
             ),
             "julien_analyste_strategique": AgentConfig(
                 name="Julien - Analyste Stratégique RSE",
@@ -91,16 +134,15 @@ class AgentConfigManager:
                 enabled_tools=[]
             )
         }
-        
-        self.agents_config = default_configs
     
     def get_agent_config(self, agent_name: str) -> Optional[AgentConfig]:
         """Récupère la configuration d'un agent"""
         return self.agents_config.get(agent_name)
     
     def update_agent_config(self, agent_name: str, config: AgentConfig):
-        """Met à jour la configuration d'un agent"""
-        self.agents_config[agent_name] = config
+        """Met à jour la configuration d'un agent (nouvelle version dans le stockage)"""
+        self.store.put("agent", agent_name, config)
+        self.invalidate_agent_cache(agent_name)
     
     def get_all_agents(self) -> Dict[str, AgentConfig]:
         """Retourne toutes les configurations d'agents"""
@@ -113,7 +155,25 @@ class AgentConfigManager:
     def update_agent_tools(self, agent_name: str, enabled_tools: List[str]):
         """Met à jour les outils d'un agent"""
         if agent_name in self.agents_config:
-            self.agents_config[agent_name].enabled_tools = enabled_tools
+            self.update_agent_config(agent_name, replace(self.agents_config[agent_name], enabled_tools=enabled_tools))
+    
+    def get_cached_agent_inputs(self, agent_name: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Retourne les éléments construits d'un agent (outils, connaissances, LLM) si sa clé correspond"""
+        entry = self.agent_cache.get(agent_name)
+        if entry is not None and entry[0] == cache_key:
+            return entry[1]
+        return None
+    
+    def cache_agent_inputs(self, agent_name: str, cache_key: str, inputs: Dict[str, Any]):
+        """Mémorise les éléments construits d'un agent pour sa clé de configuration"""
+        self.agent_cache[agent_name] = (cache_key, inputs)
+    
+    def invalidate_agent_cache(self, agent_name: str = None):
+        """Invalide le cache d'un agent (ou de tous les agents)"""
+        if agent_name is None:
+            self.agent_cache.clear()
+        else:
+            self.agent_cache.pop(agent_name, None)
     
     def export_config(self) -> Dict:
         """Exporte la configuration complète"""
@@ -127,7 +187,12 @@ class AgentConfigManager:
                     "enabled_tools": config.enabled_tools,
                     "max_iter": config.max_iter,
                     "memory": config.memory,
-                    "allow_delegation": config.allow_delegation
+                    "allow_delegation": config.allow_delegation,
+                    "context_token_budget": config.context_token_budget,
+                    "knowledge_collections": config.knowledge_collections,
+                    "llm_model": config.llm_model,
+                    "temperature": config.temperature,
+                    "max_tokens": config.max_tokens
                 }
                 for name, config in self.agents_config.items()
             },
@@ -144,12 +209,8 @@ class AgentConfigManager:
         """Importe une configuration"""
         if "agents" in config:
             for agent_name, agent_data in config["agents"].items():
-                if agent_name in self.agents_config:
-                    self.agents_config[agent_name].role = agent_data.get("role", self.agents_config[agent_name].role)
-                    self.agents_config[agent_name].goal = agent_data.get("goal", self.agents_config[agent_name].goal)
-                    self.agents_config[agent_name].backstory = agent_data.get("backstory", self.agents_config[agent_name].backstory)
-                    self.agents_config[agent_name].verbose = agent_data.get("verbose", self.agents_config[agent_name].verbose)
-                    self.agents_config[agent_name].enabled_tools = agent_data.get("enabled_tools", self.agents_config[agent_name].enabled_tools)
-                    self.agents_config[agent_name].max_iter = agent_data.get("max_iter", self.agents_config[agent_name].max_iter)
-                    self.agents_config[agent_name].memory = agent_data.get("memory", self.agents_config[agent_name].memory)
-                    self.agents_config[agent_name].allow_delegation = agent_data.get("allow_delegation", self.agents_config[agent_name].allow_delegation)
\ No newline at end of file
+                current = self.agents_config.get(agent_name)
+                if current is not None:
+                    changes = {field.name: agent_data[field.name] for field in fields(AgentConfig)
+                               if field.name != "name" and field.name in agent_data}
+                    self.update_agent_config(agent_name, replace(current, **changes))
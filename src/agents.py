@@ -1,32 +1,84 @@
 from crewai import Agent
-from src.tools import get_tools_for_agent, create_pdf_knowledge_sources
-from src.agent_config import AgentConfigManager
-from typing import List
+from src.tools import get_tools_for_agent, create_pdf_knowledge_sources, get_knowledge_fingerprint, match_knowledge_collections, env_fingerprint, pdf_fingerprint
+from src.agent_config import AgentConfigManager, AgentConfig
+from src.llm_governor import create_governed_llm
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+
+# Variables d'environnement qui influencent les outils et le LLM d'un agent
+AGENT_ENV_VARS = ["OPENAI_API_KEY", "OPENAI_MODEL", "SERPER_API_KEY"]
+
+def _agent_cache_key(config: AgentConfig, pdf_paths: List[str] = None) -> str:
+    """Calcule la clé de cache d'un agent : configuration, outils activés, connaissances et environnement"""
+    enabled_tools = sorted(config.enabled_tools or [])
+    payload = {
+        "config": asdict(config),
+        "enabled_tools": enabled_tools,
+        # None = périmètre non restreint par le crew (outil PDF sur tout knowledge/)
+        "knowledge": None if pdf_paths is None else [(pdf_path, pdf_fingerprint(pdf_path)) for pdf_path in sorted(pdf_paths)],
+        "environment": [env_fingerprint(var_name) for var_name in AGENT_ENV_VARS],
+    }
+    # Les outils PDF dépendent du contenu de knowledge/
+    if any(tool_name in ["pdf_search", "rag_tool"] for tool_name in enabled_tools):
+        payload["available_pdfs"] = get_knowledge_fingerprint()
+    
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def create_agent_llm(config: AgentConfig):
+    """LLM régulé d'un agent : son modèle, sa température et son max_tokens (sinon les valeurs par défaut)"""
+    options = {}
+    if config.temperature is not None:
+        options["temperature"] = config.temperature
+    if config.max_tokens:
+        options["max_tokens"] = config.max_tokens
+    return create_governed_llm(config.llm_model or None, **options)
+
+def _build_agent_inputs(agent_name: str, config: AgentConfig, pdf_paths: Optional[List[str]]) -> Dict[str, Any]:
+    """Éléments réutilisables d'un agent : outils et LLM"""
+    return {
+        # Récupérer les outils configurés
+        "tools": get_tools_for_agent(agent_name, config.enabled_tools, config.knowledge_collections, pdf_paths),
+        # Appels LLM régulés (requêtes et tokens par minute) par le gouverneur du processus
+        "llm": create_agent_llm(config),
+    }
 
 def create_agent_from_config(agent_name: str, config_manager: AgentConfigManager, pdf_paths: List[str] = None) -> Agent:
-    """Crée un agent CrewAI à partir de sa configuration"""
+    """Crée un agent CrewAI à partir de sa configuration
+    
+    Les outils et le LLM sont mémorisés dans le cache du config manager et ne sont résolus
+    qu'une fois tant que la configuration ne change pas. L'Agent et ses sources de
+    connaissances sont recréés à chaque appel : ils portent l'état d'exécution de leur crew
+    (exécuteur, compteurs de tokens, stockage) et ne doivent pas être partagés entre deux
+    campagnes ; les textes et vecteurs des PDFs restent partagés par l'index de connaissances.
+    Seuls les PDFs du crew (pdf_paths) appartenant aux collections de connaissances de
+    l'agent lui sont donnés, comme sources de connaissances et dans ses outils PDF.
+    """
     config = config_manager.get_agent_config(agent_name)
     if not config:
         raise ValueError(f"Configuration non trouvée pour l'agent: {agent_name}")
     
-    # Récupérer les outils configurés
-    tools = get_tools_for_agent(agent_name, config.enabled_tools)
-    
-    # Créer les sources de connaissances PDF si des chemins sont fournis
-    knowledge_sources = []
-    if pdf_paths:
-        knowledge_sources = create_pdf_knowledge_sources(pdf_paths)
+    if pdf_paths is not None:
+        pdf_paths = match_knowledge_collections(pdf_paths, config.knowledge_collections)
+    cache_key = _agent_cache_key(config, pdf_paths)
+    inputs = config_manager.get_cached_agent_inputs(agent_name, cache_key)
+    if inputs is None:
+        inputs = _build_agent_inputs(agent_name, config, pdf_paths)
+        config_manager.cache_agent_inputs(agent_name, cache_key, inputs)
     
     return Agent(
         role=config.role,
         goal=config.goal,
         backstory=config.backstory,
         verbose=config.verbose,
-        tools=tools,
-        knowledge_sources=knowledge_sources,
+        tools=list(inputs["tools"]),
+        # Créer les sources de connaissances PDF si des chemins sont fournis
+        knowledge_sources=create_pdf_knowledge_sources(pdf_paths) if pdf_paths else [],
         max_iter=config.max_iter,
         memory=config.memory,
         allow_delegation=config.allow_delegation,
+        llm=inputs["llm"],
     )
 
 def create_all_agents(config_manager: AgentConfigManager, pdf_paths: List[str] = None) -> dict:
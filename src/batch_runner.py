@@ -0,0 +1,234 @@
+"""Exécution headless de campagnes en lot à partir d'un fichier JSONL de briefs
+
+Usage :
+    python -m src.batch_runner briefs.jsonl --output resultats.jsonl --workers 4
+
+Chaque ligne du fichier d'entrée est un objet JSON :
+    {"id": "optionnel", "problem_statement": "...", "company_context": "...", "crew": "marketing_standard"}
+"crew" est le nom d'un crew configuré ou une liste de noms d'agents.
+Les résultats sont écrits au fil de l'eau ; relancer la commande reprend là où elle s'était arrêtée.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from dotenv import load_dotenv
+
+# Gestionnaires de configuration propres à chaque processus worker
+_WORKER_STATE: Dict = {}
+
+
+def get_record_id(record: Dict) -> str:
+    """Identifiant stable d'un brief : son champ "id" ou un hash de son contenu"""
+    if record.get("id"):
+        return str(record["id"])
+    payload = {key: record.get(key) for key in ("problem_statement", "company_context", "crew")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def load_briefs(input_path: str) -> List[Tuple[str, Dict]]:
+    """Lit le fichier JSONL des briefs (les lignes invalides ou en double sont signalées et ignorées)"""
+    briefs = []
+    seen_ids = set()
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Ligne {line_number} ignorée (JSON invalide) : {e}")
+                continue
+            if not record.get("problem_statement"):
+                print(f"⚠️ Ligne {line_number} ignorée : problem_statement manquant")
+                continue
+            record_id = get_record_id(record)
+            # Deux briefs au même identifiant écriraient leurs résultats sous le même id
+            if record_id in seen_ids:
+                print(f"⚠️ Ligne {line_number} ignorée : brief en double (id {record_id})")
+                continue
+            seen_ids.add(record_id)
+            briefs.append((record_id, record))
+    return briefs
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """Identifiants déjà traités avec succès dans le fichier de sortie (pour la reprise)"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée par un crash : le brief sera relancé
+                continue
+            if result.get("status") == "completed" and result.get("id"):
+                completed.add(result["id"])
+    return completed
+
+
+def _drop_partial_line(output_path: str):
+    """Supprime la dernière ligne du fichier de sortie si un crash l'a tronquée
+
+    Sans cela, le prochain résultat serait collé à la ligne tronquée et perdu pour la reprise
+    (le brief correspondant, absent des résultats valides, est relancé).
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        # Recherche du dernier saut de ligne par blocs, depuis la fin
+        while position > 0:
+            start = max(0, position - 64 * 1024)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            print(f"⚠️ Dernière ligne tronquée supprimée de {output_path}")
+            f.truncate(position)
+
+
+def _init_worker():
+    """Initialise les gestionnaires de configuration une seule fois par worker"""
+    from .agent_config import AgentConfigManager
+    from .crew_config import CrewConfigManager
+
+    config_manager = AgentConfigManager()
+    _WORKER_STATE["config_manager"] = config_manager
+    _WORKER_STATE["crew_config_manager"] = CrewConfigManager(config_manager)
+
+
+def _resolve_agents(crew) -> Optional[List[str]]:
+    """Convertit le champ "crew" d'un brief en liste d'agents"""
+    if crew is None:
+        return None
+    if isinstance(crew, list):
+        return crew
+    crew_config = _WORKER_STATE["crew_config_manager"].get_crew_config(crew)
+    if crew_config is None:
+        raise ValueError(f"Crew inconnu : {crew}")
+    return crew_config.selected_agents
+
+
+def run_brief(record_id: str, record: Dict, use_knowledge: bool = True, use_plan_cache: bool = True,
+              cassette_dir: str = None, cassette_mode: str = "record") -> Dict:
+    """Exécute un brief dans le processus courant et retourne une ligne de résultat
+
+    Avec cassette_dir, le trafic LLM et outils du brief est enregistré (ou rejoué)
+    dans <cassette_dir>/<id>.jsonl.
+    """
+    from .campaign_runner import run_two_phase_campaign
+    from .tools import get_available_pdfs
+    from .cassette import activate_cassette
+
+    if not _WORKER_STATE:
+        _init_worker()
+
+    started_at = time.time()
+    result = {
+        "id": record_id,
+        "problem_statement": record.get("problem_statement", ""),
+        "crew": record.get("crew"),
+    }
+    try:
+        if cassette_dir:
+            activate_cassette(os.path.join(cassette_dir, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', record_id)}.jsonl"), cassette_mode)
+        meta_result, agents_result, _ = run_two_phase_campaign(
+            problem_statement=record["problem_statement"],
+            company_context=record.get("company_context", ""),
+            config_manager=_WORKER_STATE["config_manager"],
+            pdf_paths=get_available_pdfs() if use_knowledge else None,
+            selected_agents=_resolve_agents(record.get("crew")),
+            use_plan_cache=use_plan_cache
+        )
+        result.update(status="completed", meta_result=meta_result, result=agents_result)
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["duration_seconds"] = round(time.time() - started_at, 2)
+    return result
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 2, use_knowledge: bool = True,
+              use_plan_cache: bool = True, cassette_dir: str = None, cassette_mode: str = "record") -> Dict[str, int]:
+    """Exécute tous les briefs non encore traités dans un pool de processus
+
+    Returns:
+        Dict[str, int]: compteurs completed / failed / skipped
+    """
+    briefs = load_briefs(input_path)
+    completed_ids = load_completed_ids(output_path)
+    pending = [(record_id, record) for record_id, record in briefs if record_id not in completed_ids]
+    counters = {"completed": 0, "failed": 0, "skipped": len(briefs) - len(pending)}
+
+    print(f"📋 {len(briefs)} brief(s), {counters['skipped']} déjà traité(s), {len(pending)} à exécuter avec {workers} worker(s)")
+    if not pending:
+        return counters
+
+    _drop_partial_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(run_brief, record_id, record, use_knowledge, use_plan_cache, cassette_dir, cassette_mode): record_id
+            for record_id, record in pending
+        }
+        for future in as_completed(futures):
+            record_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Worker mort (crash du processus) : le brief sera relancé à la prochaine exécution
+                result = {"id": record_id, "status": "failed", "error": f"Worker interrompu : {e}"}
+
+            # Écriture immédiate et durable de chaque résultat
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            os.fsync(output.fileno())
+
+            counters[result["status"]] += 1
+            icon = "✅" if result["status"] == "completed" else "❌"
+            print(f"{icon} Brief {record_id} : {result['status']} ({counters['completed'] + counters['failed']}/{len(pending)})")
+
+    return counters
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exécute des campagnes marketing en lot à partir d'un fichier JSONL de briefs")
+    parser.add_argument("input", help="Fichier JSONL des briefs")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="Fichier JSONL des résultats (reprise automatique)")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Nombre de processus en parallèle")
+    parser.add_argument("--no-knowledge", action="store_true", help="Ne pas fournir les PDFs de knowledge/ aux agents")
+    parser.add_argument("--no-plan-cache", action="store_true", help="Toujours relancer le Meta Manager")
+    parser.add_argument("--cassette-dir", help="Dossier des cassettes (une par brief) pour enregistrer ou rejouer le trafic")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="record", help="Mode des cassettes")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    os.environ["CREWAI_TELEMETRY"] = "False"
+
+    counters = run_batch(
+        args.input,
+        args.output,
+        workers=args.workers,
+        use_knowledge=not args.no_knowledge,
+        use_plan_cache=not args.no_plan_cache,
+        cassette_dir=os.path.abspath(args.cassette_dir) if args.cassette_dir else None,
+        cassette_mode=args.cassette_mode
+    )
+    print(f"🎯 Terminé : {counters['completed']} réussi(s), {counters['failed']} échoué(s), {counters['skipped']} ignoré(s)")
+    return 1 if counters["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
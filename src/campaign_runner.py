@@ -0,0 +1,399 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import time
+import uuid
+import queue
+import threading
+from .crew import build_two_phase_marketing_crew, build_ordered_crew_from_meta_result, DEFAULT_CAMPAIGN_AGENTS
+from .sequential_tasks import SequentialTaskManager
+from .agent_config import AgentConfigManager
+from .plan_cache import get_plan_cache, build_plan_cache_key
+from .run_store import get_run_store, TaskCheckpoint
+from .history_store import get_history_store
+from .tracing import get_tracer, load_spans, summarize_models, wait_for_llm_spans
+from .cassette import activate_cassette_from_env
+
+# Nombre de jobs terminés conservés en mémoire
+MAX_FINISHED_JOBS = 20
+
+
+@dataclass
+class CampaignEvent:
+    """Événement de progression d'une campagne"""
+    kind: str  # phase, step, task, done, error
+    message: str
+    agent: str = ""
+    output: str = ""
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class CampaignJob:
+    """Campagne exécutée en arrière-plan"""
+    job_id: str
+    problem_statement: str
+    crew_name: str = ""
+    run_id: str = ""
+    status: str = "pending"  # pending, running, completed, failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    meta_result: Optional[str] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    agent_outputs: Dict[str, str] = field(default_factory=dict)
+    events: "queue.Queue[CampaignEvent]" = field(default_factory=queue.Queue)
+    history: List[CampaignEvent] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def push(self, kind: str, message: str, agent: str = "", output: str = ""):
+        """Publie un événement de progression (appelé depuis le thread du job)"""
+        self.events.put(CampaignEvent(kind=kind, message=message, agent=agent, output=output))
+
+    def poll_events(self) -> List[CampaignEvent]:
+        """Vide la file d'événements dans l'historique et retourne l'historique complet"""
+        with self._lock:
+            while True:
+                try:
+                    self.history.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            return list(self.history)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+def _summarize_step(step: Any) -> str:
+    """Résumé court d'une étape d'agent (AgentAction, AgentFinish, ToolResult...)"""
+    tool = getattr(step, "tool", None)
+    if tool:
+        return f"🔧 Outil utilisé : {tool}"
+    thought = getattr(step, "thought", None) or getattr(step, "text", None) or str(step)
+    thought = str(thought).strip().replace("\n", " ")
+    return f"💭 {thought[:200]}"
+
+
+def _build_checkpoint(index: int, task) -> TaskCheckpoint:
+    """Enregistrement structuré de la sortie d'une tâche (agent, texte, durée, tokens)"""
+    stats = getattr(task, "execution_stats", None) or {}
+    return TaskCheckpoint(
+        index=index,
+        agent=str(task.output.agent or task.agent.role),
+        description=task.description,
+        raw=str(task.output.raw),
+        started_at=stats.get("started_at"),
+        duration_seconds=stats.get("duration_seconds"),
+        tokens_in=stats.get("tokens_in"),
+        tokens_out=stats.get("tokens_out")
+    )
+
+
+def _restore_completed_tasks(tasks: List, checkpoints: Dict[int, TaskCheckpoint]) -> int:
+    """Réinjecte les sorties déjà persistées dans les tâches reconstruites
+
+    Seul le préfixe de tâches dont l'agent correspond au checkpoint est restauré :
+    leurs TaskOutput servent ensuite de contexte aux tâches restantes.
+
+    Returns:
+        int: nombre de tâches restaurées
+    """
+    from crewai.tasks.task_output import TaskOutput
+
+    restored = 0
+    for index, task in enumerate(tasks):
+        checkpoint = checkpoints.get(index)
+        if checkpoint is None or checkpoint.agent != task.agent.role:
+            break
+        task.output = TaskOutput(
+            description=task.description,
+            expected_output=task.expected_output,
+            raw=checkpoint.raw,
+            agent=checkpoint.agent
+        )
+        restored += 1
+    return restored
+
+
+def _saved_agent_order(order: List[str], config_manager: AgentConfigManager) -> Optional[List[str]]:
+    """Ordre des agents persisté, en noms d'agents (None si aucun n'est connu)
+
+    Les exécutions plus anciennes enregistraient les rôles : ils sont reconvertis en noms.
+    Un agent supprimé depuis est ignoré, la restauration des checkpoints s'arrête alors à sa place.
+    """
+    names_by_role = {config.role: name for name, config in config_manager.get_all_agents().items()}
+    agent_order = []
+    for entry in order or []:
+        if config_manager.get_agent_config(entry):
+            agent_order.append(entry)
+        elif entry in names_by_role:
+            agent_order.append(names_by_role[entry])
+    return agent_order or None
+
+
+def _record_history(run_id: str, result: Optional[str] = None):
+    """Copie l'exécution dans l'historique consultable (un échec ici n'interrompt pas la campagne)"""
+    try:
+        state = get_run_store().load_run(run_id)
+        if state is not None:
+            get_history_store().record_run(state, result)
+    except Exception as e:
+        print(f"⚠️ Impossible d'enregistrer la campagne {run_id} dans l'historique : {e}")
+
+
+def _record_model_summary(run_id: str, trace_id: str):
+    """Persiste la latence, les tokens et le coût par modèle de la trace (calculés une seule fois par exécution)"""
+    try:
+        # Les derniers spans LLM peuvent encore être en cours d'écriture par les callbacks LiteLLM
+        if not wait_for_llm_spans(trace_id):
+            print(f"⚠️ Spans LLM de la trace {trace_id} encore en attente : résumé par modèle possiblement incomplet")
+        get_run_store().save_trace(run_id, trace_id, summarize_models(load_spans(trace_id)))
+    except Exception as e:
+        print(f"⚠️ Impossible de résumer la trace {trace_id} de la campagne {run_id} : {e}")
+
+
+def run_two_phase_campaign(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None,
+                           pdf_paths: List[str] = None, selected_agents: List[str] = None,
+                           task_callback: Optional[Callable] = None, step_callback: Optional[Callable] = None,
+                           on_phase: Optional[Callable[[str], None]] = None, use_plan_cache: bool = True,
+                           run_id: str = None) -> Tuple[str, str, str]:
+    """Exécute une campagne complète : Meta Manager puis agents dans l'ordre recommandé
+
+    Si use_plan_cache est actif et qu'un plan identique (problématique, contexte, agents,
+    PDFs) est en cache, la phase 1 est entièrement sautée.
+
+    Le plan, l'ordre des agents et la sortie de chaque tâche sont persistés dans
+    l'exécution run_id (créée si besoin) : relancer avec le même run_id ne ré-exécute
+    que ce qui n'était pas terminé.
+
+    Returns:
+        Tuple[str, str, str]: (plan du Meta Manager, résultat des agents, résultat combiné)
+    """
+    if config_manager is None:
+        config_manager = AgentConfigManager()
+    notify = on_phase or (lambda message: print(message))
+    if selected_agents is None:
+        selected_agents = DEFAULT_CAMPAIGN_AGENTS
+    available_agents = [agent for agent in selected_agents if agent != "meta_manager_agent"]
+    # CASSETTE_MODE=record|replay : enregistre ou rejoue le trafic LLM et outils de la campagne
+    activate_cassette_from_env()
+
+    run_store = get_run_store()
+    state = run_store.load_run(run_id) if run_id else None
+    if state is None:
+        run_id = run_store.create_run(problem_statement, company_context, selected_agents, pdf_paths, run_id=run_id)
+    else:
+        run_store.mark_running(run_id)
+
+    # Toute la campagne forme une trace : crews, tâches, outils et appels LLM en sont les enfants
+    with get_tracer().span("campaign", problem_statement[:80], run_id=run_id) as campaign_span:
+        run_store.save_trace(run_id, campaign_span.trace_id)
+        try:
+            meta_result = state.meta_result if state else None
+            if meta_result is not None:
+                notify(f"⏯️ Phase 1 : plan du Meta Manager restauré depuis l'exécution {run_id}")
+            else:
+                plan_cache = get_plan_cache()
+                cache_key = build_plan_cache_key(problem_statement, company_context, config_manager, available_agents)
+                meta_result = plan_cache.get(cache_key) if use_plan_cache else None
+
+                if meta_result is not None:
+                    notify("♻️ Phase 1 : plan du Meta Manager retrouvé en cache, analyse ignorée")
+                else:
+                    # Phase 1: Créer et exécuter le Meta Manager seul
+                    notify("🧠 Phase 1 : Le Meta Manager analyse la problématique et définit l'ordre d'exécution optimal...")
+                    meta_crew, task_manager, available_agents = build_two_phase_marketing_crew(
+                        problem_statement=problem_statement,
+                        company_context=company_context,
+                        config_manager=config_manager,
+                        pdf_paths=pdf_paths,
+                        selected_agents=selected_agents,
+                        task_callback=task_callback,
+                        step_callback=step_callback
+                    )
+                    meta_result = str(meta_crew.kickoff())
+                    if meta_result.strip():
+                        plan_cache.put(cache_key, meta_result)
+                run_store.save_meta_result(run_id, meta_result)
+
+            # Chaque tâche terminée est persistée avant de passer à la suivante
+            ordered_tasks = []
+
+            def checkpoint_callback(task_output):
+                for index, task in enumerate(ordered_tasks):
+                    if task.output is task_output:
+                        run_store.save_task_output(run_id, _build_checkpoint(index, task))
+                        break
+                if task_callback:
+                    task_callback(task_output)
+
+            # Phase 2: Créer et exécuter les agents dans l'ordre recommandé
+            notify("🚀 Phase 2 : Exécution des agents dans l'ordre recommandé...")
+            # Une reprise rejoue l'ordre enregistré : les checkpoints restent alignés sur leurs tâches
+            agent_order = _saved_agent_order(state.order, config_manager) if state else None
+            if agent_order is None:
+                agent_order = SequentialTaskManager(config_manager).parse_recommended_order(meta_result, available_agents)
+            agent_order = [name for name in agent_order if config_manager.get_agent_config(name)]
+            ordered_crew = build_ordered_crew_from_meta_result(
+                meta_result=meta_result,
+                problem_statement=problem_statement,
+                company_context=company_context,
+                config_manager=config_manager,
+                pdf_paths=pdf_paths,
+                available_agents=available_agents,
+                task_callback=checkpoint_callback,
+                step_callback=step_callback,
+                ordered_agents=agent_order
+            )
+            ordered_tasks.extend(ordered_crew.tasks)
+            run_store.save_order(run_id, agent_order)
+
+            restored = _restore_completed_tasks(ordered_tasks, state.tasks if state else {})
+            run_store.clear_tasks_from(run_id, restored)
+            if restored:
+                notify(f"⏯️ {restored} tâche(s) déjà terminée(s) restaurée(s), reprise à partir de la tâche {restored + 1}")
+                if task_callback:
+                    for task in ordered_tasks[:restored]:
+                        task_callback(task.output)
+
+            remaining_tasks = ordered_tasks[restored:]
+            if remaining_tasks:
+                # Les tâches restaurées restent dans le contexte des suivantes sans être ré-exécutées
+                ordered_crew.tasks = remaining_tasks
+                agents_result = str(ordered_crew.kickoff())
+                # Réécrit les checkpoints avec les tokens définitifs (comptés jusqu'à la fin de chaque tâche)
+                for index, task in enumerate(ordered_tasks[restored:], start=restored):
+                    if task.output is not None:
+                        run_store.save_task_output(run_id, _build_checkpoint(index, task))
+            else:
+                agents_result = ordered_tasks[-1].output.raw if ordered_tasks else ""
+        except Exception as e:
+            _record_model_summary(run_id, campaign_span.trace_id)
+            run_store.mark_failed(run_id, str(e))
+            _record_history(run_id)
+            raise
+
+    _record_model_summary(run_id, campaign_span.trace_id)
+    run_store.mark_completed(run_id)
+
+    # Combiner les résultats
+    result = f"{meta_result}\n\n---\n\nRÉSULTATS DES AGENTS:\n\n{agents_result}"
+    _record_history(run_id, result)
+    return meta_result, agents_result, result
+
+
+def resume_campaign(run_id: str, config_manager: AgentConfigManager = None,
+                    task_callback: Optional[Callable] = None, step_callback: Optional[Callable] = None,
+                    on_phase: Optional[Callable[[str], None]] = None) -> Tuple[str, str, str]:
+    """Reprend une exécution interrompue : seules les tâches non terminées sont relancées"""
+    state = get_run_store().load_run(run_id)
+    if state is None:
+        raise ValueError(f"Exécution inconnue : {run_id}")
+
+    return run_two_phase_campaign(
+        problem_statement=state.problem_statement,
+        company_context=state.company_context,
+        config_manager=config_manager,
+        pdf_paths=state.pdf_paths,
+        selected_agents=state.selected_agents,
+        task_callback=task_callback,
+        step_callback=step_callback,
+        on_phase=on_phase,
+        run_id=run_id
+    )
+
+
+_JOBS: Dict[str, CampaignJob] = {}
+_JOBS_LOCK = threading.Lock()
+
+
+def _prune_finished_jobs():
+    finished = sorted((job for job in _JOBS.values() if job.is_finished), key=lambda job: job.created_at)
+    for job in finished[:-MAX_FINISHED_JOBS]:
+        del _JOBS[job.job_id]
+
+
+def _launch_job(job: CampaignJob, runner: Callable[..., Tuple[str, str, str]]) -> CampaignJob:
+    """Enregistre le job et exécute runner(task_callback, step_callback, on_phase) dans un thread de fond"""
+
+    def task_callback(task_output):
+        agent = str(getattr(task_output, "agent", "") or "Agent")
+        raw = str(getattr(task_output, "raw", task_output))
+        job.agent_outputs[agent] = raw
+        job.push("task", f"✅ {agent} a terminé sa tâche", agent=agent, output=raw)
+
+    def step_callback(step):
+        job.push("step", _summarize_step(step))
+
+    def run():
+        job.status = "running"
+        try:
+            meta_result, _, result = runner(
+                task_callback=task_callback,
+                step_callback=step_callback,
+                on_phase=lambda message: job.push("phase", message)
+            )
+            job.meta_result = meta_result
+            job.result = result
+            job.status = "completed"
+            job.push("done", "✅ Campagne terminée avec succès !")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            job.push("error", f"❌ Erreur lors de l'exécution du crew : {e}")
+        finally:
+            job.finished_at = time.time()
+
+    with _JOBS_LOCK:
+        _prune_finished_jobs()
+        _JOBS[job.job_id] = job
+
+    threading.Thread(target=run, name=f"campaign-{job.job_id}", daemon=True).start()
+    return job
+
+
+def start_campaign_job(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None,
+                       pdf_paths: List[str] = None, selected_agents: List[str] = None, crew_name: str = "",
+                       use_plan_cache: bool = True) -> CampaignJob:
+    """Lance une campagne dans un thread de fond et retourne immédiatement le job
+
+    Les callbacks de tâche et d'étape alimentent la file d'événements du job :
+    l'interface la consulte périodiquement et affiche chaque output dès qu'il est prêt.
+    Le job est conservé au niveau du processus, un rafraîchissement du navigateur ne le perd pas.
+    Sa progression est aussi persistée dans l'exécution job.run_id, reprenable avec resume_campaign_job.
+    """
+    run_id = get_run_store().create_run(problem_statement, company_context, selected_agents, pdf_paths)
+    job = CampaignJob(job_id=uuid.uuid4().hex[:12], problem_statement=problem_statement, crew_name=crew_name, run_id=run_id)
+
+    return _launch_job(job, lambda **callbacks: run_two_phase_campaign(
+        problem_statement=problem_statement,
+        company_context=company_context,
+        config_manager=config_manager,
+        pdf_paths=pdf_paths,
+        selected_agents=selected_agents,
+        use_plan_cache=use_plan_cache,
+        run_id=run_id,
+        **callbacks
+    ))
+
+
+def resume_campaign_job(run_id: str, config_manager: AgentConfigManager = None, crew_name: str = "") -> CampaignJob:
+    """Reprend une exécution interrompue dans un thread de fond"""
+    state = get_run_store().load_run(run_id)
+    if state is None:
+        raise ValueError(f"Exécution inconnue : {run_id}")
+
+    job = CampaignJob(job_id=uuid.uuid4().hex[:12], problem_statement=state.problem_statement, crew_name=crew_name, run_id=run_id)
+    return _launch_job(job, lambda **callbacks: resume_campaign(run_id, config_manager=config_manager, **callbacks))
+
+
+def get_campaign_job(job_id: str) -> Optional[CampaignJob]:
+    """Retourne un job par son identifiant"""
+    with _JOBS_LOCK:
+        return _JOBS.get(job_id)
+
+
+def list_campaign_jobs() -> List[CampaignJob]:
+    """Retourne les jobs connus du processus, du plus récent au plus ancien"""
+    with _JOBS_LOCK:
+        return sorted(_JOBS.values(), key=lambda job: job.created_at, reverse=True)
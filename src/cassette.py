@@ -0,0 +1,229 @@
+from typing import Any, Dict, List, Optional
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+
+# Mode cassette : off, record (enregistre tout le trafic) ou replay (rejoue sans réseau)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_FILE = os.getenv("CASSETTE_FILE", os.path.join("cassettes", "campaign.jsonl"))
+# En replay strict, une requête absente de la cassette est une erreur ; sinon la prochaine
+# réponse enregistrée du même modèle (ou du même outil) est servie dans l'ordre
+CASSETTE_STRICT = os.getenv("CASSETTE_STRICT", "false").lower() in ("1", "true", "yes")
+
+
+class CassetteMiss(LookupError):
+    """Requête introuvable dans la cassette en mode replay"""
+
+
+def _request_key(kind: str, name: str, payload: Any) -> str:
+    data = json.dumps({"kind": kind, "name": name, "payload": payload}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Enregistre puis rejoue les complétions LLM, les embeddings et les résultats d'outils d'une campagne
+
+    Le fichier est un JSONL écrit au fil de l'eau (une ligne par interaction) : une
+    campagne interrompue pendant l'enregistrement reste rejouable jusqu'au point d'arrêt.
+    Chaque enregistrement est ajouté à la suite du fichier, sans effacer les précédents.
+    """
+
+    def __init__(self, path: str, mode: str, strict: bool = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Mode de cassette inconnu : {mode}")
+        self.path = os.path.abspath(path)
+        self.mode = mode
+        self.strict = CASSETTE_STRICT if strict is None else strict
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Réponses par clé exacte, puis par (type, nom) pour le replay non strict
+        self._by_key: Dict[str, List[Dict]] = defaultdict(list)
+        self._by_name: Dict[tuple, List[Dict]] = defaultdict(list)
+
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"kind": "header", "created_at": time.time()}) + "\n")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette introuvable : {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("kind") in ("llm", "embedding", "tool"):
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_name[(entry["kind"], entry["name"])].append(entry)
+        print(f"📼 Cassette chargée : {sum(len(entries) for entries in self._by_key.values())} interaction(s) ({self.path})")
+
+    def record(self, kind: str, name: str, payload: Any, response: Any):
+        """Ajoute une interaction à la cassette"""
+        entry = {"kind": kind, "name": name, "key": _request_key(kind, name, payload), "response": response}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    @staticmethod
+    def _next_entry(entries: List[Dict]) -> Optional[Dict]:
+        """Première réponse pas encore servie, sinon la dernière (requêtes répétées)"""
+        for entry in entries:
+            if not entry.get("_served"):
+                return entry
+        return entries[-1] if entries else None
+
+    def replay(self, kind: str, name: str, payload: Any, strict: bool = None) -> Any:
+        """Retourne la réponse enregistrée pour une requête"""
+        strict = self.strict if strict is None else strict
+        with self._lock:
+            entry = self._next_entry(self._by_key.get(_request_key(kind, name, payload), []))
+            if entry is None and not strict:
+                entry = self._next_entry(self._by_name.get((kind, name), []))
+            if entry is None:
+                self.misses += 1
+                raise CassetteMiss(f"📼 Aucune réponse enregistrée pour {kind} {name}")
+
+            entry["_served"] = True
+            self.hits += 1
+            return entry["response"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "path": self.path, "hits": self.hits, "misses": self.misses}
+
+
+_ACTIVE_CASSETTE: Optional[Cassette] = None
+_PATCH_LOCK = threading.Lock()
+_ORIGINAL_COMPLETION = None
+_ORIGINAL_EMBEDDINGS_CREATE = None
+
+
+def get_active_cassette() -> Optional[Cassette]:
+    return _ACTIVE_CASSETTE
+
+
+def _llm_payload(kwargs: Dict) -> Dict:
+    """Partie déterministe d'une requête LLM (sans clés API ni callbacks)"""
+    return {
+        "model": kwargs.get("model"),
+        "messages": kwargs.get("messages"),
+        "stop": kwargs.get("stop"),
+        "temperature": kwargs.get("temperature"),
+        "tools": kwargs.get("tools"),
+    }
+
+
+def _cassette_completion(*args, **kwargs):
+    """Remplace litellm.completion : enregistre ou rejoue la réponse"""
+    cassette = _ACTIVE_CASSETTE
+    if cassette is None or args or kwargs.get("stream"):
+        return _ORIGINAL_COMPLETION(*args, **kwargs)
+
+    model = str(kwargs.get("model"))
+    payload = _llm_payload(kwargs)
+    if cassette.mode == "replay":
+        content = cassette.replay("llm", model, payload)
+        # mock_response : LiteLLM construit une vraie ModelResponse sans réseau (les callbacks de traçage restent appelés)
+        return _ORIGINAL_COMPLETION(**dict(kwargs, mock_response=content))
+
+    response = _ORIGINAL_COMPLETION(**kwargs)
+    cassette.record("llm", model, payload, response.choices[0].message.content)
+    return response
+
+
+def _cassette_embeddings_create(self, *args, **kwargs):
+    """Remplace Embeddings.create du client OpenAI (index de connaissances et sources CrewAI)"""
+    cassette = _ACTIVE_CASSETTE
+    if cassette is None or args:
+        return _ORIGINAL_EMBEDDINGS_CREATE(self, *args, **kwargs)
+
+    from openai.types import CreateEmbeddingResponse, Embedding
+
+    model = str(kwargs.get("model"))
+    payload = {"model": model, "input": kwargs.get("input"), "dimensions": kwargs.get("dimensions")}
+    if cassette.mode == "replay":
+        # Toujours strict : le vecteur d'un autre texte fausserait la recherche
+        vectors = cassette.replay("embedding", model, payload, strict=True)
+        return CreateEmbeddingResponse(
+            data=[Embedding(embedding=vector, index=index, object="embedding") for index, vector in enumerate(vectors)],
+            model=model,
+            object="list",
+            usage={"prompt_tokens": 0, "total_tokens": 0},
+        )
+
+    response = _ORIGINAL_EMBEDDINGS_CREATE(self, *args, **kwargs)
+    cassette.record("embedding", model, payload, [item.embedding for item in sorted(response.data, key=lambda item: item.index)])
+    return response
+
+
+def cassette_tool_middleware(tool, call_next, *args, **kwargs):
+    """Middleware d'outil : enregistre ou rejoue le résultat de chaque appel"""
+    cassette = _ACTIVE_CASSETTE
+    if cassette is None:
+        return call_next(*args, **kwargs)
+
+    name = getattr(tool, "name", type(tool).__name__)
+    payload = {"args": args, "kwargs": kwargs}
+    if cassette.mode == "replay":
+        return cassette.replay("tool", name, payload)
+
+    result = call_next(*args, **kwargs)
+    cassette.record("tool", name, payload, str(result))
+    return result
+
+
+def _install_hooks():
+    """Intercepte litellm.completion, les embeddings OpenAI et les appels d'outils (une seule fois par processus)"""
+    global _ORIGINAL_COMPLETION, _ORIGINAL_EMBEDDINGS_CREATE
+    import litellm
+    from .tools import register_tool_middleware
+
+    if _ORIGINAL_COMPLETION is None:
+        _ORIGINAL_COMPLETION = litellm.completion
+        litellm.completion = _cassette_completion
+        try:
+            import crewai.llm as crewai_llm
+            # Certaines versions de CrewAI importent directement `completion`
+            if getattr(crewai_llm, "completion", None) is _ORIGINAL_COMPLETION:
+                crewai_llm.completion = _cassette_completion
+        except ImportError:
+            pass
+    if _ORIGINAL_EMBEDDINGS_CREATE is None:
+        try:
+            # Tous les clients OpenAI du processus passent par cette méthode (index de connaissances, Chroma)
+            from openai.resources.embeddings import Embeddings
+            _ORIGINAL_EMBEDDINGS_CREATE = Embeddings.create
+            Embeddings.create = _cassette_embeddings_create
+        except ImportError:
+            pass
+    register_tool_middleware(cassette_tool_middleware)
+
+
+def activate_cassette(path: str, mode: str, strict: bool = None) -> Cassette:
+    """Active une cassette pour tout le processus (record ou replay)"""
+    global _ACTIVE_CASSETTE
+    with _PATCH_LOCK:
+        _install_hooks()
+        _ACTIVE_CASSETTE = Cassette(path, mode, strict)
+        print(f"📼 Cassette active en mode {mode} : {_ACTIVE_CASSETTE.path}")
+        return _ACTIVE_CASSETTE
+
+
+def deactivate_cassette():
+    """Désactive la cassette : le trafic repasse par le réseau"""
+    global _ACTIVE_CASSETTE
+    with _PATCH_LOCK:
+        _ACTIVE_CASSETTE = None
+
+
+def activate_cassette_from_env() -> Optional[Cassette]:
+    """Active la cassette décrite par CASSETTE_MODE / CASSETTE_FILE (idempotent)"""
+    if CASSETTE_MODE in ("", "off") or _ACTIVE_CASSETTE is not None:
+        return _ACTIVE_CASSETTE
+    return activate_cassette(CASSETTE_FILE, CASSETTE_MODE)
@@ -0,0 +1,251 @@
+from dataclasses import asdict, fields
+from typing import Any, Callable, Dict, List, Optional
+import os
+import json
+import time
+import sqlite3
+import weakref
+import threading
+
+CONFIG_DB = os.getenv("CONFIG_DB", os.path.join("config", "config.db"))
+# Intervalle minimal entre deux vérifications des modifications faites par d'autres processus
+CONFIG_REFRESH_SECONDS = float(os.getenv("CONFIG_REFRESH_SECONDS", "2"))
+
+
+class ConfigStore:
+    """Configuration persistante et versionnée des agents et des crews (SQLite)
+
+    Le contenu est chargé une fois par processus et partagé par toutes les sessions :
+    les lectures retournent les objets en mémoire, sans copie. Chaque écriture
+    incrémente la version de l'entrée (l'historique est conservé) et la révision
+    globale ; les autres processus rechargent la configuration quand celle-ci change.
+    Les listeners enregistrés sont notifiés de chaque modification (kind, name).
+    """
+
+    def __init__(self, db_path: str = None, refresh_seconds: float = None):
+        self.db_path = os.path.abspath(db_path or CONFIG_DB)
+        self.refresh_seconds = CONFIG_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._lock = threading.RLock()
+        self._types: Dict[str, type] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, Dict[str, int]] = {}
+        self._listeners: List[weakref.ReferenceType] = []
+        self._revision = -1
+        self._checked_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS config_entries (
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    data TEXT,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, name)
+                );
+                CREATE TABLE IF NOT EXISTS config_history (
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    data TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, name, version)
+                );
+                CREATE TABLE IF NOT EXISTS config_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                INSERT OR IGNORE INTO config_meta (key, value) VALUES ('revision', '0');
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def register_kind(self, kind: str, config_type: type):
+        """Associe un type de configuration (dataclass) à ses entrées"""
+        with self._lock:
+            if kind not in self._types:
+                self._types[kind] = config_type
+                self._revision = -1
+
+    def add_listener(self, listener: Callable[[str, Optional[str]], None]):
+        """Abonne un listener aux modifications, appelé avec (kind, name)
+
+        Seule une référence faible est conservée : un gestionnaire de session
+        disparu n'est plus notifié.
+        """
+        ref = weakref.WeakMethod(listener) if hasattr(listener, "__self__") else weakref.ref(listener)
+        with self._lock:
+            self._listeners.append(ref)
+
+    def _notify(self, kind: str, name: Optional[str]):
+        with self._lock:
+            self._listeners = [ref for ref in self._listeners if ref() is not None]
+            listeners = [ref() for ref in self._listeners]
+        for listener in listeners:
+            if listener is not None:
+                try:
+                    listener(kind, name)
+                except Exception as e:
+                    print(f"⚠️ Listener de configuration en échec : {e}")
+
+    def _decode(self, kind: str, data: str) -> Any:
+        values = json.loads(data)
+        config_type = self._types[kind]
+        known = {field.name for field in fields(config_type)}
+        return config_type(**{key: value for key, value in values.items() if key in known})
+
+    def _read_revision(self, conn: sqlite3.Connection) -> int:
+        return int(conn.execute("SELECT value FROM config_meta WHERE key = 'revision'").fetchone()[0])
+
+    def _reload(self, conn: sqlite3.Connection, revision: int) -> List[tuple]:
+        """Recharge les entrées et retourne les (kind, name) modifiés depuis le dernier chargement"""
+        entries: Dict[str, Dict[str, Any]] = {kind: {} for kind in self._types}
+        versions: Dict[str, Dict[str, int]] = {kind: {} for kind in self._types}
+        for kind, name, data, version in conn.execute(
+            "SELECT kind, name, data, version FROM config_entries ORDER BY rowid"
+        ):
+            if kind not in self._types:
+                continue
+            versions[kind][name] = version
+            if data is not None:
+                previous = self._entries.get(kind, {}).get(name)
+                # Une entrée inchangée garde son objet : les sessions qui le référencent restent à jour
+                unchanged = previous is not None and self._versions.get(kind, {}).get(name) == version
+                entries[kind][name] = previous if unchanged else self._decode(kind, data)
+
+        changed = []
+        for kind in self._types:
+            old_versions = self._versions.get(kind, {})
+            for name in set(old_versions) | set(versions[kind]):
+                if old_versions.get(name) != versions[kind].get(name):
+                    changed.append((kind, name))
+        self._entries, self._versions, self._revision = entries, versions, revision
+        return changed
+
+    def _refresh(self, force: bool = False):
+        """Recharge la configuration si un autre processus l'a modifiée"""
+        now = time.time()
+        with self._lock:
+            if not force and self._revision >= 0 and now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+            with self._connect() as conn:
+                revision = self._read_revision(conn)
+                if revision == self._revision:
+                    return
+                changed = self._reload(conn, revision)
+        for kind, name in changed:
+            self._notify(kind, name)
+
+    def get_all(self, kind: str) -> Dict[str, Any]:
+        """Entrées actives d'un type
+
+        Le dictionnaire est partagé et jamais modifié en place (chaque écriture en crée un
+        nouveau) : il peut être parcouru sans verrou, mais ne doit pas être modifié directement.
+        """
+        self._refresh()
+        return self._entries.get(kind, {})
+
+    def get(self, kind: str, name: str) -> Optional[Any]:
+        return self.get_all(kind).get(name)
+
+    def get_version(self, kind: str, name: str) -> Optional[int]:
+        self._refresh()
+        return self._versions.get(kind, {}).get(name)
+
+    def _write(self, conn: sqlite3.Connection, kind: str, name: str, config: Optional[Any], now: float) -> int:
+        data = None if config is None else json.dumps(asdict(config), ensure_ascii=False, sort_keys=True)
+        row = conn.execute("SELECT version FROM config_entries WHERE kind = ? AND name = ?", (kind, name)).fetchone()
+        version = (row[0] if row else 0) + 1
+        # Upsert plutôt que REPLACE : la ligne garde son rowid, donc l'ordre de création des entrées
+        conn.execute("""
+            INSERT INTO config_entries (kind, name, data, version, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (kind, name) DO UPDATE SET
+                data = excluded.data, version = excluded.version, updated_at = excluded.updated_at
+        """, (kind, name, data, version, now))
+        conn.execute(
+            "INSERT INTO config_history (kind, name, version, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, name, version, data, now)
+        )
+        return version
+
+    def _commit_changes(self, kind: str, changes: Dict[str, Optional[Any]]):
+        """Écrit un lot de modifications (None = suppression) dans une seule transaction"""
+        now = time.time()
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                versions = {name: self._write(conn, kind, name, config, now) for name, config in changes.items()}
+                conn.execute("UPDATE config_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+                revision = self._read_revision(conn)
+                # Un autre processus a écrit depuis le dernier chargement : rechargement complet
+                changed = self._reload(conn, revision) if revision != self._revision + 1 else []
+
+            # Copie sur écriture : une session qui parcourt l'ancien dictionnaire n'est pas perturbée
+            entries = dict(self._entries.get(kind, {}))
+            kind_versions = dict(self._versions.get(kind, {}))
+            for name, config in changes.items():
+                kind_versions[name] = versions[name]
+                if config is None:
+                    entries.pop(name, None)
+                else:
+                    entries[name] = config
+            self._entries = {**self._entries, kind: entries}
+            self._versions = {**self._versions, kind: kind_versions}
+            self._revision = revision
+            self._checked_at = time.time()
+
+        for changed_kind, name in set(changed) | {(kind, name) for name in changes}:
+            self._notify(changed_kind, name)
+
+    def put(self, kind: str, name: str, config: Any):
+        """Crée ou met à jour une entrée (nouvelle version)"""
+        self._commit_changes(kind, {name: config})
+
+    def delete(self, kind: str, name: str):
+        """Supprime une entrée (la suppression est une version de l'historique)"""
+        self._commit_changes(kind, {name: None})
+
+    def replace_all(self, kind: str, configs: Dict[str, Any]):
+        """Remplace toutes les entrées d'un type (réinitialisation)"""
+        self._refresh(force=True)
+        changes: Dict[str, Optional[Any]] = {name: None for name in self._entries.get(kind, {}) if name not in configs}
+        changes.update(configs)
+        self._commit_changes(kind, changes)
+
+    def seed(self, kind: str, configs: Dict[str, Any]) -> bool:
+        """Enregistre les configurations par défaut si ce type n'a encore jamais été initialisé"""
+        self._refresh(force=True)
+        with self._lock:
+            with self._connect() as conn:
+                seeded = conn.execute("SELECT 1 FROM config_meta WHERE key = ?", (f"seeded:{kind}",)).fetchone()
+                if seeded:
+                    return False
+                conn.execute("INSERT OR IGNORE INTO config_meta (key, value) VALUES (?, '1')", (f"seeded:{kind}",))
+        if not self._versions.get(kind):
+            self._commit_changes(kind, dict(configs))
+        return True
+
+    def get_history(self, kind: str, name: str) -> List[Dict[str, Any]]:
+        """Versions successives d'une entrée, de la plus récente à la plus ancienne"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT version, data, updated_at FROM config_history WHERE kind = ? AND name = ? ORDER BY version DESC",
+                (kind, name)
+            ).fetchall()
+        return [{"version": version, "data": json.loads(data) if data else None, "updated_at": updated_at}
+                for version, data, updated_at in rows]
+
+
+_CONFIG_STORE: Optional[ConfigStore] = None
+_CONFIG_STORE_LOCK = threading.Lock()
+
+
+def get_config_store() -> ConfigStore:
+    """Retourne le stockage de configuration partagé par le processus"""
+    global _CONFIG_STORE
+    with _CONFIG_STORE_LOCK:
+        if _CONFIG_STORE is None:
+            _CONFIG_STORE = ConfigStore()
+        return _CONFIG_STORE
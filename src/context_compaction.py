@@ -0,0 +1,155 @@
+from typing import List, Optional
+import os
+import hashlib
+import tempfile
+import threading
+from .tracing import TracedTask
+
+# Budget global (en tokens) du contexte transmis à une tâche ; 0 désactive la compaction
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Résumés mis en cache sur disque (un fichier par sortie amont et par budget)
+CONTEXT_SUMMARY_DIR = os.getenv("CONTEXT_SUMMARY_DIR", os.path.join("cache", "context_summaries"))
+# Séparateur utilisé par CrewAI pour agréger les sorties des tâches amont
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+SUMMARY_PROMPT = """Tu compresses le travail d'un agent pour le transmettre à l'agent suivant d'une équipe marketing.
+Produis un résumé structuré d'au plus {budget} tokens, en français, avec ces sections :
+## Points clés
+## Données, chiffres et sources
+## Décisions et recommandations
+## Éléments à réutiliser tels quels
+Règles :
+- Conserve INTÉGRALEMENT toute section adressée à un agent (par exemple "## TÂCHE POUR ...")
+- Conserve les chiffres, noms propres, URLs et citations exacts
+- N'invente rien et n'ajoute aucun commentaire
+
+Travail de l'agent "{agent}" :
+{content}"""
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Compte les tokens d'un texte (tiktoken si disponible, sinon ~4 caractères par token)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def resolve_context_budget(agent_config) -> int:
+    """Budget de contexte d'un agent : sa configuration, sinon le budget global"""
+    budget = getattr(agent_config, "context_token_budget", None)
+    return DEFAULT_CONTEXT_TOKEN_BUDGET if budget is None else budget
+
+
+class ContextCompactor:
+    """Résume les sorties amont trop volumineuses, avec un cache persistant des résumés
+
+    Un résumé est identifié par le SHA-256 du texte source, le budget et le modèle :
+    une même sortie n'est jamais résumée deux fois, y compris entre deux exécutions.
+    """
+
+    def __init__(self, cache_dir: str = None, model: str = None):
+        self.cache_dir = os.path.abspath(cache_dir or CONTEXT_SUMMARY_DIR)
+        self.model = model
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_model(self) -> str:
+        return self.model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+    def _cache_path(self, text: str, budget: int) -> str:
+        digest = hashlib.sha256(f"{self._get_model()}\n{budget}\n{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.md")
+
+    def summarize(self, text: str, budget: int, agent: str = "") -> str:
+        """Retourne le résumé structuré d'une sortie (depuis le cache si possible)"""
+        cache_path = self._cache_path(text, budget)
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        from .llm_governor import GovernedLLM
+
+        llm = GovernedLLM(model=self._get_model(), temperature=0, max_tokens=max(budget, 256))
+        summary = str(llm.call([{
+            "role": "user",
+            "content": SUMMARY_PROMPT.format(budget=budget, agent=agent or "précédent", content=text)
+        }])).strip()
+
+        # Écriture atomique : deux tâches parallèles peuvent résumer la même sortie
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(summary)
+            os.replace(tmp_path, cache_path)
+        return summary
+
+    def compact(self, outputs: List[tuple], budget: int) -> str:
+        """Compacte une liste de sorties amont (agent, texte) pour tenir dans le budget
+
+        Les sorties qui dépassent leur part du budget sont résumées, les plus courtes
+        sont transmises telles quelles.
+        """
+        sizes = [count_tokens(text) for _, text in outputs]
+        if sum(sizes) <= budget:
+            return CONTEXT_DIVIDER.join(text for _, text in outputs)
+
+        # Le budget laissé libre par les petites sorties est redistribué aux grosses
+        small = sum(size for size in sizes if size <= budget // len(outputs))
+        large_count = sum(1 for size in sizes if size > budget // len(outputs))
+        share = max((budget - small) // max(large_count, 1), 256)
+
+        parts = []
+        for (agent, text), size in zip(outputs, sizes):
+            if size > budget // len(outputs):
+                print(f"🗜️ Contexte de {agent or 'un agent'} compacté : {size} → ~{share} tokens")
+                text = self.summarize(text, share, agent)
+            parts.append(text)
+        return CONTEXT_DIVIDER.join(parts)
+
+
+_CONTEXT_COMPACTOR: Optional[ContextCompactor] = None
+_CONTEXT_COMPACTOR_LOCK = threading.Lock()
+
+
+def get_context_compactor() -> ContextCompactor:
+    """Retourne le compacteur de contexte partagé par le processus"""
+    global _CONTEXT_COMPACTOR
+    with _CONTEXT_COMPACTOR_LOCK:
+        if _CONTEXT_COMPACTOR is None:
+            _CONTEXT_COMPACTOR = ContextCompactor()
+        return _CONTEXT_COMPACTOR
+
+
+class CompactingTask(TracedTask):
+    """Task CrewAI dont le contexte amont est compacté s'il dépasse le budget de l'agent"""
+
+    context_token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET
+
+    def _prepare_context(self, context: Optional[str]) -> Optional[str]:
+        if not context or self.context_token_budget <= 0 or count_tokens(context) <= self.context_token_budget:
+            return context
+
+        upstream = [task.output for task in (self.context if isinstance(self.context, list) else [])
+                    if getattr(task, "output", None) is not None]
+        if upstream:
+            outputs = [(str(output.agent or ""), str(output.raw)) for output in upstream]
+        else:
+            outputs = [("", context)]
+
+        try:
+            return get_context_compactor().compact(outputs, self.context_token_budget)
+        except Exception as e:
+            # La compaction est une optimisation : en cas d'échec, le contexte complet est transmis
+            print(f"⚠️ Compaction du contexte impossible, contexte complet conservé : {e}")
+            return context
+
+    def execute_async(self, agent=None, context: Optional[str] = None, tools=None):
+        return super().execute_async(agent=agent, context=self._prepare_context(context), tools=tools)
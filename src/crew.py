@@ -1,9 +1,12 @@
-from crewai import Crew, Process
+from crewai import Process
 from .agents import create_all_agents, create_agent_from_config
 from .sequential_tasks import create_sequential_tasks_from_problem, SequentialTaskManager
 from .agent_config import AgentConfigManager
-from typing import List, Optional
+from .tracing import TracedCrew
+from typing import Callable, List, Optional
 
+# Agents utilisés par défaut pour une campagne en deux phases
+DEFAULT_CAMPAIGN_AGENTS = ["meta_manager_agent", "clara_detective_digitale", "julien_analyste_strategique", "sophie_plume_solidaire"]
 
 def build_dynamic_marketing_crew(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, selected_agents: List[str] = None):
     """Construit l'équipe marketing dynamique basée sur une problématique spécifique"""
@@ -27,21 +30,21 @@ def build_dynamic_marketing_crew(problem_statement: str, company_context: str =
     task_agents = [agent for agent in selected_agents if agent != "meta_manager_agent"]
     tasks = create_sequential_tasks_from_problem(problem_statement, company_context, config_manager, task_agents)
 
-    return Crew(
+    return TracedCrew(
         agents=list(agents.values()),
         tasks=tasks,
         process=Process.sequential,
         verbose=True,
     )
 
-def build_two_phase_marketing_crew(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, selected_agents: List[str] = None):
+def build_two_phase_marketing_crew(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, selected_agents: List[str] = None, task_callback: Optional[Callable] = None, step_callback: Optional[Callable] = None):
     """Construit une équipe marketing en deux phases : Meta Manager puis agents dans l'ordre recommandé"""
     if config_manager is None:
         config_manager = AgentConfigManager()
     
     # Utiliser les agents par défaut si aucun n'est fourni
     if selected_agents is None:
-        selected_agents = ["meta_manager_agent", "clara_detective_digitale", "julien_analyste_strategique", "sophie_plume_solidaire"]
+        selected_agents = DEFAULT_CAMPAIGN_AGENTS
     
     # Phase 1: Créer et exécuter le Meta Manager seul
     meta_agent = create_agent_from_config("meta_manager_agent", config_manager, pdf_paths)
@@ -54,16 +57,18 @@ def build_two_phase_marketing_crew(problem_statement: str, company_context: str
     meta_task = task_manager.create_meta_manager_task(problem_statement, company_context, available_agents)
     
     # Créer un crew temporaire pour le Meta Manager
-    meta_crew = Crew(
+    meta_crew = TracedCrew(
         agents=[meta_agent],
         tasks=[meta_task],
         process=Process.sequential,
         verbose=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     
     return meta_crew, task_manager, available_agents
 
-def build_crew_with_json_plan(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, selected_agents: List[str] = None) -> Crew:
+def build_crew_with_json_plan(problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, selected_agents: List[str] = None):
     """Construit un crew où le Meta Manager génère un plan JSON pour créer les vraies Task CrewAI
     
     Args:
@@ -75,6 +80,7 @@ def build_crew_with_json_plan(problem_statement: str, company_context: str = "",
     
     Returns:
         Crew: Un crew CrewAI avec des tâches générées dynamiquement par le Meta Manager
+        (ou un ParallelTaskScheduler si le plan est "async", avec la même méthode kickoff())
         
     Example:
         crew = build_crew_with_json_plan(
@@ -92,8 +98,11 @@ def build_crew_with_json_plan(problem_statement: str, company_context: str = "",
         problem_statement, company_context, pdf_paths, selected_agents
     )
 
-def build_ordered_crew_from_meta_result(meta_result: str, problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, available_agents: List[str] = None):
-    """Crée un crew avec les agents dans l'ordre recommandé par le Meta Manager"""
+def build_ordered_crew_from_meta_result(meta_result: str, problem_statement: str, company_context: str = "", config_manager: AgentConfigManager = None, pdf_paths: List[str] = None, available_agents: List[str] = None, task_callback: Optional[Callable] = None, step_callback: Optional[Callable] = None, ordered_agents: List[str] = None):
+    """Crée un crew avec les agents dans l'ordre recommandé par le Meta Manager
+    
+    ordered_agents impose un ordre déjà connu (reprise d'une exécution) au lieu de le relire dans le plan.
+    """
     if config_manager is None:
         config_manager = AgentConfigManager()
     
@@ -102,7 +111,8 @@ def build_ordered_crew_from_meta_result(meta_result: str, problem_statement: str
     
     # Créer le gestionnaire de tâches et obtenir l'ordre recommandé
     task_manager = SequentialTaskManager(config_manager)
-    ordered_agents = task_manager.parse_recommended_order(meta_result, available_agents)
+    if ordered_agents is None:
+        ordered_agents = task_manager.parse_recommended_order(meta_result, available_agents)
     
     # Créer les agents dans l'ordre recommandé
     agents = []
@@ -114,17 +124,19 @@ def build_ordered_crew_from_meta_result(meta_result: str, problem_statement: str
             print(f"⚠️ Erreur lors de la création de l'agent {agent_name}: {e}")
     
     # Créer les tâches dans l'ordre recommandé avec le contexte du Meta Manager
+    # L'ordre est déjà résolu : le plan n'est pas re-parsé
     tasks = task_manager.create_ordered_sequential_tasks(
         problem_statement, 
         company_context, 
-        ordered_agents, 
-        meta_result
+        ordered_agents
     )
     
-    return Crew(
+    return TracedCrew(
         agents=agents,
         tasks=tasks,
         process=Process.sequential,
         verbose=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
 
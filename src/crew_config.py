@@ -1,6 +1,7 @@
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from .agent_config import AgentConfigManager, AgentConfig
+from .config_store import ConfigStore
 
 @dataclass
 class CrewConfig:
@@ -11,17 +12,34 @@ class CrewConfig:
     process_type: str = "sequential"  # sequential, hierarchical, etc.
     # Optionnel: tâches préconfigurées (souvent gérées dynamiquement ailleurs)
     tasks: List[str] = None
+    # Collections de knowledge/ accessibles à la campagne (None = tous les PDFs) ;
+    # chaque agent est ensuite restreint à ses propres collections
+    knowledge_collections: Optional[List[str]] = None
 
 class CrewConfigManager:
-    """Gestionnaire de configuration des crews"""
+    """Gestionnaire de configuration des crews (stockage partagé avec celui des agents)"""
     
-    def __init__(self, agent_config_manager: AgentConfigManager):
+    def __init__(self, agent_config_manager: AgentConfigManager, store: ConfigStore = None):
         self.agent_config_manager = agent_config_manager
-        self.crews_config: Dict[str, CrewConfig] = {}
+        self.store = store or agent_config_manager.store
+        self.store.register_kind("crew", CrewConfig)
         self._init_default_crews()
     
+    @property
+    def crews_config(self) -> Dict[str, CrewConfig]:
+        return self.store.get_all("crew")
+    
     def _init_default_crews(self):
-        """Initialise les crews par défaut"""
+        """Initialise les crews par défaut (une seule fois, dans le stockage partagé)"""
+        self.store.seed("crew", self._build_default_crews())
+    
+    def reset_to_defaults(self):
+        """Remplace tous les crews par ceux par défaut"""
+        self.store.replace_all("crew", self._build_default_crews())
+    
+    @staticmethod
+    def _build_default_crews() -> Dict[str, CrewConfig]:
+        """Crews par défaut"""
         # Crew marketing par défaut
         default_marketing_crew = CrewConfig(
             name="Crew Marketing Standard",
@@ -30,9 +48,10 @@ class CrewConfigManager:
                            "julien_analyste_strategique", "sophie_plume_solidaire"]
         )
         
-        self.crews_config["marketing_standard"] = default_marketing_crew
+        return {"marketing_standard": default_marketing_crew}
     
-    def create_new_crew(self, name: str, description: str, selected_agents: List[str]) -> str:
+    def create_new_crew(self, name: str, description: str, selected_agents: List[str],
+                        knowledge_collections: Optional[List[str]] = None) -> str:
         """Crée un nouveau crew"""
         # Générer un nom unique si nécessaire
         original_name = name
@@ -45,23 +64,24 @@ class CrewConfigManager:
             name=name,
             description=description,
             selected_agents=selected_agents,
-            tasks=[]
+            tasks=[],
+            knowledge_collections=knowledge_collections
         )
         
-        self.crews_config[name] = crew_config
+        self.store.put("crew", name, crew_config)
         return name
     
     def delete_crew(self, crew_name: str) -> bool:
         """Supprime un crew"""
         if crew_name in self.crews_config:
-            del self.crews_config[crew_name]
+            self.store.delete("crew", crew_name)
             return True
         return False
     
     def update_crew_config(self, crew_name: str, crew_config: CrewConfig) -> bool:
         """Met à jour la configuration d'un crew"""
         if crew_name in self.crews_config:
-            self.crews_config[crew_name] = crew_config
+            self.store.put("crew", crew_name, crew_config)
             return True
         return False
     
@@ -85,7 +105,8 @@ class CrewConfigManager:
                 name: {
                     "description": crew.description,
                     "selected_agents": crew.selected_agents,
-                    "process_type": crew.process_type
+                    "process_type": crew.process_type,
+                    "knowledge_collections": crew.knowledge_collections
                 }
                 for name, crew in self.crews_config.items()
             }
@@ -99,7 +120,8 @@ class CrewConfigManager:
                     name=crew_name,
                     description=crew_data.get("description", ""),
                     selected_agents=crew_data.get("selected_agents", []),
-                    process_type=crew_data.get("process_type", "sequential")
+                    process_type=crew_data.get("process_type", "sequential"),
+                    knowledge_collections=crew_data.get("knowledge_collections")
                 )
                 
-                self.crews_config[crew_name] = crew_config
+                self.store.put("crew", crew_name, crew_config)
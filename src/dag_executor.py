@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+import os
+import contextvars
+from crewai import Task, Crew, Process
+from crewai.crews.crew_output import CrewOutput
+from .tracing import get_tracer
+
+# Nombre maximum de tâches exécutées simultanément
+MAX_PARALLEL_TASKS = int(os.getenv("MAX_PARALLEL_TASKS", "4"))
+
+
+def topological_layers(dependencies: Dict[str, List[str]]) -> List[List[str]]:
+    """Trie topologiquement un graphe de dépendances par niveaux (algorithme de Kahn)
+
+    Args:
+        dependencies: nœud -> liste des nœuds dont il dépend (les nœuds inconnus sont ignorés)
+
+    Returns:
+        List[List[str]]: niveaux successifs ; les nœuds d'un même niveau sont indépendants
+    """
+    remaining = {node: [dep for dep in deps if dep in dependencies and dep != node]
+                 for node, deps in dependencies.items()}
+    layers = []
+
+    while remaining:
+        ready = [node for node, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"❌ Dépendances circulaires entre les tâches : {', '.join(remaining.keys())}")
+        layers.append(ready)
+        for node in ready:
+            del remaining[node]
+        for deps in remaining.values():
+            deps[:] = [dep for dep in deps if dep not in ready]
+
+    return layers
+
+
+class ParallelTaskScheduler:
+    """Exécute un DAG de Task CrewAI en parallèle dans un pool de workers borné
+
+    Les dépendances sont lues dans `task.context` : une tâche démarre dès que toutes
+    ses tâches amont sont terminées et reçoit leurs TaskOutput comme contexte.
+    Deux tâches confiées au même agent ne s'exécutent jamais simultanément.
+    Expose `kickoff()` comme un Crew pour rester interchangeable avec lui.
+    """
+
+    def __init__(self, tasks: List[Task], max_workers: int = None, verbose: bool = True,
+                 task_callback: Optional[Callable] = None, step_callback: Optional[Callable] = None):
+        self.tasks = tasks
+        self.agents = list({id(task.agent): task.agent for task in tasks}.values())
+        self.max_workers = max_workers or MAX_PARALLEL_TASKS
+        self.verbose = verbose
+        self.task_callback = task_callback
+        self.step_callback = step_callback
+
+    def _dependencies(self) -> Dict[int, List[int]]:
+        """Indices des tâches amont de chaque tâche (via task.context)"""
+        indices = {id(task): i for i, task in enumerate(self.tasks)}
+        dependencies = {}
+        for i, task in enumerate(self.tasks):
+            context = task.context if isinstance(task.context, list) else []
+            dependencies[i] = [indices[id(dep)] for dep in context if id(dep) in indices]
+        return dependencies
+
+    def _run_task(self, task: Task):
+        """Exécute une tâche dans un crew dédié (les sorties amont sont lues via task.context)"""
+        crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=self.verbose,
+            task_callback=self.task_callback,
+            step_callback=self.step_callback,
+        )
+        crew.kickoff()
+        return task.output
+
+    def kickoff(self) -> CrewOutput:
+        """Lance l'exécution parallèle du DAG et retourne une sortie agrégée de type CrewOutput"""
+        with get_tracer().span("crew", "DAG parallèle", tasks=len(self.tasks), max_workers=self.max_workers) as span:
+            result = self._kickoff()
+            span.attributes["tokens_in"] = result.token_usage.prompt_tokens
+            span.attributes["tokens_out"] = result.token_usage.completion_tokens
+            return result
+
+    def _kickoff(self) -> CrewOutput:
+        dependencies = self._dependencies()
+        # Vérifie l'absence de cycle avant de lancer quoi que ce soit
+        layers = topological_layers({str(i): [str(dep) for dep in deps] for i, deps in dependencies.items()})
+        print(f"🧩 Plan parallèle : {len(layers)} niveau(x), jusqu'à {self.max_workers} tâche(s) simultanée(s)")
+
+        outputs = {}
+        running = {}
+        busy_agents = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-task") as executor:
+            while len(outputs) < len(self.tasks):
+                for i, task in enumerate(self.tasks):
+                    if i in outputs or i in running.values() or id(task.agent) in busy_agents:
+                        continue
+                    if all(dep in outputs for dep in dependencies[i]):
+                        # Copie du contexte : les spans des tâches restent rattachés à celui du DAG
+                        future = executor.submit(contextvars.copy_context().run, self._run_task, task)
+                        running[future] = i
+                        busy_agents.add(id(task.agent))
+                        print(f"▶️ Démarrage de la tâche de {task.agent.role}")
+
+                if not running:
+                    raise ValueError("❌ Aucune tâche exécutable : vérifiez les dépendances du plan")
+
+                done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    busy_agents.discard(id(self.tasks[i].agent))
+                    try:
+                        outputs[i] = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    print(f"✅ Tâche terminée : {self.tasks[i].agent.role}")
+
+        tasks_output = [outputs[i] for i in range(len(self.tasks))]
+        # Résultat final : une tâche puits (dont aucune autre ne dépend) du dernier niveau du DAG,
+        # et non la dernière de la liste, qui peut être une étape intermédiaire
+        final_output = outputs[int(layers[-1][-1])] if layers else None
+        return CrewOutput(
+            raw=final_output.raw if final_output is not None else "",
+            tasks_output=tasks_output,
+            token_usage=self._usage_metrics(),
+        )
+
+    def _usage_metrics(self):
+        """Agrège la consommation de tokens des agents (au mieux selon la version de CrewAI)"""
+        from crewai.types.usage_metrics import UsageMetrics
+
+        usage = UsageMetrics()
+        for agent in self.agents:
+            token_process = getattr(agent, "_token_process", None)
+            if token_process is not None:
+                usage.add_usage_metrics(token_process.get_summary())
+        return usage
@@ -0,0 +1,207 @@
+from typing import Any, Dict, List, Optional
+import os
+import time
+import sqlite3
+import threading
+
+HISTORY_DB = os.getenv("HISTORY_DB", os.path.join("history", "campaigns.db"))
+# Index de la sortie du Meta Manager parmi les sorties d'une campagne
+META_MANAGER_INDEX = -1
+
+
+def _fts_query(query: str) -> str:
+    """Transforme une saisie libre en requête FTS5 (chaque mot entre guillemets, préfixe sur le dernier)"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class HistoryStore:
+    """Historique persistant (SQLite) des campagnes et des sorties de leurs agents
+
+    Une ligne par campagne (runs) et une par sortie de tâche (outputs), indexées
+    en plein texte par FTS5 : la recherche est classée par bm25 et renvoie des extraits.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or HISTORY_DB
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    problem_statement TEXT NOT NULL,
+                    company_context TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at DESC);
+
+                CREATE TABLE IF NOT EXISTS outputs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+                    task_index INTEGER NOT NULL,
+                    agent TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    duration_seconds REAL,
+                    tokens_in INTEGER,
+                    tokens_out INTEGER,
+                    created_at REAL NOT NULL,
+                    UNIQUE (run_id, task_index)
+                );
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS outputs_fts USING fts5(
+                    agent, content, content='outputs', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+
+                -- Synchronisation de l'index plein texte avec la table outputs
+                CREATE TRIGGER IF NOT EXISTS outputs_ai AFTER INSERT ON outputs BEGIN
+                    INSERT INTO outputs_fts (rowid, agent, content) VALUES (new.id, new.agent, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS outputs_ad AFTER DELETE ON outputs BEGIN
+                    INSERT INTO outputs_fts (outputs_fts, rowid, agent, content) VALUES ('delete', old.id, old.agent, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS outputs_au AFTER UPDATE ON outputs BEGIN
+                    INSERT INTO outputs_fts (outputs_fts, rowid, agent, content) VALUES ('delete', old.id, old.agent, old.content);
+                    INSERT INTO outputs_fts (rowid, agent, content) VALUES (new.id, new.agent, new.content);
+                END;
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def record_run(self, state, result: Optional[str] = None):
+        """Enregistre (ou met à jour) une campagne et toutes ses sorties à partir de son RunState"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO runs (run_id, problem_statement, company_context, status, result, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id) DO UPDATE SET
+                    status = excluded.status,
+                    result = COALESCE(excluded.result, runs.result),
+                    updated_at = excluded.updated_at
+            """, (state.run_id, state.problem_statement, state.company_context or "", state.status, result,
+                  state.created_at, now))
+
+            rows = []
+            if state.meta_result:
+                rows.append((state.run_id, META_MANAGER_INDEX, "Meta Manager", state.meta_result, None, None, None, now))
+            for record in state.ordered_tasks():
+                rows.append((state.run_id, record.index, record.agent, record.raw, record.duration_seconds,
+                             record.tokens_in, record.tokens_out, record.completed_at))
+            conn.executemany("""
+                INSERT INTO outputs (run_id, task_index, agent, content, duration_seconds, tokens_in, tokens_out, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id, task_index) DO UPDATE SET
+                    agent = excluded.agent,
+                    content = excluded.content,
+                    duration_seconds = excluded.duration_seconds,
+                    tokens_in = excluded.tokens_in,
+                    tokens_out = excluded.tokens_out
+                WHERE outputs.content != excluded.content OR outputs.agent != excluded.agent
+                    OR outputs.tokens_out IS NOT excluded.tokens_out
+            """, rows)
+
+    def count_runs(self) -> int:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def list_runs(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Page de campagnes, de la plus récente à la plus ancienne (sans le texte des sorties)"""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("""
+                SELECT runs.run_id, runs.problem_statement, runs.status, runs.created_at,
+                       COUNT(outputs.id) AS outputs, COALESCE(SUM(outputs.tokens_in), 0) + COALESCE(SUM(outputs.tokens_out), 0) AS tokens
+                FROM runs LEFT JOIN outputs ON outputs.run_id = runs.run_id
+                GROUP BY runs.run_id
+                ORDER BY runs.created_at DESC
+                LIMIT ? OFFSET ?
+            """, (limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_outputs(self, run_id: str) -> List[Dict[str, Any]]:
+        """Sorties d'une campagne, dans l'ordre d'exécution (Meta Manager en premier)"""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM outputs WHERE run_id = ? ORDER BY task_index", (run_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_search(self, query: str) -> int:
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return 0
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outputs_fts WHERE outputs_fts MATCH ?", (fts_query,)).fetchone()[0]
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Recherche plein texte dans les sorties, classée par pertinence (bm25)
+
+        Chaque résultat contient un extrait où les termes trouvés sont entourés de ** (gras Markdown).
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        with self._lock, self._connect() as conn:
+            rows = conn.execute("""
+                SELECT outputs.run_id, outputs.task_index, outputs.agent, outputs.created_at,
+                       runs.problem_statement,
+                       snippet(outputs_fts, 1, '**', '**', ' … ', 24) AS snippet,
+                       bm25(outputs_fts) AS score
+                FROM outputs_fts
+                JOIN outputs ON outputs.id = outputs_fts.rowid
+                JOIN runs ON runs.run_id = outputs.run_id
+                WHERE outputs_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+            """, (fts_query, limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def export_runs(self, run_ids: List[str]) -> List[Dict[str, Any]]:
+        """Campagnes complètes (entrées, résultat et sorties) pour un export en lot"""
+        if not run_ids:
+            return []
+        placeholders = ", ".join("?" for _ in run_ids)
+        with self._lock, self._connect() as conn:
+            runs = [dict(row) for row in conn.execute(
+                f"SELECT * FROM runs WHERE run_id IN ({placeholders}) ORDER BY created_at DESC", run_ids
+            ).fetchall()]
+            outputs = conn.execute(
+                f"SELECT * FROM outputs WHERE run_id IN ({placeholders}) ORDER BY run_id, task_index", run_ids
+            ).fetchall()
+
+        by_run: Dict[str, List[Dict[str, Any]]] = {}
+        for row in outputs:
+            by_run.setdefault(row["run_id"], []).append(dict(row))
+        for run in runs:
+            run["outputs"] = by_run.get(run["run_id"], [])
+        return runs
+
+    def delete_run(self, run_id: str):
+        """Supprime une campagne et ses sorties de l'historique"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+
+_HISTORY_STORE: Optional[HistoryStore] = None
+_HISTORY_STORE_LOCK = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """Retourne l'historique des campagnes partagé par le processus"""
+    global _HISTORY_STORE
+    with _HISTORY_STORE_LOCK:
+        if _HISTORY_STORE is None:
+            _HISTORY_STORE = HistoryStore()
+        return _HISTORY_STORE
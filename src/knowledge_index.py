@@ -0,0 +1,262 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+# Dossier de l'index (monté en volume dans docker-compose pour survivre aux redémarrages)
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", "knowledge_index")
+# Même modèle que l'embedder par défaut des sources de connaissances CrewAI
+EMBEDDING_MODEL = os.getenv("KNOWLEDGE_EMBEDDING_MODEL", "text-embedding-3-small")
+CHUNK_SIZE = 4000
+CHUNK_OVERLAP = 200
+EMBEDDING_BATCH_SIZE = 64
+
+
+def compute_file_sha256(file_path: str) -> str:
+    """Calcule le SHA-256 du contenu d'un fichier par blocs"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class IndexedDocument:
+    """Document indexé : chunks de texte et vecteurs normalisés associés"""
+    sha256: str
+    source_name: str
+    chunks: List[str]
+    vectors: np.ndarray
+
+
+class KnowledgeIndex:
+    """Index d'embeddings persistant, adressé par le contenu (SHA-256) de chaque PDF
+
+    Chaque document est stocké dans <index_dir>/<sha256>/ (chunks.json + vectors.npy).
+    Un PDF inchangé n'est donc jamais re-découpé ni ré-embeddé, même après un redémarrage.
+    """
+
+    def __init__(self, index_dir: str = None, embedding_model: str = None):
+        self.index_dir = os.path.abspath(index_dir or KNOWLEDGE_INDEX_DIR)
+        self.embedding_model = embedding_model or EMBEDDING_MODEL
+        self._documents: Dict[str, IndexedDocument] = {}
+        self._sha_by_fingerprint: Dict[Tuple[str, int, int], str] = {}
+        # Matrices combinées (une par ensemble de documents interrogé ensemble)
+        self._combined: Dict[Tuple[str, ...], Tuple[np.ndarray, List[Tuple[IndexedDocument, int]]]] = {}
+        self._lock = threading.RLock()
+        # Un verrou par document en cours d'indexation : un même PDF n'est jamais embeddé deux fois en parallèle
+        self._build_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _document_dir(self, sha256: str) -> str:
+        return os.path.join(self.index_dir, sha256)
+
+    def get_file_sha256(self, pdf_path: str) -> str:
+        """Retourne le SHA-256 d'un PDF, sans relire le fichier s'il n'a pas changé"""
+        abs_path = os.path.abspath(pdf_path)
+        stat = os.stat(abs_path)
+        fingerprint = (abs_path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            sha256 = self._sha_by_fingerprint.get(fingerprint)
+        if sha256 is None:
+            sha256 = compute_file_sha256(abs_path)
+            with self._lock:
+                self._sha_by_fingerprint[fingerprint] = sha256
+        return sha256
+
+    def remember_file_sha256(self, pdf_path: str, sha256: str):
+        """Mémorise le SHA-256 déjà connu d'un fichier (évite de le relire)"""
+        abs_path = os.path.abspath(pdf_path)
+        stat = os.stat(abs_path)
+        with self._lock:
+            self._sha_by_fingerprint[(abs_path, stat.st_size, stat.st_mtime_ns)] = sha256
+
+    def has_document(self, sha256: str) -> bool:
+        """Indique si un document est déjà présent dans l'index (mémoire ou disque)"""
+        if sha256 in self._documents:
+            return True
+        document_dir = self._document_dir(sha256)
+        return os.path.exists(os.path.join(document_dir, "chunks.json")) and \
+            os.path.exists(os.path.join(document_dir, "vectors.npy"))
+
+    def load_document(self, sha256: str) -> Optional[IndexedDocument]:
+        """Charge un document depuis le disque (ou la mémoire)"""
+        with self._lock:
+            if sha256 in self._documents:
+                return self._documents[sha256]
+
+        if not self.has_document(sha256):
+            return None
+
+        document_dir = self._document_dir(sha256)
+        try:
+            with open(os.path.join(document_dir, "chunks.json"), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            vectors = np.load(os.path.join(document_dir, "vectors.npy"))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Index corrompu pour {sha256[:12]}, il sera reconstruit: {e}")
+            return None
+
+        if data.get("embedding_model") != self.embedding_model:
+            return None
+
+        document = IndexedDocument(
+            sha256=sha256,
+            source_name=data.get("source_name", ""),
+            chunks=data["chunks"],
+            vectors=vectors
+        )
+        with self._lock:
+            self._documents[sha256] = document
+        return document
+
+    def get_or_build(self, pdf_path: str) -> IndexedDocument:
+        """Retourne le document indexé d'un PDF, en ne l'embeddant que s'il est nouveau"""
+        sha256 = self.get_file_sha256(pdf_path)
+        document = self.load_document(sha256)
+        if document is not None:
+            return document
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(sha256, threading.Lock())
+        try:
+            with build_lock:
+                # Le watcher ou un autre appel d'outil a pu l'indexer pendant l'attente
+                document = self.load_document(sha256)
+                if document is None:
+                    document = self._build_document(pdf_path, sha256)
+        finally:
+            with self._lock:
+                if self._build_locks.get(sha256) is build_lock:
+                    del self._build_locks[sha256]
+        return document
+
+    def _build_document(self, pdf_path: str, sha256: str) -> IndexedDocument:
+        """Découpe, embedde et enregistre un PDF absent de l'index"""
+        source_name = os.path.basename(pdf_path)
+        print(f"🧮 Indexation de {source_name} ({sha256[:12]})...")
+        chunks = self._chunk_text(self._extract_text(pdf_path, sha256))
+        vectors = self._embed(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+        document = IndexedDocument(sha256=sha256, source_name=source_name, chunks=chunks, vectors=vectors)
+        self._save_document(document)
+
+        with self._lock:
+            self._documents[sha256] = document
+            self._combined.clear()
+        print(f"✅ {source_name} indexé: {len(chunks)} chunk(s)")
+        return document
+
+    def remove_document(self, sha256: str):
+        """Supprime un document de l'index"""
+        with self._lock:
+            self._documents.pop(sha256, None)
+            self._combined.clear()
+        shutil.rmtree(self._document_dir(sha256), ignore_errors=True)
+
+    def list_documents(self) -> List[str]:
+        """Liste les SHA-256 présents sur disque"""
+        return [name for name in os.listdir(self.index_dir) if self.has_document(name)]
+
+    def _save_document(self, document: IndexedDocument):
+        """Écrit le document de manière atomique (dossier temporaire puis renommage)"""
+        tmp_dir = tempfile.mkdtemp(dir=self.index_dir, prefix=".tmp-")
+        try:
+            with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "source_name": document.source_name,
+                    "embedding_model": self.embedding_model,
+                    "chunks": document.chunks
+                }, f, ensure_ascii=False)
+            np.save(os.path.join(tmp_dir, "vectors.npy"), document.vectors)
+
+            target_dir = self._document_dir(document.sha256)
+            shutil.rmtree(target_dir, ignore_errors=True)
+            os.replace(tmp_dir, target_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def _extract_text(self, pdf_path: str, sha256: str) -> str:
+        """Texte d'un PDF, lu depuis son sidecar de pages (extrait une seule fois)"""
+        from .pdf_extraction import get_pdf_text_extractor
+
+        pages = get_pdf_text_extractor().get_pages(pdf_path, sha256)
+        return "\n\n".join(page for page in pages if page)
+
+    def _chunk_text(self, text: str) -> List[str]:
+        """Découpe le texte en chunks de taille fixe avec recouvrement"""
+        step = CHUNK_SIZE - CHUNK_OVERLAP
+        return [text[i:i + CHUNK_SIZE] for i in range(0, len(text), step) if text[i:i + CHUNK_SIZE].strip()]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Calcule les embeddings normalisés d'une liste de textes"""
+        from openai import OpenAI
+
+        client = OpenAI()
+        vectors = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            response = client.embeddings.create(model=self.embedding_model, input=batch)
+            vectors.extend(item.embedding for item in response.data)
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _combined_matrix(self, documents: List[IndexedDocument]) -> Tuple[np.ndarray, List[Tuple[IndexedDocument, int]]]:
+        """Empile les vecteurs de plusieurs documents dans une seule matrice (mise en cache)"""
+        key = tuple(document.sha256 for document in documents)
+        with self._lock:
+            cached = self._combined.get(key)
+            if cached is not None:
+                return cached
+
+        matrix = np.vstack([document.vectors for document in documents])
+        owners = [(document, i) for document in documents for i in range(len(document.chunks))]
+        with self._lock:
+            if len(self._combined) >= 8:
+                self._combined.clear()
+            self._combined[key] = (matrix, owners)
+        return matrix, owners
+
+    def search(self, query: str, pdf_paths: List[str], top_k: int = 5) -> List[Tuple[float, str, str]]:
+        """Recherche sémantique fusionnée dans les PDFs donnés
+
+        Returns:
+            List[Tuple[float, str, str]]: (score, nom du fichier source, chunk) triés par score
+        """
+        documents = {}
+        for pdf_path in pdf_paths:
+            document = self.get_or_build(pdf_path)
+            if document.chunks:
+                documents.setdefault(document.sha256, document)
+        if not documents:
+            return []
+
+        matrix, owners = self._combined_matrix(list(documents.values()))
+        scores = matrix @ self._embed([query])[0]
+        top_indices = np.argsort(scores)[::-1][:top_k]
+        return [
+            (float(scores[i]), owners[i][0].source_name, owners[i][0].chunks[owners[i][1]])
+            for i in top_indices
+        ]
+
+
+_KNOWLEDGE_INDEX: Optional[KnowledgeIndex] = None
+_KNOWLEDGE_INDEX_LOCK = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Retourne l'index de connaissances partagé par le processus"""
+    global _KNOWLEDGE_INDEX
+    with _KNOWLEDGE_INDEX_LOCK:
+        if _KNOWLEDGE_INDEX is None:
+            _KNOWLEDGE_INDEX = KnowledgeIndex()
+        return _KNOWLEDGE_INDEX
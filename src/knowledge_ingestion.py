@@ -0,0 +1,340 @@
+from dataclasses import dataclass, asdict
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import os
+import json
+import queue
+import tempfile
+import threading
+from .knowledge_index import KnowledgeIndex, get_knowledge_index
+from .object_store import ObjectStore, unique_path
+from .pdf_extraction import PdfTextExtractor, get_pdf_text_extractor
+
+KNOWLEDGE_DIR = "knowledge"
+# Intervalle (en secondes) entre deux passages du watcher sur knowledge/
+WATCH_INTERVAL = float(os.getenv("KNOWLEDGE_WATCH_INTERVAL", "2"))
+
+
+@dataclass
+class ManifestEntry:
+    """État d'un PDF du dossier knowledge/ dans le manifeste"""
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str = ""
+    status: str = "pending"  # pending, indexed, error
+    error: str = ""
+
+
+@dataclass
+class UploadResult:
+    """Résultat de l'ajout d'un PDF uploadé"""
+    filename: str  # nom d'origine du fichier uploadé
+    path: str  # chemin du PDF dans knowledge/ (existant si doublon)
+    sha256: str
+    status: str  # added, renamed (nom déjà pris par un autre contenu), duplicate (contenu déjà présent)
+
+
+class KnowledgeIngestor:
+    """Ingestion incrémentale du dossier knowledge/
+
+    Un manifeste (chemin, taille, mtime, SHA-256) est tenu à jour par un watcher.
+    Seuls les PDFs ajoutés ou modifiés sont découpés et embeddés, dans un thread
+    de fond ; les vecteurs des PDFs supprimés ou remplacés sont retirés de l'index.
+    Les uploads passent par un stockage adressé par le contenu (knowledge/.objects) :
+    un contenu déjà présent n'est ni réécrit, ni ré-indexé.
+    """
+
+    def __init__(self, knowledge_dir: str = None, index: KnowledgeIndex = None, extractor: PdfTextExtractor = None):
+        self.knowledge_dir = os.path.abspath(knowledge_dir or KNOWLEDGE_DIR)
+        self.index = index or get_knowledge_index()
+        self.extractor = extractor or get_pdf_text_extractor()
+        self.manifest_path = os.path.join(self.index.index_dir, "manifest.json")
+        self.manifest: Dict[str, ManifestEntry] = {}
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self.objects = ObjectStore(os.path.join(self.knowledge_dir, ".objects"))
+        self._load_manifest()
+
+    def _load_manifest(self):
+        """Charge le manifeste persisté (s'il existe)"""
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.manifest = {path: ManifestEntry(**entry) for path, entry in data.items()}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Manifeste knowledge/ illisible, reconstruction complète: {e}")
+            self.manifest = {}
+
+    def _save_manifest(self):
+        """Écrit le manifeste de manière atomique"""
+        with self._lock:
+            data = {path: asdict(entry) for path, entry in self.manifest.items()}
+        fd, tmp_path = tempfile.mkstemp(dir=self.index.index_dir, prefix=".manifest-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Liste les PDFs présents sur disque (sous-dossiers compris) avec leur taille et mtime"""
+        found = {}
+        pending = [self.knowledge_dir]
+        while pending:
+            try:
+                entries = list(os.scandir(pending.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                # Les dossiers cachés (dont le stockage .objects) ne sont pas parcourus
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def sync(self) -> Dict[str, List[str]]:
+        """Compare le dossier au manifeste et planifie uniquement les changements
+
+        Returns:
+            Dict[str, List[str]]: chemins "added", "modified" et "removed"
+        """
+        found = self._scan()
+        changes = {"added": [], "modified": [], "removed": []}
+
+        with self._lock:
+            for path in list(self.manifest.keys()):
+                if path not in found:
+                    changes["removed"].append(path)
+                    self._forget(path)
+
+            for path, (size, mtime_ns) in found.items():
+                entry = self.manifest.get(path)
+                if entry is None:
+                    changes["added"].append(path)
+                elif (entry.size, entry.mtime_ns) != (size, mtime_ns):
+                    changes["modified"].append(path)
+                else:
+                    continue
+                self.manifest[path] = ManifestEntry(
+                    path=path, size=size, mtime_ns=mtime_ns,
+                    sha256=entry.sha256 if entry else ""
+                )
+                self._queue.put(path)
+
+        if any(changes.values()):
+            for kind, label in [("added", "ajouté"), ("modified", "modifié"), ("removed", "supprimé")]:
+                for path in changes[kind]:
+                    print(f"📚 PDF {label}: {os.path.basename(path)}")
+            self._save_manifest()
+        return changes
+
+    def _forget(self, path: str):
+        """Retire un PDF du manifeste et supprime ses vecteurs s'ils ne sont plus référencés"""
+        entry = self.manifest.pop(path, None)
+        if entry is not None and entry.sha256:
+            self._drop_if_unreferenced(entry.sha256)
+
+    def _drop_if_unreferenced(self, sha256: str):
+        if not any(other.sha256 == sha256 for other in self.manifest.values()):
+            self.index.remove_document(sha256)
+            self.objects.remove(sha256)
+            self.extractor.remove(sha256)
+
+    def _find_by_sha256(self, sha256: str, size: int) -> Optional[str]:
+        """Chemin d'un PDF connu ayant ce contenu (les PDFs pas encore hachés sont comparés par taille d'abord)"""
+        for path, entry in self.manifest.items():
+            if entry.sha256 == sha256:
+                return path
+        for path, entry in self.manifest.items():
+            if not entry.sha256 and entry.size == size and os.path.exists(path):
+                if self.index.get_file_sha256(path) == sha256:
+                    return path
+        return None
+
+    def add_upload(self, stream: BinaryIO, filename: str) -> UploadResult:
+        """Ajoute un PDF uploadé à knowledge/ sans le charger en mémoire
+
+        Le flux est écrit par blocs dans le stockage adressé par le contenu. Un contenu
+        déjà présent n'ajoute aucun fichier ; un nom déjà pris par un autre contenu
+        reçoit un suffixe (« nom (2).pdf ») au lieu d'écraser le fichier existant.
+        """
+        os.makedirs(self.knowledge_dir, exist_ok=True)
+        sha256, _, is_new = self.objects.put_stream(stream)
+        size = os.path.getsize(self.objects.object_path(sha256))
+
+        with self._lock:
+            existing = self._find_by_sha256(sha256, size)
+            if existing is not None:
+                if is_new:
+                    # Contenu présent dans knowledge/ mais pas encore dans le stockage : l'objet est inutile
+                    self.objects.remove(sha256)
+                print(f"♻️ PDF déjà présent : {filename} = {os.path.basename(existing)}")
+                return UploadResult(filename=filename, path=existing, sha256=sha256, status="duplicate")
+
+            while True:
+                path = unique_path(self.knowledge_dir, filename)
+                try:
+                    self.objects.link_to(sha256, path)
+                    break
+                except FileExistsError:
+                    continue
+
+            stat = os.stat(path)
+            self.index.remember_file_sha256(path, sha256)
+            self.manifest[path] = ManifestEntry(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=sha256)
+            self._queue.put(path)
+        self._save_manifest()
+
+        status = "added" if os.path.basename(path) == os.path.basename(filename) else "renamed"
+        print(f"📁 PDF ajouté dans knowledge/: {os.path.basename(path)}")
+        return UploadResult(filename=filename, path=path, sha256=sha256, status=status)
+
+    def _ingest(self, path: str):
+        """Découpe et embedde un seul PDF, puis met à jour son entrée du manifeste"""
+        with self._lock:
+            entry = self.manifest.get(path)
+            previous_sha = entry.sha256 if entry is not None else None
+        if entry is None or not os.path.exists(path):
+            return
+
+        # Embedding hors verrou (long) ; les appels concurrents sur le même PDF sont sérialisés par l'index
+        document, error = None, None
+        try:
+            document = self.index.get_or_build(path)
+        except Exception as e:
+            error = e
+            print(f"❌ Erreur d'indexation pour {os.path.basename(path)}: {e}")
+
+        with self._lock:
+            entry = self.manifest.get(path)
+            if entry is None:
+                # PDF retiré pendant l'indexation : le document tout juste construit ne doit pas rester orphelin
+                if document is not None:
+                    self._drop_if_unreferenced(document.sha256)
+                return
+            if error is None:
+                entry.sha256 = document.sha256
+                entry.status = "indexed"
+                entry.error = ""
+            else:
+                entry.status = "error"
+                entry.error = str(error)
+            if previous_sha and previous_sha != entry.sha256:
+                self._drop_if_unreferenced(previous_sha)
+        self._save_manifest()
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                paths = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Tous les PDFs en attente forment un lot : leur texte est extrait en parallèle avant l'embedding
+            while True:
+                try:
+                    paths.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if len(paths) > 1:
+                    try:
+                        # Empreintes mises en cache par l'index : get_or_build ne relira pas les fichiers
+                        hashes = {path: self.index.get_file_sha256(path) for path in paths if os.path.exists(path)}
+                        self.extractor.extract_all(list(hashes), hashes)
+                    except Exception as e:
+                        print(f"⚠️ Extraction parallèle impossible, extraction fichier par fichier: {e}")
+                for path in paths:
+                    self._ingest(path)
+            finally:
+                for _ in paths:
+                    self._queue.task_done()
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(WATCH_INTERVAL):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"⚠️ Erreur du watcher knowledge/: {e}")
+
+    def start(self):
+        """Démarre le worker d'ingestion et le watcher (idempotent)"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stop_event.clear()
+            self.sync()
+            self._worker = threading.Thread(target=self._worker_loop, name="knowledge-ingestion", daemon=True)
+            self._watcher = threading.Thread(target=self._watch_loop, name="knowledge-watcher", daemon=True)
+            self._worker.start()
+            self._watcher.start()
+
+    def stop(self):
+        """Arrête le worker et le watcher"""
+        self._stop_event.set()
+
+    def is_running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def wait_until_idle(self):
+        """Bloque jusqu'à ce que tous les PDFs en attente soient indexés"""
+        self._queue.join()
+
+    def list_pdfs(self) -> List[str]:
+        """Retourne les PDFs connus du manifeste (sans relire le dossier)"""
+        with self._lock:
+            return sorted(self.manifest.keys())
+
+    def get_entries(self) -> List[ManifestEntry]:
+        with self._lock:
+            return [self.manifest[path] for path in sorted(self.manifest.keys())]
+
+    def remove_pdf(self, path: str) -> bool:
+        """Supprime un PDF du dossier et ses vecteurs de l'index"""
+        path = os.path.abspath(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"❌ Impossible de supprimer {os.path.basename(path)}: {e}")
+            return False
+
+        with self._lock:
+            self._forget(path)
+        self._save_manifest()
+        return True
+
+    def clear(self) -> int:
+        """Supprime tous les PDFs du dossier knowledge/ et leurs vecteurs"""
+        removed = 0
+        for path in self.list_pdfs():
+            if self.remove_pdf(path):
+                removed += 1
+        return removed
+
+
+_INGESTOR: Optional[KnowledgeIngestor] = None
+_INGESTOR_LOCK = threading.Lock()
+
+
+def get_knowledge_ingestor(start: bool = False) -> KnowledgeIngestor:
+    """Retourne l'ingesteur partagé par le processus (et le démarre si demandé)"""
+    global _INGESTOR
+    with _INGESTOR_LOCK:
+        if _INGESTOR is None:
+            _INGESTOR = KnowledgeIngestor()
+    if start:
+        _INGESTOR.start()
+    return _INGESTOR
+
+
+def is_ingestor_running() -> bool:
+    """Indique si le watcher de knowledge/ tourne dans ce processus"""
+    return _INGESTOR is not None and _INGESTOR.is_running()
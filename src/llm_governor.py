@@ -0,0 +1,380 @@
+"""Régulation des appels LLM : requêtes et tokens par minute, par clé API et par modèle
+
+Tous les agents passent par un même gouverneur (un seau à jetons par couple clé API /
+modèle). Les appelants attendent leur tour dans une file FIFO au lieu de provoquer
+des erreurs 429 ; une 429 reçue malgré tout suspend le seau pendant le délai indiqué.
+Avec LLM_GOVERNOR_DB, l'état des seaux est partagé entre processus (SQLite).
+"""
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from crewai import LLM
+from .context_compaction import count_tokens
+from .tracing import get_current_span
+
+# Réglages lus à la création du gouverneur (et non à l'import) : un .env chargé après l'import est pris en compte.
+#   LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE : limites par défaut d'un couple clé API / modèle (0 = illimité)
+#   LLM_RATE_LIMITS : limites propres à certains modèles, ex: {"gpt-4o": [500, 30000]} (requêtes, tokens par minute)
+#   LLM_MAX_CONCURRENT_CALLS : appels simultanés maximum par couple clé API / modèle dans le processus (0 = illimité)
+#   LLM_GOVERNOR_DB : base SQLite partagée entre processus (vide = seaux propres au processus)
+#   LLM_DEFAULT_COMPLETION_TOKENS : tokens de réponse réservés quand max_tokens n'est pas fixé
+#   LLM_RATE_LIMIT_COOLDOWN : suspension appliquée après une 429 sans délai Retry-After exploitable
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Plafonds d'un seau (0 = illimité)"""
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+def _load_model_limits() -> Dict[str, RateLimits]:
+    raw_limits = os.getenv("LLM_RATE_LIMITS", "")
+    if not raw_limits.strip():
+        return {}
+    try:
+        return {model: RateLimits(int(rpm), int(tpm)) for model, (rpm, tpm) in json.loads(raw_limits).items()}
+    except (ValueError, TypeError) as e:
+        print(f"⚠️ LLM_RATE_LIMITS illisible, limites par défaut utilisées : {e}")
+        return {}
+
+
+def _refill(level: float, capacity: int, elapsed: float) -> float:
+    return min(float(capacity), level + capacity * elapsed / 60.0)
+
+
+def _take(state: Dict[str, float], limits: RateLimits, tokens: int, now: float) -> float:
+    """Tente de prélever une requête et tokens dans l'état d'un seau (modifié en place)
+
+    Returns:
+        float: 0 si le prélèvement a eu lieu, sinon le délai (en secondes) avant de réessayer
+    """
+    if now < state["cooldown_until"]:
+        return state["cooldown_until"] - now
+    elapsed = max(0.0, now - state["updated_at"])
+    state["updated_at"] = now
+    waits = []
+    for field, capacity, amount in (("requests", limits.requests_per_minute, 1),
+                                    ("tokens", limits.tokens_per_minute, tokens)):
+        if capacity <= 0:
+            continue
+        state[field] = _refill(state[field], capacity, elapsed)
+        # Une demande plus grosse que le seau entier attend seulement qu'il soit plein
+        amount = min(amount, capacity)
+        if state[field] < amount:
+            waits.append((amount - state[field]) * 60.0 / capacity)
+    if waits:
+        return max(waits)
+    if limits.requests_per_minute > 0:
+        state["requests"] -= 1
+    if limits.tokens_per_minute > 0:
+        state["tokens"] -= min(tokens, limits.tokens_per_minute)
+    return 0.0
+
+
+def _full_state(limits: RateLimits, now: float) -> Dict[str, float]:
+    return {"requests": float(limits.requests_per_minute), "tokens": float(limits.tokens_per_minute),
+            "updated_at": now, "cooldown_until": 0.0}
+
+
+class LocalBucketStore:
+    """Seaux à jetons en mémoire (processus courant)"""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, bucket: str, limits: RateLimits, tokens: int) -> float:
+        now = time.time()
+        with self._lock:
+            state = self._states.setdefault(bucket, _full_state(limits, now))
+            return _take(state, limits, tokens, now)
+
+    def adjust(self, bucket: str, tokens: int):
+        """Corrige la réservation de tokens une fois la consommation réelle connue (négatif = rendus)"""
+        with self._lock:
+            if bucket in self._states:
+                self._states[bucket]["tokens"] -= tokens
+
+    def cooldown(self, bucket: str, seconds: float):
+        with self._lock:
+            if bucket in self._states:
+                state = self._states[bucket]
+                state["cooldown_until"] = max(state["cooldown_until"], time.time() + seconds)
+
+
+class SqliteBucketStore:
+    """Seaux à jetons partagés entre processus (une transaction IMMEDIATE par prélèvement)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_buckets (
+                    bucket TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    cooldown_until REAL NOT NULL DEFAULT 0
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _update(self, bucket: str, change) -> Any:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT requests, tokens, updated_at, cooldown_until FROM llm_buckets WHERE bucket = ?", (bucket,)
+            ).fetchone()
+            state = dict(zip(("requests", "tokens", "updated_at", "cooldown_until"), row)) if row else None
+            state, result = change(state)
+            if state is not None:
+                conn.execute("""
+                    INSERT INTO llm_buckets (bucket, requests, tokens, updated_at, cooldown_until) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (bucket) DO UPDATE SET requests = excluded.requests, tokens = excluded.tokens,
+                        updated_at = excluded.updated_at, cooldown_until = excluded.cooldown_until
+                """, (bucket, state["requests"], state["tokens"], state["updated_at"], state["cooldown_until"]))
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            # BEGIN IMMEDIATE peut échouer (base verrouillée) : pas de transaction à annuler
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def try_acquire(self, bucket: str, limits: RateLimits, tokens: int) -> float:
+        def change(state):
+            now = time.time()
+            state = state or _full_state(limits, now)
+            return state, _take(state, limits, tokens, now)
+        return self._update(bucket, change)
+
+    def adjust(self, bucket: str, tokens: int):
+        def change(state):
+            if state is not None:
+                state["tokens"] -= tokens
+            return state, None
+        self._update(bucket, change)
+
+    def cooldown(self, bucket: str, seconds: float):
+        def change(state):
+            if state is not None:
+                state["cooldown_until"] = max(state["cooldown_until"], time.time() + seconds)
+            return state, None
+        self._update(bucket, change)
+
+
+@dataclass
+class BucketMetrics:
+    """Métriques d'un seau : file d'attente, attentes et 429 reçues"""
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    granted: int = 0
+    waited: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    rate_limited: int = 0
+
+
+class LLMPermit:
+    """Autorisation d'appel : permet d'ajuster les tokens réservés ou de signaler une 429"""
+
+    def __init__(self, governor: "LLMGovernor", bucket: str, reserved_tokens: int, waited_seconds: float = 0.0):
+        self.governor = governor
+        self.bucket = bucket
+        self.reserved_tokens = reserved_tokens
+        self.waited_seconds = waited_seconds
+
+    def settle(self, used_tokens: int):
+        """Remplace la réservation par la consommation réelle"""
+        if used_tokens != self.reserved_tokens:
+            self.governor.store.adjust(self.bucket, used_tokens - self.reserved_tokens)
+
+    def rate_limited(self, retry_after: Optional[float] = None):
+        """Suspend le seau après une 429 : tous les appelants attendent au lieu de réessayer"""
+        self.governor.store.cooldown(self.bucket, retry_after or self.governor.rate_limit_cooldown)
+        with self.governor._lock:
+            self.governor._metrics[self.bucket].rate_limited += 1
+
+
+class LLMGovernor:
+    """Gouverneur des appels LLM : seau à jetons, appels simultanés bornés et file FIFO par clé API et modèle"""
+
+    def __init__(self, default_limits: RateLimits = None, model_limits: Dict[str, RateLimits] = None,
+                 db_path: str = None, max_concurrent_calls: int = None):
+        self.default_limits = default_limits or RateLimits(
+            int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")), int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+        )
+        if max_concurrent_calls is None:
+            max_concurrent_calls = int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "8"))
+        self.max_concurrent_calls = max_concurrent_calls
+        self.model_limits = _load_model_limits() if model_limits is None else model_limits
+        self.default_completion_tokens = int(os.getenv("LLM_DEFAULT_COMPLETION_TOKENS", "1024"))
+        self.rate_limit_cooldown = float(os.getenv("LLM_RATE_LIMIT_COOLDOWN", "10"))
+        db_path = os.getenv("LLM_GOVERNOR_DB", "") if db_path is None else db_path
+        self.store = SqliteBucketStore(db_path) if db_path else LocalBucketStore()
+        self._lock = threading.Lock()
+        self._turn = threading.Condition(self._lock)
+        self._queues: Dict[str, Deque[object]] = {}
+        self._metrics: Dict[str, BucketMetrics] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    def limits_for(self, model: str) -> RateLimits:
+        # « openai/gpt-4o » et « gpt-4o » partagent les mêmes limites
+        return self.model_limits.get(model) or self.model_limits.get(model.split("/")[-1]) or self.default_limits
+
+    @staticmethod
+    def bucket_name(api_key: str, model: str) -> str:
+        """Nom du seau : empreinte de la clé API (la clé n'est pas conservée) et modèle"""
+        return f"{hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:12]}:{model}"
+
+    @contextmanager
+    def acquire(self, api_key: str, model: str, estimated_tokens: int) -> Iterator[LLMPermit]:
+        """Attend son tour puis la capacité nécessaire dans le seau (clé API, modèle)"""
+        bucket = self.bucket_name(api_key, model)
+        limits = self.limits_for(model)
+        ticket = object()
+        started = time.time()
+        with self._lock:
+            queue = self._queues.setdefault(bucket, deque())
+            metrics = self._metrics.setdefault(bucket, BucketMetrics())
+            slot = self._slots.get(bucket)
+            if slot is None and self.max_concurrent_calls > 0:
+                slot = self._slots[bucket] = threading.BoundedSemaphore(self.max_concurrent_calls)
+            queue.append(ticket)
+            metrics.queue_depth = len(queue)
+            metrics.max_queue_depth = max(metrics.max_queue_depth, len(queue))
+        has_slot = False
+        try:
+            with self._lock:
+                # FIFO : seul le premier de la file peut prendre une place et prélever dans le seau
+                while queue[0] is not ticket:
+                    self._turn.wait()
+            if slot is not None:
+                slot.acquire()
+                has_slot = True
+            while True:
+                wait = self.store.try_acquire(bucket, limits, estimated_tokens)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            if has_slot:
+                slot.release()
+            raise
+        finally:
+            with self._lock:
+                queue.remove(ticket)
+                metrics.queue_depth = len(queue)
+                self._turn.notify_all()
+
+        waited = time.time() - started
+        with self._lock:
+            metrics.granted += 1
+            if waited > 0.05:
+                metrics.waited += 1
+                metrics.total_wait_seconds += waited
+                metrics.max_wait_seconds = max(metrics.max_wait_seconds, waited)
+        try:
+            yield LLMPermit(self, bucket, estimated_tokens, waited)
+        finally:
+            if has_slot:
+                slot.release()
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Métriques par seau (file d'attente, attentes moyennes et maximales, 429)"""
+        with self._lock:
+            return {
+                bucket: {
+                    "queue_depth": metrics.queue_depth,
+                    "max_queue_depth": metrics.max_queue_depth,
+                    "granted": metrics.granted,
+                    "waited": metrics.waited,
+                    "avg_wait_seconds": round(metrics.total_wait_seconds / metrics.granted, 3) if metrics.granted else 0.0,
+                    "max_wait_seconds": round(metrics.max_wait_seconds, 3),
+                    "rate_limited": metrics.rate_limited,
+                }
+                for bucket, metrics in self._metrics.items()
+            }
+
+
+_LLM_GOVERNOR: Optional[LLMGovernor] = None
+_LLM_GOVERNOR_LOCK = threading.Lock()
+
+
+def get_llm_governor() -> LLMGovernor:
+    """Retourne le gouverneur LLM partagé par le processus"""
+    global _LLM_GOVERNOR
+    with _LLM_GOVERNOR_LOCK:
+        if _LLM_GOVERNOR is None:
+            _LLM_GOVERNOR = LLMGovernor()
+        return _LLM_GOVERNOR
+
+
+def _messages_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content") or "") if isinstance(message, dict) else str(message)
+                     for message in messages or [])
+
+
+def _rate_limit_delay(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """Indique si une erreur est une 429 et le délai Retry-After éventuel"""
+    text = f"{type(error).__name__}: {error}"
+    if "RateLimit" not in text and "429" not in text:
+        return False, None
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if retry_after is None:
+        match = re.search(r"try again in (\d+(?:\.\d+)?)\s*(ms|s)", text)
+        if match:
+            return True, float(match.group(1)) / (1000 if match.group(2) == "ms" else 1)
+    try:
+        return True, float(retry_after) if retry_after is not None else None
+    except ValueError:
+        return True, None
+
+
+class GovernedLLM(LLM):
+    """LLM CrewAI dont chaque appel passe par le gouverneur du processus"""
+
+    def call(self, messages, *args, **kwargs):
+        governor = get_llm_governor()
+        prompt_tokens = count_tokens(_messages_text(messages))
+        estimated = prompt_tokens + (getattr(self, "max_tokens", None) or governor.default_completion_tokens)
+        api_key = getattr(self, "api_key", None) or os.getenv("OPENAI_API_KEY", "")
+        with governor.acquire(api_key, self.model, estimated) as permit:
+            # Attente cumulée de la tâche en cours, visible dans la trace
+            span = get_current_span()
+            if span is not None and permit.waited_seconds > 0:
+                span.attributes["llm_wait_seconds"] = round(
+                    span.attributes.get("llm_wait_seconds", 0.0) + permit.waited_seconds, 3
+                )
+            try:
+                result = super().call(messages, *args, **kwargs)
+            except Exception as e:
+                is_rate_limit, retry_after = _rate_limit_delay(e)
+                if is_rate_limit:
+                    permit.rate_limited(retry_after)
+                raise
+            permit.settle(prompt_tokens + count_tokens(str(result)))
+            return result
+
+
+def create_governed_llm(model: str = None, **kwargs) -> GovernedLLM:
+    """LLM régulé pour un agent (modèle par défaut : OPENAI_MODEL)"""
+    return GovernedLLM(model=model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"), **kwargs)
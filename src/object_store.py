@@ -0,0 +1,91 @@
+from typing import BinaryIO, Optional, Tuple
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# Taille des blocs lus depuis un upload (le fichier n'est jamais chargé entier en mémoire)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectStore:
+    """Stockage adressé par le contenu : un fichier par SHA-256 (<root>/<sha[:2]>/<sha>.pdf)
+
+    Un contenu déjà présent n'est jamais écrit deux fois : les copies visibles
+    (dans knowledge/) sont des liens physiques vers l'objet quand le système le permet.
+    """
+
+    def __init__(self, root: str, suffix: str = ".pdf"):
+        self.root = os.path.abspath(root)
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}{self.suffix}")
+
+    def has(self, sha256: str) -> bool:
+        return os.path.exists(self.object_path(sha256))
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, str, bool]:
+        """Écrit un flux par blocs en calculant son SHA-256 au fil de l'eau
+
+        Returns:
+            Tuple[str, str, bool]: (SHA-256, chemin de l'objet, True si le contenu était nouveau)
+        """
+        if hasattr(stream, "seek"):
+            stream.seek(0)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+                    digest.update(block)
+                    f.write(block)
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256)
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                    return sha256, path, False
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return sha256, path, True
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def link_to(self, sha256: str, target_path: str):
+        """Expose un objet sous un autre chemin (lien physique, sinon copie)
+
+        Ne remplace jamais un fichier existant : FileExistsError si le chemin est pris.
+        """
+        source = self.object_path(sha256)
+        try:
+            os.link(source, target_path)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Volumes distincts ou système sans liens physiques
+            with open(source, "rb") as src, open(target_path, "xb") as dst:
+                shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+    def remove(self, sha256: str):
+        """Supprime un objet (les liens physiques existants restent lisibles)"""
+        try:
+            os.remove(self.object_path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+def unique_path(directory: str, filename: str) -> str:
+    """Chemin libre pour filename dans directory : « nom (2).pdf » si le nom est déjà pris"""
+    base, extension = os.path.splitext(os.path.basename(filename))
+    candidate = os.path.join(directory, f"{base}{extension}")
+    counter = 2
+    while os.path.exists(candidate):
+        candidate = os.path.join(directory, f"{base} ({counter}){extension}")
+        counter += 1
+    return candidate
@@ -0,0 +1,156 @@
+"""Extraction du texte des PDFs, page par page, dans des fichiers annexes (sidecars)
+
+Chaque PDF est extrait une seule fois : le texte de ses pages est stocké dans
+<PDF_TEXT_DIR>/<sha256>.json et relu par l'index de connaissances. Plusieurs PDFs
+sont extraits en parallèle (un processus par cœur).
+
+Pré-extraction de tout le dossier knowledge/ :
+    python -m src.pdf_extraction [dossier]
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import os
+import sys
+import json
+import tempfile
+import multiprocessing
+import threading
+from .knowledge_index import KNOWLEDGE_INDEX_DIR, compute_file_sha256
+
+PDF_TEXT_DIR = os.getenv("PDF_TEXT_DIR", os.path.join(KNOWLEDGE_INDEX_DIR, "text"))
+# Nombre de processus d'extraction (par défaut : un par cœur)
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def extract_pages(pdf_path: str) -> List[str]:
+    """Extrait le texte de chaque page d'un PDF (exécuté dans un processus du pool)"""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+class PdfTextExtractor:
+    """Sidecars de texte adressés par le contenu (SHA-256) des PDFs"""
+
+    def __init__(self, text_dir: str = None, max_workers: int = None):
+        self.text_dir = os.path.abspath(text_dir or PDF_TEXT_DIR)
+        self.max_workers = max_workers or PDF_EXTRACTION_WORKERS
+        self._lock = threading.Lock()
+        os.makedirs(self.text_dir, exist_ok=True)
+
+    def sidecar_path(self, sha256: str) -> str:
+        return os.path.join(self.text_dir, f"{sha256}.json")
+
+    def has_pages(self, sha256: str) -> bool:
+        return os.path.exists(self.sidecar_path(sha256))
+
+    def load_pages(self, sha256: str) -> Optional[List[str]]:
+        """Pages extraites d'un PDF, ou None si son sidecar n'existe pas (ou est illisible)"""
+        try:
+            with open(self.sidecar_path(sha256), "r", encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Texte extrait illisible pour {sha256[:12]}, il sera ré-extrait: {e}")
+            return None
+
+    def _save_pages(self, sha256: str, source_name: str, pages: List[str]):
+        """Écrit le sidecar de manière atomique"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.text_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"source_name": source_name, "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.sidecar_path(sha256))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_pages(self, pdf_path: str, sha256: str = None) -> List[str]:
+        """Pages d'un PDF : depuis son sidecar, sinon extraites maintenant puis mémorisées"""
+        sha256 = sha256 or compute_file_sha256(pdf_path)
+        pages = self.load_pages(sha256)
+        if pages is None:
+            pages = extract_pages(pdf_path)
+            self._save_pages(sha256, os.path.basename(pdf_path), pages)
+        return pages
+
+    def extract_all(self, pdf_paths: List[str], hashes: Dict[str, str] = None) -> Dict[str, str]:
+        """Extrait en parallèle les PDFs qui n'ont pas encore de sidecar
+
+        Args:
+            pdf_paths: PDFs à préparer
+            hashes: SHA-256 déjà connus (chemin -> SHA-256), pour éviter de relire les fichiers
+
+        Returns:
+            Dict[str, str]: chemin -> SHA-256 des PDFs dont le texte est disponible
+        """
+        hashes = dict(hashes or {})
+        missing: Dict[str, str] = {}
+        for pdf_path in pdf_paths:
+            try:
+                sha256 = hashes.get(pdf_path) or compute_file_sha256(pdf_path)
+            except OSError as e:
+                print(f"⚠️ PDF illisible {os.path.basename(pdf_path)}: {e}")
+                continue
+            hashes[pdf_path] = sha256
+            # Un même contenu sous plusieurs noms n'est extrait qu'une fois
+            if not self.has_pages(sha256):
+                missing.setdefault(sha256, pdf_path)
+
+        if len(missing) == 1:
+            sha256, pdf_path = next(iter(missing.items()))
+            self._extract_one(sha256, pdf_path, hashes)
+        elif missing:
+            workers = min(self.max_workers, len(missing))
+            print(f"📑 Extraction du texte de {len(missing)} PDF(s) sur {workers} processus...")
+            # spawn : forker le serveur Streamlit (multi-thread) depuis le thread d'ingestion peut bloquer les enfants
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {executor.submit(extract_pages, pdf_path): (sha256, pdf_path)
+                           for sha256, pdf_path in missing.items()}
+                for future in as_completed(futures):
+                    sha256, pdf_path = futures[future]
+                    try:
+                        self._save_pages(sha256, os.path.basename(pdf_path), future.result())
+                    except Exception as e:
+                        print(f"❌ Extraction impossible pour {os.path.basename(pdf_path)}: {e}")
+                        hashes.pop(pdf_path, None)
+        return hashes
+
+    def _extract_one(self, sha256: str, pdf_path: str, hashes: Dict[str, str]):
+        try:
+            self._save_pages(sha256, os.path.basename(pdf_path), extract_pages(pdf_path))
+        except Exception as e:
+            print(f"❌ Extraction impossible pour {os.path.basename(pdf_path)}: {e}")
+            hashes.pop(pdf_path, None)
+
+    def remove(self, sha256: str):
+        """Supprime le sidecar d'un contenu qui n'est plus référencé"""
+        try:
+            os.remove(self.sidecar_path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+_PDF_TEXT_EXTRACTOR: Optional[PdfTextExtractor] = None
+_PDF_TEXT_EXTRACTOR_LOCK = threading.Lock()
+
+
+def get_pdf_text_extractor() -> PdfTextExtractor:
+    """Retourne l'extracteur de texte partagé par le processus"""
+    global _PDF_TEXT_EXTRACTOR
+    with _PDF_TEXT_EXTRACTOR_LOCK:
+        if _PDF_TEXT_EXTRACTOR is None:
+            _PDF_TEXT_EXTRACTOR = PdfTextExtractor()
+        return _PDF_TEXT_EXTRACTOR
+
+
+if __name__ == "__main__":
+    knowledge_dir = sys.argv[1] if len(sys.argv) > 1 else "knowledge"
+    pdfs = sorted(
+        os.path.join(knowledge_dir, name) for name in os.listdir(knowledge_dir) if name.lower().endswith(".pdf")
+    ) if os.path.isdir(knowledge_dir) else []
+    ready = get_pdf_text_extractor().extract_all(pdfs)
+    print(f"✅ Texte disponible pour {len(ready)}/{len(pdfs)} PDF(s) dans {get_pdf_text_extractor().text_dir}")
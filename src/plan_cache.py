@@ -0,0 +1,151 @@
+from dataclasses import asdict
+from typing import Dict, List, Optional
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+PLAN_CACHE_DB = os.getenv("PLAN_CACHE_DB", os.path.join("cache", "meta_plans.db"))
+# Durée de validité d'un plan (7 jours par défaut) et nombre maximum de plans conservés
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "200"))
+# Champs d'un agent présentés au Meta Manager dans son prompt (src/sequential_tasks.py)
+PLAN_PROMPT_AGENT_FIELDS = ("name", "role", "goal", "backstory", "enabled_tools", "max_iter", "verbose")
+
+
+def normalize_text(text: str) -> str:
+    """Normalise un texte pour la clé de cache (unicode, casse, espaces)"""
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class PlanCache:
+    """Cache persistant (SQLite) des résultats du Meta Manager
+
+    Les entrées expirent après un TTL et le cache est borné en taille :
+    au-delà de max_entries, les plans les moins récemment utilisés sont évincés.
+    """
+
+    def __init__(self, db_path: str = None, ttl_seconds: int = None, max_entries: int = None):
+        self.db_path = db_path or PLAN_CACHE_DB
+        self.ttl_seconds = PLAN_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self.max_entries = PLAN_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta_plans (
+                    cache_key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(problem_statement: str, company_context: str, agents_signature: List[Dict],
+                 pdf_manifest: List[str], kind: str = "markdown") -> str:
+        """Calcule la clé d'un plan : problématique, contexte, configuration des agents et PDFs"""
+        payload = {
+            "kind": kind,
+            "problem_statement": normalize_text(problem_statement),
+            "company_context": normalize_text(company_context),
+            "agents": agents_signature,
+            "pdf_manifest": sorted(pdf_manifest),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """Retourne le plan en cache s'il existe et n'a pas expiré"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT result, created_at FROM meta_plans WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM meta_plans WHERE cache_key = ?", (cache_key,))
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE meta_plans SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, cache_key: str, result: str):
+        """Enregistre un plan et applique l'éviction TTL + LRU"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta_plans (cache_key, result, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (cache_key, result, now, now)
+            )
+            conn.execute("DELETE FROM meta_plans WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM meta_plans WHERE cache_key NOT IN (
+                    SELECT cache_key FROM meta_plans ORDER BY last_access DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM meta_plans")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retourne les compteurs hits/misses et le nombre de plans en cache"""
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM meta_plans").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+def build_plan_cache_key(problem_statement: str, company_context: str, config_manager, available_agents: List[str],
+                         kind: str = "markdown") -> str:
+    """Construit la clé de cache du Meta Manager pour une campagne donnée"""
+    from .tools import get_available_pdfs
+    from .knowledge_index import get_knowledge_index
+
+    # Configuration complète du Meta Manager (c'est lui qui produit le plan) ; pour les autres
+    # agents, seuls les champs présentés dans son prompt : changer leur modèle ou leurs
+    # collections de connaissances ne change pas le plan
+    agents_signature = []
+    meta_config = config_manager.get_agent_config("meta_manager_agent")
+    if meta_config:
+        agents_signature.append({"name": "meta_manager_agent", "config": asdict(meta_config)})
+    for agent_name in available_agents:
+        agent_config = config_manager.get_agent_config(agent_name)
+        if agent_config and agent_name != "meta_manager_agent":
+            agents_signature.append({
+                "name": agent_name,
+                "config": {field_name: getattr(agent_config, field_name) for field_name in PLAN_PROMPT_AGENT_FIELDS},
+            })
+
+    index = get_knowledge_index()
+    pdf_manifest = []
+    for pdf_path in get_available_pdfs():
+        try:
+            pdf_manifest.append(index.get_file_sha256(pdf_path))
+        except OSError:
+            continue
+
+    return PlanCache.make_key(problem_statement, company_context, agents_signature, pdf_manifest, kind)
+
+
+_PLAN_CACHE: Optional[PlanCache] = None
+_PLAN_CACHE_LOCK = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache:
+    """Retourne le cache de plans partagé par le processus"""
+    global _PLAN_CACHE
+    with _PLAN_CACHE_LOCK:
+        if _PLAN_CACHE is None:
+            _PLAN_CACHE = PlanCache()
+        return _PLAN_CACHE
@@ -0,0 +1,165 @@
+"""Parsing des résultats de campagne pour l'affichage (sans dépendance à Streamlit)"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+import re
+import hashlib
+import threading
+
+# Plateformes dont les posts sont extraits par défaut
+DEFAULT_PLATFORMS = ("linkedin", "instagram", "facebook", "twitter", "tiktok")
+# Nombre de résultats parsés conservés en mémoire (un rerun Streamlit ne reparse pas)
+PARSE_CACHE_SIZE = 32
+
+_META_PATTERN = re.compile(r"meta manager|meta agent|plan d'action")
+_POST_PATTERN = re.compile(r"post|contenu")
+_OTHER_EXCLUDED_PATTERN = re.compile(r"meta manager|meta agent|post")
+# Fin du plan du Meta Manager et exclusions du reste du contenu : plateformes historiques
+# uniquement, pour que les sections restent identiques quelles que soient les plateformes extraites
+_LEGACY_SECTION_PATTERN = re.compile(r"linkedin|instagram")
+
+_PARSE_CACHE: "OrderedDict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]" = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _tokenize_result(text: str, platforms: Tuple[str, ...]) -> Dict[str, Any]:
+    """Découpe un résultat en plan du Meta Manager, posts par plateforme et reste du contenu
+
+    Une seule passe sur les lignes, chaque ligne n'est mise en minuscules qu'une fois :
+    - un post commence sur une ligne qui cite la plateforme et "post" ou "contenu",
+      et se termine à la ligne "---" suivante ;
+    - le plan du Meta Manager va de sa première mention à la première ligne qui cite LinkedIn ou Instagram ;
+    - le reste regroupe les lignes qui ne mentionnent ni agent, ni LinkedIn, ni Instagram, ni post.
+    """
+    platform_pattern = re.compile("|".join(re.escape(platform) for platform in platforms))
+    posts: Dict[str, List[str]] = {platform: [] for platform in platforms}
+    open_posts: Dict[str, List[str]] = {}
+    meta_lines: List[str] = []
+    meta_state = "before"  # before, in, done
+    other_content: List[str] = []
+
+    # lower() sur tout le texte puis découpage : les lignes restent alignées avec l'original
+    for line, lowered in zip(text.split("\n"), text.lower().split("\n")):
+        line = line.strip()
+        lowered = lowered.strip()
+        mentioned = set(platform_pattern.findall(lowered)) if platforms else set()
+        legacy_section = _LEGACY_SECTION_PATTERN.search(lowered) is not None
+        is_post_header = bool(mentioned) and _POST_PATTERN.search(lowered) is not None
+
+        # Posts : une plateforme citée dans un en-tête ouvre un nouveau post
+        if is_post_header:
+            for platform in mentioned:
+                if open_posts.get(platform):
+                    posts[platform].append("\n".join(open_posts[platform]).strip())
+                open_posts[platform] = [line]
+        if open_posts:
+            is_separator = line.startswith("---")
+            for platform in list(open_posts):
+                if is_post_header and platform in mentioned:
+                    continue
+                if is_separator:
+                    posts[platform].append("\n".join(open_posts.pop(platform)).strip())
+                elif line:
+                    open_posts[platform].append(line)
+
+        # Plan du Meta Manager : première section uniquement
+        if meta_state != "done":
+            if _META_PATTERN.search(lowered):
+                meta_state = "in"
+                meta_lines.append(line)
+            elif meta_state == "in" and legacy_section:
+                meta_state = "done"
+            elif meta_state == "in":
+                meta_lines.append(line)
+
+        if line and not legacy_section and not _OTHER_EXCLUDED_PATTERN.search(lowered):
+            other_content.append(line)
+
+    for platform, lines in open_posts.items():
+        posts[platform].append("\n".join(lines).strip())
+
+    parsed = {
+        "meta_manager": "\n".join(meta_lines),
+        "posts": posts,
+        "other_content": other_content,
+    }
+    for platform in platforms:
+        parsed[f"{platform}_posts"] = posts[platform]
+    return parsed
+
+
+def parse_campaign_result(result, platforms: Iterable[str] = DEFAULT_PLATFORMS) -> Dict[str, Any]:
+    """Parse un résultat de campagne, mémoïsé par empreinte du texte
+
+    Le dictionnaire retourné est partagé entre les appels : il ne doit pas être modifié.
+    """
+    text = str(result)
+    platforms = tuple(platform.lower() for platform in platforms)
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), platforms)
+
+    with _PARSE_CACHE_LOCK:
+        parsed = _PARSE_CACHE.get(key)
+        if parsed is not None:
+            _PARSE_CACHE.move_to_end(key)
+            return parsed
+
+    parsed = _tokenize_result(text, platforms)
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = parsed
+        while len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return parsed
+
+
+def clear_parse_cache():
+    """Vide le cache des résultats parsés"""
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE.clear()
+
+
+def parse_markdown_result(result):
+    """Parse le résultat Markdown et extrait les sections structurées"""
+    return parse_campaign_result(result)
+
+def extract_posts_from_text(text, platform):
+    """Extrait les posts d'une plateforme spécifique du texte"""
+    return parse_campaign_result(text, platforms=(platform,))["posts"][platform.lower()]
+
+def smart_parse_result(result):
+    """Parse intelligent du résultat avec détection automatique des sections"""
+    return parse_campaign_result(result)
+
+def format_markdown_text(text):
+    """Formate le texte Markdown pour un meilleur affichage"""
+    if not text:
+        return text
+    
+    # Remplacer les éléments Markdown par du HTML pour un meilleur rendu
+    formatted = text
+    
+    # Gras
+    formatted = formatted.replace('**', '<strong>').replace('**', '</strong>')
+    
+    # Italique
+    formatted = formatted.replace('*', '<em>').replace('*', '</em>')
+    
+    # Listes à puces
+    lines = formatted.split('\n')
+    formatted_lines = []
+    in_list = False
+    
+    for line in lines:
+        if line.strip().startswith('- '):
+            if not in_list:
+                formatted_lines.append('<ul>')
+                in_list = True
+            formatted_lines.append(f'<li>{line.strip()[2:]}</li>')
+        else:
+            if in_list:
+                formatted_lines.append('</ul>')
+                in_list = False
+            formatted_lines.append(line)
+    
+    if in_list:
+        formatted_lines.append('</ul>')
+    
+    return '\n'.join(formatted_lines)
@@ -0,0 +1,206 @@
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+import threading
+
+# Dossier des exécutions (un sous-dossier par campagne)
+RUNS_DIR = os.getenv("RUNS_DIR", "runs")
+
+
+@dataclass
+class TaskCheckpoint:
+    """Sortie persistée d'une tâche terminée (texte, durée et tokens consommés)"""
+    index: int
+    agent: str  # rôle de l'agent, tel que renvoyé par CrewAI
+    description: str
+    raw: str
+    completed_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    tokens_in: Optional[int] = None
+    tokens_out: Optional[int] = None
+
+
+@dataclass
+class RunState:
+    """État persisté d'une campagne en deux phases"""
+    run_id: str
+    problem_statement: str
+    company_context: str = ""
+    selected_agents: List[str] = field(default_factory=list)
+    pdf_paths: List[str] = field(default_factory=list)
+    status: str = "running"  # running, completed, failed
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    meta_result: Optional[str] = None
+    order: List[str] = field(default_factory=list)  # Noms des agents de la phase 2, dans l'ordre d'exécution
+    tasks: Dict[int, TaskCheckpoint] = field(default_factory=dict)
+    trace_id: Optional[str] = None  # Trace de la dernière exécution (src/tracing.py)
+    model_summary: Optional[Dict[str, Dict[str, Any]]] = None  # Latence, tokens et coût par modèle de cette trace
+
+    def ordered_tasks(self) -> List[TaskCheckpoint]:
+        """Sorties des tâches terminées, dans l'ordre d'exécution"""
+        return [self.tasks[index] for index in sorted(self.tasks)]
+
+
+class RunStore:
+    """Persistance des campagnes sur disque pour pouvoir les reprendre après un échec
+
+    Chaque exécution est stockée dans <runs_dir>/<run_id>/ :
+    meta.json (entrées et statut), meta_result.md, order.json et tasks/<index>_<agent>.json.
+    Toutes les écritures sont atomiques (fichier temporaire puis renommage).
+    """
+
+    def __init__(self, runs_dir: str = None):
+        self.runs_dir = os.path.abspath(runs_dir or RUNS_DIR)
+        self._lock = threading.Lock()
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+    def _run_dir(self, run_id: str) -> str:
+        return os.path.join(self.runs_dir, run_id)
+
+    def _write_file(self, path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_json(self, path: str, data):
+        self._write_file(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def _update_meta(self, run_id: str, **changes):
+        with self._lock:
+            meta_path = os.path.join(self._run_dir(run_id), "meta.json")
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            meta.update(changes, updated_at=time.time())
+            self._write_json(meta_path, meta)
+
+    def create_run(self, problem_statement: str, company_context: str = "", selected_agents: List[str] = None,
+                   pdf_paths: List[str] = None, run_id: str = None) -> str:
+        """Crée une nouvelle exécution et retourne son identifiant"""
+        run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        self._write_json(os.path.join(self._run_dir(run_id), "meta.json"), {
+            "run_id": run_id,
+            "problem_statement": problem_statement,
+            "company_context": company_context,
+            "selected_agents": list(selected_agents or []),
+            "pdf_paths": list(pdf_paths or []),
+            "status": "running",
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        return run_id
+
+    def exists(self, run_id: str) -> bool:
+        return os.path.exists(os.path.join(self._run_dir(run_id), "meta.json"))
+
+    def save_meta_result(self, run_id: str, meta_result: str):
+        """Persiste le plan du Meta Manager (fin de la phase 1)"""
+        self._write_file(os.path.join(self._run_dir(run_id), "meta_result.md"), meta_result)
+        self._update_meta(run_id)
+
+    def save_trace(self, run_id: str, trace_id: str, model_summary: Dict[str, Dict[str, Any]] = None):
+        """Associe une trace à l'exécution, avec le résumé par modèle une fois la campagne terminée"""
+        self._update_meta(run_id, trace_id=trace_id, model_summary=model_summary)
+
+    def save_order(self, run_id: str, order: List[str]):
+        """Persiste l'ordre d'exécution des agents retenu pour la phase 2"""
+        self._write_json(os.path.join(self._run_dir(run_id), "order.json"), order)
+
+    def save_task_output(self, run_id: str, checkpoint: TaskCheckpoint):
+        """Persiste la sortie d'une tâche dès qu'elle est terminée"""
+        agent_slug = re.sub(r"[^a-z0-9]+", "_", checkpoint.agent.lower()).strip("_") or "agent"
+        path = os.path.join(self._run_dir(run_id), "tasks", f"{checkpoint.index:02d}_{agent_slug}.json")
+        self._write_json(path, asdict(checkpoint))
+        self._update_meta(run_id)
+
+    def clear_tasks_from(self, run_id: str, index: int):
+        """Supprime les sorties des tâches à partir d'un index (ordre devenu incohérent)"""
+        tasks_dir = os.path.join(self._run_dir(run_id), "tasks")
+        if not os.path.isdir(tasks_dir):
+            return
+        for filename in os.listdir(tasks_dir):
+            if filename.endswith(".json") and int(filename.split("_", 1)[0]) >= index:
+                os.remove(os.path.join(tasks_dir, filename))
+
+    def mark_completed(self, run_id: str):
+        self._update_meta(run_id, status="completed", error=None)
+
+    def mark_failed(self, run_id: str, error: str):
+        self._update_meta(run_id, status="failed", error=error)
+
+    def mark_running(self, run_id: str):
+        self._update_meta(run_id, status="running", error=None)
+
+    def load_run(self, run_id: str) -> Optional[RunState]:
+        """Recharge l'état complet d'une exécution"""
+        if not self.exists(run_id):
+            return None
+
+        run_dir = self._run_dir(run_id)
+        with open(os.path.join(run_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        state = RunState(**meta)
+
+        meta_result_path = os.path.join(run_dir, "meta_result.md")
+        if os.path.exists(meta_result_path):
+            with open(meta_result_path, "r", encoding="utf-8") as f:
+                state.meta_result = f.read()
+
+        order_path = os.path.join(run_dir, "order.json")
+        if os.path.exists(order_path):
+            with open(order_path, "r", encoding="utf-8") as f:
+                state.order = json.load(f)
+
+        tasks_dir = os.path.join(run_dir, "tasks")
+        if os.path.isdir(tasks_dir):
+            for filename in sorted(os.listdir(tasks_dir)):
+                if not filename.endswith(".json"):
+                    continue
+                with open(os.path.join(tasks_dir, filename), "r", encoding="utf-8") as f:
+                    checkpoint = TaskCheckpoint(**json.load(f))
+                state.tasks[checkpoint.index] = checkpoint
+        return state
+
+    def list_runs(self, status: str = None) -> List[RunState]:
+        """Liste les exécutions connues, de la plus récente à la plus ancienne"""
+        runs = []
+        for run_id in os.listdir(self.runs_dir):
+            if not self.exists(run_id):
+                continue
+            try:
+                state = self.load_run(run_id)
+            except (OSError, ValueError, TypeError) as e:
+                print(f"⚠️ Exécution {run_id} illisible : {e}")
+                continue
+            if status is None or state.status == status:
+                runs.append(state)
+        return sorted(runs, key=lambda state: state.created_at, reverse=True)
+
+
+_RUN_STORE: Optional[RunStore] = None
+_RUN_STORE_LOCK = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    """Retourne le stockage des exécutions partagé par le processus"""
+    global _RUN_STORE
+    with _RUN_STORE_LOCK:
+        if _RUN_STORE is None:
+            _RUN_STORE = RunStore()
+        return _RUN_STORE
@@ -6,6 +6,10 @@ import re
 import json
 from .agents import create_agent_from_config
 from .agent_config import AgentConfigManager
+from .dag_executor import ParallelTaskScheduler, topological_layers
+from .plan_cache import get_plan_cache, build_plan_cache_key
+from .context_compaction import CompactingTask, resolve_context_budget
+from .tracing import TracedCrew, TracedTask
 
 
 class SequentialTaskManager:
@@ -91,7 +95,7 @@ class SequentialTaskManager:
             available_agents = [name for name in self.config_manager.get_all_agents().keys() if name != "meta_manager_agent"]
         
         # Vérifier les PDFs disponibles
-        from .tools import get_available_pdfs
+        from .tools import get_available_pdfs, KNOWLEDGE_SEARCH_TOOL_NAME
         pdf_files = get_available_pdfs()
         pdf_info = ""
         if pdf_files:
@@ -104,10 +108,10 @@ class SequentialTaskManager:
             Les agents avec les outils PDF peuvent utiliser ces documents pour enrichir leurs réponses.
             
             INSTRUCTIONS IMPORTANTES POUR LES AGENTS AVEC OUTILS PDF :
-            - Les agents doivent utiliser l'outil "pdf_search" avec UNE SEULE chaîne de caractères comme query
-            - Exemple correct : pdf_search("Gamme Lumeal")
-            - Exemple incorrect : pdf_search({{"query": "Gamme Lumeal", "pdf": "fichier.pdf"}})
-            - L'outil recherche automatiquement dans tous les PDFs disponibles
+            - Les agents disposent d'un seul outil "{KNOWLEDGE_SEARCH_TOOL_NAME}" avec UNE SEULE chaîne de caractères comme query
+            - Exemple correct : query = "Gamme Lumeal"
+            - Exemple incorrect : {{"query": "Gamme Lumeal", "pdf": "fichier.pdf"}}
+            - L'outil recherche automatiquement dans tous les PDFs disponibles et cite le fichier source de chaque extrait
             """
         else:
             pdf_info = """
@@ -142,7 +146,7 @@ class SequentialTaskManager:
         
         agents_list = "\n\n            ".join(agents_info) if agents_info else "Aucun agent disponible"
         
-        return Task(
+        return TracedTask(
             description=dedent(f"""
             Tu es le Meta Agent Manager. Tu reçois une problématique marketing et tu dois l'analyser pour créer des tâches spécifiques et les déléguer.
             
@@ -206,7 +210,7 @@ class SequentialTaskManager:
             raise ValueError(f"Configuration non trouvée pour l'agent: {agent_name}")
         
         # Vérifier les PDFs disponibles pour cet agent
-        from .tools import get_available_pdfs
+        from .tools import get_available_pdfs, KNOWLEDGE_SEARCH_TOOL_NAME
         pdf_files = get_available_pdfs()
         pdf_context = ""
         if pdf_files and any(tool in agent_config.enabled_tools for tool in ["pdf_search", "rag_tool"]):
@@ -217,11 +221,11 @@ class SequentialTaskManager:
             {chr(10).join([f"- {os.path.basename(pdf)}" for pdf in pdf_files])}
             
             INSTRUCTIONS IMPORTANTES POUR L'UTILISATION DES OUTILS PDF :
-            - Utilise l'outil "pdf_search" avec UNE SEULE chaîne de caractères comme query
-            - Exemple correct : pdf_search("Gamme Lumeal")
-            - Exemple incorrect : pdf_search({{"query": "Gamme Lumeal", "pdf": "fichier.pdf"}})
-            - L'outil recherche automatiquement dans tous les PDFs disponibles
-            - Utilise tes outils PDF pour enrichir tes réponses avec le contenu de ces documents
+            - Utilise l'outil "{KNOWLEDGE_SEARCH_TOOL_NAME}" avec UNE SEULE chaîne de caractères comme query
+            - Exemple correct : query = "Gamme Lumeal"
+            - Exemple incorrect : {{"query": "Gamme Lumeal", "pdf": "fichier.pdf"}}
+            - L'outil recherche automatiquement dans tous les PDFs disponibles et cite le fichier source de chaque extrait
+            - Un seul appel couvre tous les documents : inutile de chercher fichier par fichier
             """
         elif any(tool in agent_config.enabled_tools for tool in ["pdf_search", "rag_tool"]):
             pdf_context = """
@@ -231,7 +235,7 @@ class SequentialTaskManager:
             Tes outils PDF ne pourront pas être utilisés.
             """
         
-        return Task(
+        return CompactingTask(
             description=dedent(f"""
             Tu es {agent_config.name}, {agent_config.role}.
             
@@ -259,6 +263,7 @@ class SequentialTaskManager:
             """).strip(),
             agent=agent,
             expected_output="Résultat conforme aux spécifications reçues via le context du Meta Manager.",
+            context_token_budget=resolve_context_budget(agent_config),
         )
     
     
@@ -358,7 +363,7 @@ class SequentialTaskManager:
         {chr(10).join([f"- {os.path.basename(pdf)}" for pdf in pdf_files])}
         Les agents avec outils PDF peuvent utiliser ces documents pour enrichir leurs réponses."""
         
-        return Task(
+        return TracedTask(
             description=dedent(f"""
             Tu es le Meta Agent Manager. Tu dois analyser cette problématique et créer un plan JSON structuré 
             pour orchestrer une équipe d'agents spécialisés.
@@ -478,29 +483,35 @@ class SequentialTaskManager:
                     tasks.append(task)
                     previous_tasks.append(task)
         else:
-            # Exécution asynchrone : créer les tâches avec dépendances définies
+            # Exécution asynchrone : graphe de dépendances explicites (DAG)
+            planned_agents = []
             for agent_name in plan["execution_order"]:
                 if agent_name not in plan["tasks"]:
                     print(f"⚠️ Aucune tâche définie pour l'agent {agent_name}")
                     continue
-                
+                planned_agents.append(agent_name)
+            
+            dependencies = {}
+            for position, agent_name in enumerate(planned_agents):
                 task_info = plan["tasks"][agent_name]
-                
-                # Pour l'async, construire le contexte basé sur les dépendances explicites
-                dependency_tasks = []
-                if task_info.get("dependencies"):
-                    for dep_agent in task_info["dependencies"]:
-                        # Trouver la tâche correspondante
-                        for existing_task in tasks:
-                            if existing_task.agent.role and dep_agent in existing_task.agent.role.lower():
-                                dependency_tasks.append(existing_task)
-                                break
-                
-                task = self._create_single_task(agent_name, task_info, 
-                                               problem_statement, company_context, 
-                                               pdf_paths, dependency_tasks)
-                if task:
-                    tasks.append(task)
+                if task_info.get("can_run_parallel") is False:
+                    # Tâche non parallélisable : elle attend toutes les tâches qui la précèdent
+                    dependencies[agent_name] = planned_agents[:position]
+                else:
+                    dependencies[agent_name] = [dep for dep in task_info.get("dependencies") or [] if dep in planned_agents]
+            
+            # Créer les tâches dans l'ordre topologique pour que les tâches amont existent déjà
+            tasks_by_agent = {}
+            for layer in topological_layers(dependencies):
+                for agent_name in [name for name in planned_agents if name in layer]:
+                    dependency_tasks = [tasks_by_agent[dep] for dep in dependencies[agent_name] if dep in tasks_by_agent]
+                    
+                    task = self._create_single_task(agent_name, plan["tasks"][agent_name], 
+                                                   problem_statement, company_context, 
+                                                   pdf_paths, dependency_tasks)
+                    if task:
+                        tasks.append(task)
+                        tasks_by_agent[agent_name] = task
         
         print(f"🎯 {len(tasks)} tâche(s) créée(s) avec succès en mode {process_type}")
         return tasks, process_type
@@ -527,11 +538,12 @@ class SequentialTaskManager:
         )
         
         # Créer la Task avec les informations du plan
-        task = Task(
+        task = CompactingTask(
             description=enriched_description,
             expected_output=task_info["expected_output"],
             agent=agent,
-            context=context_tasks.copy()  # Contexte des tâches dépendantes
+            context=context_tasks.copy(),  # Contexte des tâches dépendantes
+            context_token_budget=resolve_context_budget(self.config_manager.get_agent_config(agent_name))
         )
         
         print(f"✅ Tâche créée pour {agent_name} (priorité {task_info.get('priority', 'N/A')}, parallèle: {task_info.get('can_run_parallel', 'N/A')})")
@@ -601,33 +613,52 @@ class SequentialTaskManager:
         """).strip()
     
     def create_dynamic_crew_with_json_plan(self, problem_statement: str, company_context: str = "", 
-                                          pdf_paths: List[str] = None, selected_agents: List[str] = None) -> Crew:
-        """Crée un crew complet où le Meta Manager génère un plan JSON pour créer les vraies Task"""
+                                          pdf_paths: List[str] = None, selected_agents: List[str] = None,
+                                          use_plan_cache: bool = True):
+        """Crée un crew complet où le Meta Manager génère un plan JSON pour créer les vraies Task
+        
+        Le plan JSON est mis en cache : une problématique identique (même contexte,
+        mêmes agents et mêmes PDFs) réutilise le plan sans rappeler le Meta Manager.
+        
+        Returns:
+            Crew en mode séquentiel, ParallelTaskScheduler en mode "async" (même interface kickoff())
+        """
         
         if selected_agents is None:
             selected_agents = [name for name in self.config_manager.get_all_agents().keys() if name != "meta_manager_agent"]
         
-        # 1. Créer et exécuter le Meta Manager
-        print("🧠 Phase 1: Exécution du Meta Manager...")
-        meta_task = self.create_meta_manager_with_json_plan(problem_statement, company_context, selected_agents)
-        
-        meta_agent = create_agent_from_config("meta_manager_agent", self.config_manager, pdf_paths)
-        meta_crew = Crew(
-            agents=[meta_agent],
-            tasks=[meta_task],
-            process=Process.sequential,
-            verbose=True
-        )
+        # 1. Créer et exécuter le Meta Manager (sauf si le plan est en cache)
+        plan_cache = get_plan_cache()
+        cache_key = build_plan_cache_key(problem_statement, company_context, self.config_manager, selected_agents, kind="json")
+        meta_result = plan_cache.get(cache_key) if use_plan_cache else None
+        plan_from_cache = meta_result is not None
         
-        # Exécuter le Meta Manager
-        meta_result = meta_crew.kickoff()
-        print("✅ Meta Manager terminé")
+        if plan_from_cache:
+            print("♻️ Phase 1: Plan JSON du Meta Manager retrouvé en cache")
+        else:
+            print("🧠 Phase 1: Exécution du Meta Manager...")
+            meta_task = self.create_meta_manager_with_json_plan(problem_statement, company_context, selected_agents)
+            
+            meta_agent = create_agent_from_config("meta_manager_agent", self.config_manager, pdf_paths)
+            meta_crew = TracedCrew(
+                agents=[meta_agent],
+                tasks=[meta_task],
+                process=Process.sequential,
+                verbose=True
+            )
+            
+            # Exécuter le Meta Manager
+            meta_result = str(meta_crew.kickoff())
+            print("✅ Meta Manager terminé")
         
         # 2. Parser le résultat et créer les vraies Task
         print("🔄 Phase 2: Création des tâches dynamiques...")
         dynamic_tasks, process_type = self.parse_json_plan_and_create_tasks(
             meta_result, problem_statement, company_context, pdf_paths
         )
+        # Ne mettre en cache qu'un nouveau plan qui a pu être parsé (un plan retrouvé garde sa date d'expiration)
+        if not plan_from_cache:
+            plan_cache.put(cache_key, meta_result)
         
         if not dynamic_tasks:
             raise ValueError("❌ Aucune tâche créée - vérifiez le plan du Meta Manager")
@@ -638,21 +669,17 @@ class SequentialTaskManager:
             # L'agent est déjà créé dans la tâche
             dynamic_agents.append(task.agent)
         
-        # 4. Déterminer le type de processus CrewAI
-        crew_process = Process.sequential
+        # 4. Mode asynchrone : exécuter le DAG des dépendances en parallèle
+        print("🎯 Phase 3: Création du crew final...")
         if process_type == "async":
-            # CrewAI n'a pas de Process.async, on utilise hierarchical pour permettre plus de parallélisme
-            crew_process = Process.hierarchical
-            print("📋 Utilisation du processus hierarchical (le plus proche de l'asynchrone)")
-        else:
-            print("📋 Utilisation du processus sequential")
+            print("📋 Utilisation de l'exécuteur parallèle (DAG des dépendances)")
+            return ParallelTaskScheduler(dynamic_tasks)
         
-        # 5. Créer le crew final avec les vraies Task
-        print("🎯 Phase 3: Création du crew final...")
-        return Crew(
+        print("📋 Utilisation du processus sequential")
+        return TracedCrew(
             agents=dynamic_agents,
             tasks=dynamic_tasks,
-            process=crew_process,
+            process=Process.sequential,
             verbose=True
         )
 
@@ -1,97 +1,348 @@
-from crewai_tools import SerperDevTool, WebsiteSearchTool, ScrapeWebsiteTool, PDFSearchTool, RagTool
-from typing import List, Dict, Any
+from crewai_tools import SerperDevTool, WebsiteSearchTool, ScrapeWebsiteTool
+from typing import List, Dict, Any, Callable, Hashable, Optional, Tuple, Type
 import os
+import fnmatch
+import hashlib
+import functools
+import threading
 from crewai import Agent, Task, Crew
+from crewai.tools import BaseTool
+from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
 from pydantic import BaseModel, Field
+from .knowledge_index import get_knowledge_index
+from .pdf_extraction import get_pdf_text_extractor
+from .knowledge_ingestion import get_knowledge_ingestor, is_ingestor_running
+from .web_cache import web_cache_tool_middleware
+from .web_research import BatchWebResearchTool
+
+
+class ToolRegistry:
+    """Registre process-wide des outils : chaque outil est construit une seule fois
+    et n'est reconstruit que si les entrées dont il dépend (clés API, fichier PDF) changent."""
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Hashable, Any]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_create(self, name: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Retourne l'outil en cache si sa clé est inchangée, sinon le (re)construit"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            
+            self.misses += 1
+            tool = instrument_tool(factory())
+            self._entries[name] = (key, tool)
+            return tool
+    
+    def prune(self, prefix: str, valid_names: List[str]):
+        """Supprime les entrées d'un préfixe donné qui ne sont plus valides (ex: PDF supprimé)"""
+        with self._lock:
+            for name in list(self._entries.keys()):
+                if name.startswith(prefix) and name not in valid_names:
+                    del self._entries[name]
+    
+    def clear(self):
+        """Vide complètement le registre"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Retourne les compteurs hits/misses et le nombre d'outils en cache"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Middlewares appliqués à chaque appel d'outil, du premier (le plus externe) au dernier :
+# middleware(tool, call_next, *args, **kwargs) doit appeler call_next(*args, **kwargs)
+_TOOL_MIDDLEWARES: List[Callable] = []
+# Middlewares placés après tous les autres, au plus près de l'outil (ex: cache web)
+_INNER_TOOL_MIDDLEWARES: List[Callable] = []
+
+
+def register_tool_middleware(middleware: Callable, innermost: bool = False):
+    """Ajoute un middleware à la chaîne d'appel des outils (sans doublon)
+    
+    Un middleware innermost reste au plus près de l'outil, quel que soit l'ordre
+    d'enregistrement : les spans et la cassette voient ce qu'il retourne.
+    """
+    middlewares = _INNER_TOOL_MIDDLEWARES if innermost else _TOOL_MIDDLEWARES
+    if middleware not in middlewares:
+        middlewares.append(middleware)
+
+
+def unregister_tool_middleware(middleware: Callable):
+    """Retire un middleware de la chaîne d'appel des outils"""
+    for middlewares in (_TOOL_MIDDLEWARES, _INNER_TOOL_MIDDLEWARES):
+        if middleware in middlewares:
+            middlewares.remove(middleware)
+
+
+def instrument_tool(tool: Any) -> Any:
+    """Fait passer les appels de l'outil par la chaîne de middlewares (idempotent)
+    
+    La chaîne est relue à chaque appel : un middleware enregistré après la
+    création de l'outil s'applique aussi à lui.
+    """
+    if getattr(tool, "_middlewares_installed", False) or not hasattr(tool, "_run"):
+        return tool
+    
+    original_run = tool._run
+    
+    @functools.wraps(original_run)
+    def run_with_middlewares(*args, **kwargs):
+        call = original_run
+        for middleware in reversed(_TOOL_MIDDLEWARES + _INNER_TOOL_MIDDLEWARES):
+            call = functools.partial(middleware, tool, call)
+        return call(*args, **kwargs)
+    
+    # object.__setattr__ : les outils sont des modèles pydantic
+    object.__setattr__(tool, "_run", run_with_middlewares)
+    object.__setattr__(tool, "_middlewares_installed", True)
+    return tool
+
+
+# Registre partagé par toutes les sessions du processus
+_TOOL_REGISTRY = ToolRegistry()
+
+# Recherches et pages web servies depuis le cache disque (src/web_cache.py)
+register_tool_middleware(web_cache_tool_middleware, innermost=True)
+
+
+def get_tool_registry() -> ToolRegistry:
+    """Retourne le registre d'outils du processus"""
+    return _TOOL_REGISTRY
+
+
+def env_fingerprint(var_name: str) -> str:
+    """Empreinte d'une variable d'environnement (la valeur brute n'est pas conservée)"""
+    return hashlib.sha256(os.getenv(var_name, "").encode("utf-8")).hexdigest()
+
+
+def pdf_fingerprint(pdf_path: str) -> Tuple[str, int, int]:
+    """Empreinte d'un PDF : nom, taille et date de modification"""
+    try:
+        stat = os.stat(pdf_path)
+        return (os.path.basename(pdf_path), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return (os.path.basename(pdf_path), -1, -1)
+
+
+def get_knowledge_fingerprint() -> Tuple[Tuple[str, int, int], ...]:
+    """Empreinte du dossier knowledge/ (noms, tailles, dates de modification)"""
+    return tuple(sorted(pdf_fingerprint(pdf_path) for pdf_path in get_available_pdfs()))
+
+
+KNOWLEDGE_SEARCH_TOOL_NAME = "Recherche dans les connaissances"
+
+
+class PDFSearchInput(BaseModel):
+    """Entrée des outils de recherche PDF"""
+    query: str = Field(..., description="Requête de recherche sous forme d'une seule chaîne de caractères")
+
+
+class KnowledgeSearchTool(BaseTool):
+    """Outil unique de recherche sémantique dans tous les documents de knowledge/
+    
+    Tous les PDFs sont interrogés via un seul index : les meilleurs extraits de
+    tous les fichiers sont fusionnés et chacun cite son fichier source.
+    """
+    name: str = KNOWLEDGE_SEARCH_TOOL_NAME
+    description: str = (
+        "Recherche sémantique dans tous les documents PDF du dossier knowledge/. "
+        "Prend une seule chaîne de caractères comme requête ; les résultats de tous "
+        "les fichiers sont fusionnés et chaque extrait indique son fichier source."
+    )
+    args_schema: Type[BaseModel] = PDFSearchInput
+    pdf_paths: Optional[List[str]] = None  # None = tous les PDFs disponibles
+    top_k: int = 5
+    
+    def _run(self, query: str) -> str:
+        pdf_paths = self.pdf_paths if self.pdf_paths is not None else get_available_pdfs()
+        results = get_knowledge_index().search(query, pdf_paths, top_k=self.top_k)
+        if not results:
+            return "Aucun résultat trouvé dans les documents de knowledge/"
+        return "\n\n".join(
+            f"[Source : {source} | pertinence {score:.2f}]\n{chunk}"
+            for score, source, chunk in results
+        )
+
+
+class IndexedPDFKnowledgeSource(PDFKnowledgeSource):
+    """Source de connaissance PDF alimentée par l'index persistant
+    
+    Le texte et les vecteurs sont lus depuis l'index : le PDF n'est ni re-parsé
+    ni ré-embeddé s'il n'a pas changé depuis sa dernière indexation.
+    """
+    
+    def _indexed_paths(self) -> List[str]:
+        paths = getattr(self, "safe_file_paths", None) or getattr(self, "file_paths", None) or []
+        if not isinstance(paths, list):
+            paths = [paths]
+        return [str(path) for path in paths]
+    
+    def load_content(self) -> Dict[Any, str]:
+        # Texte pré-extrait (sidecars par page) : le PDF n'est pas re-parsé
+        index = get_knowledge_index()
+        extractor = get_pdf_text_extractor()
+        return {
+            path: "\n\n".join(page for page in extractor.get_pages(path, index.get_file_sha256(path)) if page)
+            for path in self._indexed_paths()
+        }
+    
+    def add(self) -> None:
+        index = get_knowledge_index()
+        # Un même contenu (deux chemins vers le même PDF) n'est inséré qu'une fois
+        documents = list({document.sha256: document for document in map(index.get_or_build, self._indexed_paths())}.values())
+        self.chunks = [chunk for document in documents for chunk in document.chunks]
+        
+        try:
+            # Insérer directement les vecteurs pré-calculés : Chroma n'appelle pas l'embedder.
+            # Identifiant = document + position : un texte répété (pages types) reste un chunk distinct
+            collection = self.storage.collection
+            collection.upsert(
+                ids=[f"{document.sha256}:{position}" for document in documents for position in range(len(document.chunks))],
+                documents=self.chunks,
+                embeddings=[vector.tolist() for document in documents for vector in document.vectors],
+                metadatas=[{"source": document.source_name} for document in documents for _ in document.chunks],
+            )
+        except AttributeError:
+            # Stockage sans collection Chroma exposée : sauvegarde standard de CrewAI
+            self._save_documents()
+
 
 def get_available_pdfs() -> List[str]:
-    """Retourne la liste des PDFs disponibles dans le dossier knowledge/"""
+    """Retourne la liste des PDFs disponibles dans le dossier knowledge/ (sous-dossiers compris)
+    
+    Si le watcher d'ingestion tourne, la liste provient de son manifeste
+    (tenu à jour en continu) plutôt que d'un nouveau parcours du dossier.
+    """
+    if is_ingestor_running():
+        return get_knowledge_ingestor().list_pdfs()
+    
     knowledge_dir = "knowledge"
     pdf_files = []
     
     # Utiliser le chemin absolu du dossier knowledge
     knowledge_abs_dir = os.path.abspath(knowledge_dir)
     
-    if os.path.exists(knowledge_abs_dir):
-        for file in os.listdir(knowledge_abs_dir):
+    for root, dirs, files in os.walk(knowledge_abs_dir):
+        # Les dossiers cachés (.objects, ...) ne sont pas des collections
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        for file in sorted(files):
             if file.lower().endswith('.pdf'):
                 # Utiliser des chemins absolus pour éviter les problèmes de répertoire de travail
-                pdf_files.append(os.path.join(knowledge_abs_dir, file))
+                pdf_files.append(os.path.join(root, file))
     
     return pdf_files
 
 
-def create_pdf_search_tools(pdf_files: List[str]) -> List[PDFSearchTool]:
-    """Crée une liste d'outils PDFSearchTool pour chaque fichier PDF"""
-    tools = []
+def _knowledge_relpath(pdf_path: str) -> str:
+    """Chemin d'un PDF relatif à knowledge/ (séparateurs « / »)"""
+    return os.path.relpath(os.path.abspath(pdf_path), os.path.abspath("knowledge")).replace(os.sep, "/")
+
+
+def match_knowledge_collections(pdf_paths: List[str], collections: Optional[List[str]]) -> List[str]:
+    """Filtre les PDFs appartenant à au moins une des collections données
     
-    for pdf_path in pdf_files:
-        try:
-            tool = PDFSearchTool(pdf=pdf_path)
-            tools.append(tool)
-            print(f"✅ Outil PDF créé pour: {os.path.basename(pdf_path)}")
-        except Exception as e:
-            print(f"❌ Erreur création outil pour {os.path.basename(pdf_path)}: {e}")
+    Une collection est un sous-dossier de knowledge/ (« rse » ou « rse/ ») ou un motif
+    glob sur le chemin relatif ou le nom du fichier (« *charte*.pdf », « clients/*.pdf »),
+    sans tenir compte de la casse. None = aucune restriction, [] = aucun PDF.
+    """
+    if collections is None:
+        return list(pdf_paths)
+    patterns = [collection.strip().lower() for collection in collections if collection and collection.strip()]
+    matched = []
+    for pdf_path in pdf_paths:
+        relpath = _knowledge_relpath(pdf_path).lower()
+        filename = os.path.basename(relpath)
+        if any(pattern == "*"
+               or relpath.startswith(pattern.rstrip("/") + "/")
+               or fnmatch.fnmatchcase(relpath, pattern)
+               or fnmatch.fnmatchcase(filename, pattern)
+               for pattern in patterns):
+            matched.append(pdf_path)
+    return matched
+
+
+def list_knowledge_collections() -> List[str]:
+    """Sous-dossiers de knowledge/ contenant des PDFs (collections proposées dans l'éditeur)"""
+    folders = set()
+    for pdf_path in get_available_pdfs():
+        parts = _knowledge_relpath(pdf_path).split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            folders.add("/".join(parts[:depth]))
+    return sorted(folders)
+
+
+def get_knowledge_search_tool(collections: Optional[List[str]] = None,
+                              pdf_paths: Optional[List[str]] = None) -> Optional[KnowledgeSearchTool]:
+    """Retourne l'outil de recherche couvrant les PDFs donnés, restreints aux collections (une instance par périmètre)
     
-    return tools
+    pdf_paths est le périmètre du crew (None = tous les PDFs de knowledge/) ; l'outil ne couvre
+    que ceux qui appartiennent aussi aux collections de l'agent. Deux agents dont les périmètres
+    désignent les mêmes PDFs partagent la même instance ; None si aucun PDF ne correspond.
+    """
+    if collections is None and pdf_paths is None:
+        return _TOOL_REGISTRY.get_or_create("knowledge_search", None, KnowledgeSearchTool)
+    
+    candidates = get_available_pdfs() if pdf_paths is None else pdf_paths
+    pdf_paths = sorted(os.path.abspath(pdf_path) for pdf_path in match_knowledge_collections(candidates, collections))
+    if not pdf_paths:
+        return None
+    scope = hashlib.sha256("\n".join(pdf_paths).encode("utf-8")).hexdigest()[:16]
+    scope_label = ", ".join(collections) if collections else "périmètre du crew"
+    return _TOOL_REGISTRY.get_or_create(
+        f"knowledge_search:{scope}",
+        tuple(pdf_fingerprint(pdf_path) for pdf_path in pdf_paths),
+        lambda: KnowledgeSearchTool(
+            pdf_paths=pdf_paths,
+            description=(
+                f"Recherche sémantique dans {len(pdf_paths)} document(s) PDF de knowledge/ "
+                f"({scope_label}). Prend une seule chaîne de caractères comme requête ; "
+                "chaque extrait indique son fichier source."
+            )
+        )
+    )
+
+
+def create_pdf_search_tools(pdf_files: List[str]) -> List[KnowledgeSearchTool]:
+    """Crée un outil de recherche unique couvrant les fichiers PDF donnés"""
+    if not pdf_files:
+        return []
+    return [instrument_tool(KnowledgeSearchTool(pdf_paths=list(pdf_files)))]
 
 def create_smart_pdf_tools():
-    """Crée des outils PDF intelligents qui utilisent automatiquement les PDFs disponibles"""
+    """Retourne l'outil de recherche partagé qui couvre automatiquement les PDFs disponibles"""
     pdf_files = get_available_pdfs()
     
     if pdf_files:
-        # Affichage debug des chemins PDF
-        print(f"🔍 Création des outils PDF avec {len(pdf_files)} fichier(s):")
-        for pdf_path in pdf_files:
-            print(f"   📄 Chemin PDF: {pdf_path}")
-            print(f"   📄 Fichier existe: {os.path.exists(pdf_path)}")
-        
-        # Créer les outils PDF pour chaque fichier
-        tools = create_pdf_search_tools(pdf_files)
-        print(f"✅ {len(tools)} outil(s) PDF créé(s) avec succès")
-        return tools
+        print(f"🔍 Outil de recherche partagé sur {len(pdf_files)} fichier(s) PDF")
+        return [get_knowledge_search_tool()]
     else:
         # Retourner une liste vide si aucun PDF n'est disponible
-        print("⚠️ Aucun PDF disponible pour créer les outils PDFSearchTool")
+        print("⚠️ Aucun PDF disponible pour l'outil de recherche PDF")
         return []
 
 
-def create_rag_tools(pdf_files: List[str]) -> List[RagTool]:
-    """Crée une liste d'outils RagTool pour chaque fichier PDF"""
-    tools = []
-    
-    for pdf_path in pdf_files:
-        try:
-            tool = RagTool(pdf=pdf_path)
-            tools.append(tool)
-            print(f"✅ Outil RAG créé pour: {os.path.basename(pdf_path)}")
-        except Exception as e:
-            print(f"❌ Erreur création RAG pour {os.path.basename(pdf_path)}: {e}")
-    
-    return tools
+def create_rag_tools(pdf_files: List[str]) -> List[KnowledgeSearchTool]:
+    """Crée un outil RAG unique couvrant les fichiers PDF donnés"""
+    return create_pdf_search_tools(pdf_files)
 
 def create_smart_rag_tools():
-    """Crée des outils RAG intelligents qui utilisent automatiquement les PDFs disponibles"""
-    pdf_files = get_available_pdfs()
-    
-    if pdf_files:
-        # Affichage debug des chemins PDF
-        print(f"🔍 Création des outils RAG avec {len(pdf_files)} fichier(s):")
-        for pdf_path in pdf_files:
-            print(f"   📄 Chemin PDF: {pdf_path}")
-            print(f"   📄 Fichier existe: {os.path.exists(pdf_path)}")
-        
-        # Créer les outils RAG pour chaque fichier
-        tools = create_rag_tools(pdf_files)
-        print(f"✅ {len(tools)} outil(s) RAG créé(s) avec succès")
-        return tools
-    else:
-        # Retourner une liste vide si aucun PDF n'est disponible
-        print("⚠️ Aucun PDF disponible pour créer les outils RagTool")
-        return []
+    """Retourne l'outil de recherche partagé (pdf_search et rag_tool utilisent le même index)"""
+    return create_smart_pdf_tools()
 
 def get_available_tools() -> Dict[str, Any]:
-    """Retourne la liste des outils disponibles avec leurs configurations"""
+    """Retourne la liste des outils disponibles avec leurs configurations
+    
+    Les instances d'outils proviennent du registre du processus : elles ne sont
+    reconstruites que si les clés API ou le contenu de knowledge/ ont changé.
+    """
     tools = {}
     
     # Serper pour recherche web
@@ -99,7 +350,7 @@ def get_available_tools() -> Dict[str, Any]:
         tools["serper_search"] = {
             "name": "Recherche Web (Serper)",
             "description": "Recherche d'informations sur le web via Serper",
-            "tool": SerperDevTool(),
+            "tool": _TOOL_REGISTRY.get_or_create("serper_search", env_fingerprint("SERPER_API_KEY"), SerperDevTool),
             "enabled": True
         }
     
@@ -107,7 +358,7 @@ def get_available_tools() -> Dict[str, Any]:
     tools["website_search"] = {
         "name": "Recherche sur Site Web",
         "description": "Recherche dans le contenu d'un site web spécifique",
-        "tool": WebsiteSearchTool(),
+        "tool": _TOOL_REGISTRY.get_or_create("website_search", env_fingerprint("OPENAI_API_KEY"), WebsiteSearchTool),
         "enabled": True
     }
     
@@ -115,7 +366,15 @@ def get_available_tools() -> Dict[str, Any]:
     tools["scrape_website"] = {
         "name": "Scraping de Site Web",
         "description": "Extraction du contenu d'une page web",
-        "tool": ScrapeWebsiteTool(),
+        "tool": _TOOL_REGISTRY.get_or_create("scrape_website", None, ScrapeWebsiteTool),
+        "enabled": True
+    }
+    
+    # Recherche web en lot : plusieurs requêtes et pages en un seul appel (les URLs seules n'exigent pas Serper)
+    tools["batch_web_research"] = {
+        "name": "Recherche Web en Lot",
+        "description": "Plusieurs recherches web et lectures de pages en parallèle, en un seul appel, avec des extraits dédoublonnés",
+        "tool": _TOOL_REGISTRY.get_or_create("batch_web_research", env_fingerprint("SERPER_API_KEY"), BatchWebResearchTool),
         "enabled": True
     }
     
@@ -127,14 +386,14 @@ def get_available_tools() -> Dict[str, Any]:
         
         tools["pdf_search"] = {
             "name": "Recherche PDF (CrewAI)",
-            "description": f"Recherche sémantique dans {len(pdf_files)} fichier(s) PDF disponible(s) dans le dossier knowledge/",
+            "description": f"Recherche sémantique dans {len(pdf_files)} fichier(s) PDF disponible(s) dans le dossier knowledge/, via un outil unique qui cite ses sources",
             "tools": pdf_tools,
             "enabled": True
         }
         
         tools["rag_tool"] = {
             "name": "RAG Tool (CrewAI)",
-            "description": f"Recherche dans base de connaissances via CrewAI. Utilise automatiquement {len(pdf_files)} fichier(s) PDF disponible(s).",
+            "description": f"Recherche dans base de connaissances via CrewAI. Utilise automatiquement {len(pdf_files)} fichier(s) PDF disponible(s) (même index que pdf_search).",
             "tools": rag_tools,
             "enabled": True
         }
@@ -156,10 +415,36 @@ def get_available_tools() -> Dict[str, Any]:
     
     return tools
 
+def _build_pdf_knowledge_source(source_path: str) -> "IndexedPDFKnowledgeSource":
+    """Construit la source de connaissance d'un PDF (selon la signature acceptée par CrewAI)"""
+    filename = os.path.basename(source_path)
+    try:
+        # Essayer différentes méthodes de construction
+        pdf_source = IndexedPDFKnowledgeSource(file_path=source_path)
+        print(f"   📖 Source de connaissance créée pour: {filename}")
+        return pdf_source
+    except Exception as e:
+        print(f"   ⚠️ Erreur avec file_path, essai avec file_paths: {e}")
+    try:
+        # Essayer avec file_paths (au pluriel)
+        pdf_source = IndexedPDFKnowledgeSource(file_paths=[source_path])
+        print(f"   📖 Source de connaissance créée pour: {filename} (avec file_paths)")
+        return pdf_source
+    except Exception as e2:
+        print(f"   ⚠️ Erreur avec file_paths, essai avec constructeur par défaut: {e2}")
+    # Essayer avec le constructeur par défaut
+    pdf_source = IndexedPDFKnowledgeSource(source_path)
+    print(f"   📖 Source de connaissance créée pour: {filename} (constructeur par défaut)")
+    return pdf_source
+
 def create_pdf_knowledge_sources(pdf_paths: List[str]) -> List:
-    """Prépare les PDFs pour les outils CrewAI"""
-    from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
+    """Prépare les PDFs pour les outils CrewAI (sources adossées à l'index persistant)
     
+    Les sources sont propres à l'agent qui les reçoit : CrewAI leur attache le stockage de
+    l'agent avant d'y ajouter les chunks, une source partagée pourrait donc écrire dans la
+    collection d'un autre agent construit en même temps. Seuls les documents indexés
+    (texte et vecteurs) sont partagés, via l'index de connaissances.
+    """
     knowledge_sources = []
     
     if not pdf_paths:
@@ -182,14 +467,14 @@ def create_pdf_knowledge_sources(pdf_paths: List[str]) -> List:
         if os.path.exists(abs_pdf_path):
             import shutil
             filename = os.path.basename(abs_pdf_path)
-            dest_path = os.path.join(knowledge_dir, filename)
             
-            # Vérifier si le fichier est déjà dans le dossier knowledge
-            if os.path.abspath(abs_pdf_path) == os.path.abspath(dest_path):
-                print(f"   ✅ PDF déjà dans knowledge/: {filename}")
-                source_path = dest_path
+            # Vérifier si le fichier est déjà dans le dossier knowledge (ou l'une de ses collections)
+            if os.path.commonpath([abs_pdf_path, knowledge_dir]) == knowledge_dir:
+                print(f"   ✅ PDF déjà dans knowledge/: {_knowledge_relpath(abs_pdf_path)}")
+                source_path = abs_pdf_path
             else:
                 # Copier le fichier dans le dossier knowledge
+                dest_path = os.path.join(knowledge_dir, filename)
                 try:
                     shutil.copy2(abs_pdf_path, dest_path)
                     print(f"   ✅ PDF copié: {filename}")
@@ -198,72 +483,61 @@ def create_pdf_knowledge_sources(pdf_paths: List[str]) -> List:
                     print(f"   ❌ Erreur lors de la copie de {filename}: {e}")
                     continue
             
-            # Créer une source de connaissance pour ce PDF avec le chemin absolu
+            # Nouvelle source pour cet agent, avec le chemin absolu
             try:
-                # Essayer différentes méthodes de construction
-                pdf_source = PDFKnowledgeSource(file_path=os.path.abspath(source_path))
-                knowledge_sources.append(pdf_source)
-                print(f"   📖 Source de connaissance créée pour: {filename}")
-            except Exception as e:
-                print(f"   ⚠️ Erreur avec file_path, essai avec file_paths: {e}")
-                try:
-                    # Essayer avec file_paths (au pluriel)
-                    pdf_source = PDFKnowledgeSource(file_paths=[os.path.abspath(source_path)])
-                    knowledge_sources.append(pdf_source)
-                    print(f"   📖 Source de connaissance créée pour: {filename} (avec file_paths)")
-                except Exception as e2:
-                    print(f"   ⚠️ Erreur avec file_paths, essai avec constructeur par défaut: {e2}")
-                    try:
-                        # Essayer avec le constructeur par défaut
-                        pdf_source = PDFKnowledgeSource(os.path.abspath(source_path))
-                        knowledge_sources.append(pdf_source)
-                        print(f"   📖 Source de connaissance créée pour: {filename} (constructeur par défaut)")
-                    except Exception as e3:
-                        print(f"   ❌ Toutes les méthodes ont échoué pour {filename}: {e3}")
+                knowledge_sources.append(_build_pdf_knowledge_source(source_path))
+            except Exception as e3:
+                print(f"   ❌ Toutes les méthodes ont échoué pour {filename}: {e3}")
                     
         else:
             print(f"   ⚠️ Fichier non trouvé: {abs_pdf_path}")
     
-    print(f"💡 {len(knowledge_sources)} source(s) de connaissance PDF créée(s)")
+    print(f"💡 {len(knowledge_sources)} source(s) de connaissance PDF prête(s)")
     print("🎯 Les PDFs sont prêts dans le dossier knowledge/")
     return knowledge_sources
 
-def get_tools_for_agent(agent_name: str, enabled_tools: List[str]) -> List[Any]:
-    """Retourne les outils activés pour un agent spécifique"""
+def get_tools_for_agent(agent_name: str, enabled_tools: List[str], knowledge_collections: Optional[List[str]] = None,
+                        pdf_paths: Optional[List[str]] = None) -> List[Any]:
+    """Retourne les outils activés pour un agent spécifique
+    
+    Les outils PDF ne couvrent que les PDFs du crew (pdf_paths, tous si None) appartenant
+    aux collections de connaissances de l'agent (toutes si None).
+    """
     available_tools = get_available_tools()
     agent_tools = []
     
-    # Vérifier si des PDFs sont disponibles
-    pdf_files = get_available_pdfs()
-    has_pdfs = len(pdf_files) > 0
-    
     for tool_name in enabled_tools:
         if tool_name in available_tools and available_tools[tool_name]["enabled"]:
             tool_config = available_tools[tool_name]
             
             # Gestion intelligente des outils PDF
             if tool_name in ["pdf_search", "rag_tool"]:
-                tools_list = tool_config.get("tools", [])
-                if has_pdfs and tools_list:
-                    agent_tools.extend(tools_list)
-                    print(f"✅ Agent {agent_name}: {len(tools_list)} outil(s) {tool_name} activé(s) avec {len(pdf_files)} PDF(s)")
-                    # Affichage debug des chemins PDF utilisés
-                    for pdf_path in pdf_files:
-                        print(f"   📄 PDF: {pdf_path}")
-                else:
-                    print(f"⚠️ Agent {agent_name}: Outil {tool_name} désactivé (aucun PDF disponible)")
+                # pdf_search et rag_tool partagent le même outil : ne l'ajouter qu'une fois
+                tool = get_knowledge_search_tool(knowledge_collections, pdf_paths)
+                if tool is None:
+                    print(f"⚠️ Agent {agent_name}: Outil {tool_name} désactivé (aucun PDF du crew dans ses collections {knowledge_collections})")
+                    continue
+                if not any(tool is existing for existing in agent_tools):
+                    agent_tools.append(tool)
+                scoped_pdfs = tool.pdf_paths if tool.pdf_paths is not None else get_available_pdfs()
+                print(f"✅ Agent {agent_name}: outil {tool_name} activé avec {len(scoped_pdfs)} PDF(s)")
+                # Affichage debug des chemins PDF utilisés
+                for pdf_path in scoped_pdfs:
+                    print(f"   📄 PDF: {pdf_path}")
             else:
                 # Pour les autres outils, ajouter normalement
                 tool = tool_config.get("tool")
                 if tool is not None:
                     agent_tools.append(tool)
+        elif tool_name in ["pdf_search", "rag_tool"]:
+            print(f"⚠️ Agent {agent_name}: Outil {tool_name} désactivé (aucun PDF disponible)")
     
     return agent_tools
 
 # Configuration par défaut des outils par agent
 DEFAULT_AGENT_TOOLS = {
     "meta_manager_agent": ["serper_search", "rag_tool"],
-    "clara_detective_digitale": ["serper_search", "website_search", "scrape_website"],
+    "clara_detective_digitale": ["batch_web_research", "serper_search", "website_search", "scrape_website"],
     "julien_analyste_strategique": ["pdf_search", "rag_tool"],
     "sophie_plume_solidaire": ["serper_search", "rag_tool"]
 }
\ No newline at end of file
@@ -0,0 +1,415 @@
+"""Traçage des campagnes : un span par campagne, crew, tâche, appel d'outil et appel LLM
+
+Les spans terminés sont ajoutés au fichier JSONL TRACE_FILE (une ligne par span).
+Résumé de la dernière trace :
+    python -m src.tracing [trace_id]
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from pydantic import PrivateAttr
+from crewai import Crew, Task
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("traces", "spans.jsonl"))
+# Attente maximale des spans LLM encore en cours d'écriture avant de résumer une trace
+LLM_SPAN_FLUSH_TIMEOUT = float(os.getenv("LLM_SPAN_FLUSH_TIMEOUT", "10"))
+
+
+@dataclass
+class Span:
+    """Intervalle de temps mesuré (campagne, crew, tâche, outil ou appel LLM)"""
+    kind: str  # campaign, crew, task, tool, llm
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.time()) - self.start_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["duration"] = round(self.duration, 3)
+        return data
+
+
+# Span courant du thread (ou de la tâche) en cours d'exécution
+_CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Optional[Span]:
+    return _CURRENT_SPAN.get()
+
+
+class JsonlSpanSink:
+    """Écrit les spans terminés dans un fichier JSONL (ajout en fin de fichier)"""
+
+    def __init__(self, path: str = None):
+        self.path = os.path.abspath(path or TRACE_FILE)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def write(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    """Crée les spans, gère leur imbrication et les transmet au sink"""
+
+    def __init__(self, sink: JsonlSpanSink = None, enabled: bool = None):
+        self.enabled = TRACING_ENABLED if enabled is None else enabled
+        self.sink = sink or JsonlSpanSink()
+
+    def start_span(self, kind: str, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Ouvre un span sans le rendre courant (voir span() pour l'usage normal)"""
+        parent = parent if parent is not None else get_current_span()
+        return Span(
+            kind=kind,
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None, end_time: float = None):
+        span.end_time = end_time or time.time()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if self.enabled:
+            try:
+                self.sink.write(span)
+            except OSError as e:
+                print(f"⚠️ Impossible d'écrire le span {span.name} : {e}")
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes) -> Iterator[Span]:
+        """Mesure le bloc englobé ; les spans ouverts à l'intérieur en deviennent les enfants"""
+        span = self.start_span(kind, name, **attributes)
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, error=e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _CURRENT_SPAN.reset(token)
+
+
+def tracing_tool_middleware(tool, call_next, *args, **kwargs):
+    """Middleware d'outil : un span par appel, avec la taille des arguments et du résultat"""
+    arguments = json.dumps([args, kwargs], ensure_ascii=False, default=str)
+    with get_tracer().span("tool", getattr(tool, "name", type(tool).__name__), args_chars=len(arguments)) as span:
+        result = call_next(*args, **kwargs)
+        span.attributes["result_chars"] = len(str(result))
+        return result
+
+
+try:
+    from litellm.integrations.custom_logger import CustomLogger as _LiteLLMLogger
+except ImportError:
+    _LiteLLMLogger = object
+
+
+def _response_cost(kwargs: Dict[str, Any], response_obj) -> Optional[float]:
+    """Coût d'un appel en dollars (calculé par LiteLLM d'après sa grille de prix), None si inconnu"""
+    cost = kwargs.get("response_cost")
+    if cost is None and response_obj is not None:
+        try:
+            import litellm
+            cost = litellm.completion_cost(completion_response=response_obj)
+        except Exception:
+            return None
+    return cost
+
+
+class LiteLLMSpanLogger(_LiteLLMLogger):
+    """Callback LiteLLM : un span par appel LLM (modèle, tokens, durée, erreur)
+
+    Le parent est capturé avant l'appel, dans le thread appelant : LiteLLM
+    exécute ensuite les callbacks de succès dans un thread à part. Un appel reste
+    « en attente » jusqu'à l'écriture de son span (voir wait_for_trace).
+    """
+
+    def __init__(self, tracer: "Tracer"):
+        super().__init__()
+        self.tracer = tracer
+        self._parents: Dict[str, Span] = {}
+        self._pending = threading.Condition()
+
+    def log_pre_api_call(self, model, messages, kwargs):
+        parent = get_current_span()
+        call_id = kwargs.get("litellm_call_id")
+        if parent is not None and call_id:
+            with self._pending:
+                self._parents[call_id] = parent
+
+    def wait_for_trace(self, trace_id: str, timeout: float) -> bool:
+        """Attend que les spans LLM déjà lancés dans une trace soient écrits (False si le délai expire)"""
+        with self._pending:
+            return self._pending.wait_for(
+                lambda: not any(parent.trace_id == trace_id for parent in self._parents.values()), timeout
+            )
+
+    def _record(self, kwargs, response_obj, start_time, end_time, error: Optional[BaseException] = None):
+        call_id = kwargs.get("litellm_call_id")
+        with self._pending:
+            parent = self._parents.get(call_id)
+        try:
+            self._write_span(parent, kwargs, response_obj, start_time, end_time, error)
+        finally:
+            # L'appel ne quitte l'attente qu'une fois son span écrit
+            with self._pending:
+                self._parents.pop(call_id, None)
+                self._pending.notify_all()
+
+    def _write_span(self, parent: Optional[Span], kwargs, response_obj, start_time, end_time,
+                    error: Optional[BaseException] = None):
+        usage = getattr(response_obj, "usage", None) or {}
+        get_usage = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+
+        span = self.tracer.start_span(
+            "llm",
+            kwargs.get("model") or "llm",
+            parent=parent,
+            model=kwargs.get("model"),
+            tokens_in=get_usage("prompt_tokens"),
+            tokens_out=get_usage("completion_tokens"),
+            cost=_response_cost(kwargs, response_obj) if error is None else None,
+            cache_hit=bool(kwargs.get("cache_hit")),
+        )
+        if parent is None:
+            # Appel LLM hors de toute campagne tracée : trace à part
+            span.trace_id = "untraced"
+        span.start_time = start_time.timestamp() if hasattr(start_time, "timestamp") else start_time
+        self.tracer.end_span(span, error=error, end_time=end_time.timestamp() if hasattr(end_time, "timestamp") else end_time)
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self._record(kwargs, response_obj, start_time, end_time)
+
+    def log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        error = kwargs.get("exception") or RuntimeError("Appel LLM en échec")
+        self._record(kwargs, response_obj, start_time, end_time, error=error)
+
+
+def _install_llm_logger(logger: LiteLLMSpanLogger):
+    """Enregistre le callback LiteLLM (CrewAI remplace litellm.callbacks, pas ces listes)"""
+    try:
+        import litellm
+    except ImportError:
+        return
+    for callbacks in (litellm.input_callback, litellm.success_callback, litellm.failure_callback):
+        if logger not in callbacks:
+            callbacks.append(logger)
+
+
+_TRACER: Optional[Tracer] = None
+_LLM_LOGGER: Optional[LiteLLMSpanLogger] = None
+_TRACER_LOCK = threading.Lock()
+
+
+def wait_for_llm_spans(trace_id: str, timeout: float = None) -> bool:
+    """Attend l'écriture des spans LLM d'une trace (écrits par LiteLLM dans un thread à part)"""
+    logger = _LLM_LOGGER
+    if logger is None:
+        return True
+    return logger.wait_for_trace(trace_id, LLM_SPAN_FLUSH_TIMEOUT if timeout is None else timeout)
+
+
+def get_tracer() -> Tracer:
+    """Retourne le traceur du processus (installe les hooks outils et LLM au premier appel)"""
+    global _TRACER, _LLM_LOGGER
+    with _TRACER_LOCK:
+        if _TRACER is None:
+            from .tools import register_tool_middleware
+
+            _TRACER = Tracer()
+            _LLM_LOGGER = LiteLLMSpanLogger(_TRACER)
+            register_tool_middleware(tracing_tool_middleware)
+        _install_llm_logger(_LLM_LOGGER)
+        return _TRACER
+
+
+class TracedCrew(Crew):
+    """Crew dont chaque kickoff est tracé (durée, agents, tâches, tokens consommés)"""
+
+    def kickoff(self, inputs: Optional[Dict[str, Any]] = None):
+        with get_tracer().span(
+            "crew",
+            " → ".join(agent.role for agent in self.agents) or "crew",
+            tasks=len(self.tasks)
+        ) as span:
+            result = super().kickoff(inputs=inputs)
+            usage = getattr(result, "token_usage", None)
+            if usage is not None:
+                span.attributes["tokens_in"] = getattr(usage, "prompt_tokens", None)
+                span.attributes["tokens_out"] = getattr(usage, "completion_tokens", None)
+            return result
+
+
+def _agent_token_usage(agent) -> Tuple[int, int]:
+    """Tokens (entrée, sortie) consommés par un agent depuis sa création"""
+    token_process = getattr(agent, "_token_process", None)
+    if token_process is None:
+        return 0, 0
+    summary = token_process.get_summary()
+    return summary.prompt_tokens or 0, summary.completion_tokens or 0
+
+
+class TracedTask(Task):
+    """Task dont chaque exécution est tracée (agent, taille du contexte et du résultat)"""
+
+    _started_at: Optional[float] = PrivateAttr(default=None)
+    _usage_at_start: Tuple[int, int] = PrivateAttr(default=(0, 0))
+    _executing_agent: Any = PrivateAttr(default=None)
+    _execution_stats: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    def _prepare_context(self, context: Optional[str]) -> Optional[str]:
+        """Point d'extension appelé dans le span de la tâche, avant l'exécution"""
+        return context
+
+    @property
+    def execution_stats(self) -> Dict[str, Any]:
+        """Début, durée et tokens de la dernière exécution (en cours si elle n'est pas terminée)"""
+        if self._execution_stats is not None:
+            return self._execution_stats
+        if self._started_at is None:
+            return {"started_at": None, "duration_seconds": None, "tokens_in": None, "tokens_out": None}
+        tokens_in, tokens_out = _agent_token_usage(self._executing_agent)
+        return {
+            "started_at": self._started_at,
+            "duration_seconds": round(time.time() - self._started_at, 3),
+            "tokens_in": tokens_in - self._usage_at_start[0],
+            "tokens_out": tokens_out - self._usage_at_start[1],
+        }
+
+    def execute_sync(self, agent=None, context: Optional[str] = None, tools=None):
+        executing_agent = agent or self.agent
+        self._executing_agent = executing_agent
+        self._usage_at_start = _agent_token_usage(executing_agent)
+        self._started_at = time.time()
+        self._execution_stats = None
+        with get_tracer().span(
+            "task",
+            getattr(executing_agent, "role", "task"),
+            context_chars=len(context or ""),
+            description_chars=len(self.description)
+        ) as span:
+            context = self._prepare_context(context)
+            span.attributes["prepared_context_chars"] = len(context or "")
+            output = super().execute_sync(agent=agent, context=context, tools=tools)
+            # Figées en fin d'exécution : un même agent peut enchaîner d'autres tâches ensuite
+            self._execution_stats = self.execution_stats
+            span.attributes["output_chars"] = len(str(getattr(output, "raw", output)))
+            span.attributes["tokens_in"] = self._execution_stats["tokens_in"]
+            span.attributes["tokens_out"] = self._execution_stats["tokens_out"]
+            return output
+
+
+def load_spans(trace_id: str = None, trace_file: str = None) -> List[Dict[str, Any]]:
+    """Lit les spans d'une trace (par défaut la dernière trace enregistrée)"""
+    path = trace_file or TRACE_FILE
+    if not os.path.exists(path):
+        return []
+
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    if trace_id is None:
+        roots = [span for span in spans if span["parent_id"] is None and span["trace_id"] != "untraced"]
+        if not roots:
+            return []
+        trace_id = roots[-1]["trace_id"]
+    return [span for span in spans if span["trace_id"] == trace_id]
+
+
+def summarize_trace(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Agrège une trace par type et nom de span : nombre, durée totale, tokens, succès du cache web"""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        entry = summary.setdefault(f"{span['kind']} | {span['name']}", {
+            "count": 0, "duration": 0.0, "tokens_in": 0, "tokens_out": 0, "errors": 0,
+            "cache_lookups": 0, "cache_hits": 0
+        })
+        entry["count"] += 1
+        entry["duration"] += span["duration"]
+        if span["kind"] == "llm":
+            # Les spans crew agrègent déjà les tokens de leurs appels LLM : on ne compte que ceux-ci
+            entry["tokens_in"] += span["attributes"].get("tokens_in") or 0
+            entry["tokens_out"] += span["attributes"].get("tokens_out") or 0
+        entry["errors"] += 1 if span["error"] else 0
+        # Outils web servis par le cache disque (hit, revalidated) ou par le réseau (miss, stale)
+        cache_status = span["attributes"].get("cache")
+        if cache_status:
+            entry["cache_lookups"] += 1
+            entry["cache_hits"] += 1 if cache_status in ("hit", "revalidated") else 0
+    return dict(sorted(summary.items(), key=lambda item: item[1]["duration"], reverse=True))
+
+
+def summarize_models(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Agrège les appels LLM d'une trace par modèle : appels, latence, tokens et coût"""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        if span["kind"] != "llm":
+            continue
+        attributes = span["attributes"]
+        entry = summary.setdefault(attributes.get("model") or span["name"], {
+            "calls": 0, "duration": 0.0, "max_latency": 0.0, "tokens_in": 0, "tokens_out": 0,
+            "cost": 0.0, "priced_calls": 0, "errors": 0
+        })
+        entry["calls"] += 1
+        entry["duration"] += span["duration"]
+        entry["max_latency"] = max(entry["max_latency"], span["duration"])
+        entry["tokens_in"] += attributes.get("tokens_in") or 0
+        entry["tokens_out"] += attributes.get("tokens_out") or 0
+        if attributes.get("cost") is not None:
+            entry["cost"] += attributes["cost"]
+            entry["priced_calls"] += 1
+        entry["errors"] += 1 if span["error"] else 0
+    for entry in summary.values():
+        entry["avg_latency"] = entry["duration"] / entry["calls"]
+    return dict(sorted(summary.items(), key=lambda item: item[1]["cost"], reverse=True))
+
+
+if __name__ == "__main__":
+    spans = load_spans(sys.argv[1] if len(sys.argv) > 1 else None)
+    if not spans:
+        print("Aucune trace trouvée")
+        sys.exit(1)
+
+    print(f"🔎 Trace {spans[0]['trace_id']} : {len(spans)} span(s)")
+    for name, entry in summarize_trace(spans).items():
+        tokens = f" • {entry['tokens_in']}→{entry['tokens_out']} tokens" if entry["tokens_in"] or entry["tokens_out"] else ""
+        errors = f" • ❌ {entry['errors']} erreur(s)" if entry["errors"] else ""
+        cache = (f" • ♻️ {entry['cache_hits']}/{entry['cache_lookups']} en cache"
+                 if entry["cache_lookups"] else "")
+        print(f"{entry['duration']:8.1f}s  {entry['count']:4d}×  {name}{tokens}{cache}{errors}")
+
+    models = summarize_models(spans)
+    if models:
+        print("\n🧠 Par modèle :")
+        for model, entry in models.items():
+            cost = f"${entry['cost']:.4f}" if entry["priced_calls"] else "coût inconnu"
+            print(f"{entry['avg_latency']:8.1f}s  {entry['calls']:4d}×  {model} • "
+                  f"{entry['tokens_in']}→{entry['tokens_out']} tokens • {cost}")
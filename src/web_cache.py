@@ -0,0 +1,331 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from .plan_cache import normalize_text
+
+WEB_CACHE_ENABLED = os.getenv("WEB_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+WEB_CACHE_DB = os.getenv("WEB_CACHE_DB", os.path.join("cache", "web.db"))
+# Taille maximale du cache (50 Mo par défaut) : au-delà, les entrées les moins récemment utilisées sont évincées
+WEB_CACHE_MAX_BYTES = int(os.getenv("WEB_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Délai maximal d'une revalidation conditionnelle (If-None-Match / If-Modified-Since)
+WEB_CACHE_REVALIDATE_TIMEOUT = float(os.getenv("WEB_CACHE_REVALIDATE_TIMEOUT", "5"))
+
+# Paramètres d'URL sans effet sur le contenu (suivi de campagnes)
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+@dataclass(frozen=True)
+class WebCachePolicy:
+    """Règle de cache d'un outil web"""
+    name: str
+    ttl_seconds: int
+    revalidate: bool = False  # Page scrapée : revalidation conditionnelle une fois le TTL écoulé
+
+
+# Outils mis en cache, par classe d'outil CrewAI
+WEB_CACHE_POLICIES: Dict[str, WebCachePolicy] = {
+    "SerperDevTool": WebCachePolicy("serper_search", int(os.getenv("WEB_CACHE_TTL_SERPER", str(6 * 3600)))),
+    "WebsiteSearchTool": WebCachePolicy("website_search", int(os.getenv("WEB_CACHE_TTL_WEBSITE_SEARCH", str(24 * 3600)))),
+    "ScrapeWebsiteTool": WebCachePolicy(
+        "scrape_website", int(os.getenv("WEB_CACHE_TTL_SCRAPE", str(24 * 3600))), revalidate=True
+    ),
+    # Lot complet de recherches (mêmes requêtes et URLs) : même durée de vie que Serper
+    "BatchWebResearchTool": WebCachePolicy("batch_web_research", int(os.getenv("WEB_CACHE_TTL_SERPER", str(6 * 3600)))),
+}
+
+
+def normalize_url(url: str) -> str:
+    """Normalise une URL pour la clé de cache (schéma et hôte en minuscules, sans fragment ni traceurs)"""
+    url = (url or "").strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def _normalize_arguments(tool, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Arguments normalisés d'un appel et URL de la page concernée (s'il y en a une)
+
+    Les outils configurés avec une URL fixe (website_url=...) la reçoivent comme argument implicite.
+    """
+    values = dict(kwargs)
+    for position, value in enumerate(args):
+        values[f"arg{position}"] = value
+    default_url = getattr(tool, "website_url", None)
+    if default_url and not values.get("website_url"):
+        values["website_url"] = default_url
+
+    normalized = {}
+    url = None
+    for key, value in values.items():
+        if value is None:
+            continue
+        if "url" in key.lower() and isinstance(value, str):
+            url = normalize_url(value)
+            normalized[key] = url
+        elif isinstance(value, str):
+            normalized[key] = normalize_text(value)
+        else:
+            normalized[key] = value
+    return normalized, url
+
+
+def _page_validators(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[int, Dict[str, str]]:
+    """Requête HEAD (conditionnelle si des validateurs sont connus) : (statut, validateurs de la page)"""
+    import requests
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = requests.head(url, headers=headers, timeout=WEB_CACHE_REVALIDATE_TIMEOUT, allow_redirects=True)
+    validators = {
+        "etag": response.headers.get("ETag") or etag,
+        "last_modified": response.headers.get("Last-Modified") or last_modified,
+    }
+    return response.status_code, validators
+
+
+# Réponses HTTP reçues par le thread courant pendant un appel d'outil (None = pas de capture)
+_CAPTURED_RESPONSES = threading.local()
+_CAPTURE_INSTALL_LOCK = threading.Lock()
+
+
+def _install_response_capture() -> bool:
+    """Intercepte requests.Session.send (une seule fois) pour relire les en-têtes de la page scrapée"""
+    try:
+        import requests
+    except ImportError:
+        return False
+    with _CAPTURE_INSTALL_LOCK:
+        original_send = requests.Session.send
+        if getattr(original_send, "_web_cache_capture", False):
+            return True
+
+        def send(session, request, **kwargs):
+            response = original_send(session, request, **kwargs)
+            responses = getattr(_CAPTURED_RESPONSES, "responses", None)
+            if responses is not None:
+                responses.append(response)
+            return response
+
+        send._web_cache_capture = True
+        requests.Session.send = send
+    return True
+
+
+def _call_capturing_validators(call_next, *args, **kwargs) -> Tuple[Any, Dict[str, Optional[str]]]:
+    """Exécute l'outil et retourne (résultat, validateurs de la réponse qui a produit le contenu)
+
+    Les validateurs (ETag / Last-Modified) viennent de la dernière réponse 2xx reçue pendant
+    l'appel ; sans réponse capturée, l'entrée n'a pas de validateurs et sera re-scrapée à expiration.
+    """
+    if not _install_response_capture():
+        return call_next(*args, **kwargs), {}
+    previous = getattr(_CAPTURED_RESPONSES, "responses", None)
+    _CAPTURED_RESPONSES.responses = []
+    try:
+        result = call_next(*args, **kwargs)
+        responses = [response for response in _CAPTURED_RESPONSES.responses if 200 <= response.status_code < 300]
+    finally:
+        _CAPTURED_RESPONSES.responses = previous
+    if not responses:
+        return result, {}
+    headers = responses[-1].headers
+    return result, {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+class WebCache:
+    """Cache persistant (SQLite) des résultats des outils de recherche et de scraping web
+
+    Les entrées sont indexées par outil et par requête ou URL normalisée, expirent
+    après le TTL de leur outil et le cache est borné en octets (éviction LRU). Une
+    page scrapée expirée qui a un ETag ou un Last-Modified est revalidée par une
+    requête conditionnelle : si elle n'a pas changé, elle n'est pas re-scrapée.
+    """
+
+    def __init__(self, db_path: str = None, max_bytes: int = None):
+        self.db_path = db_path or WEB_CACHE_DB
+        self.max_bytes = WEB_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS web_entries (
+                    cache_key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS web_entries_last_access ON web_entries (last_access);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(policy: WebCachePolicy, arguments: Dict[str, Any]) -> str:
+        payload = {"tool": policy.name, "arguments": arguments}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+    def _count(self, policy: WebCachePolicy, status: str):
+        with self._lock:
+            counters = self._stats.setdefault(policy.name, {"hit": 0, "revalidated": 0, "miss": 0, "stale": 0})
+            counters[status] += 1
+
+    def lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Entrée en cache (même expirée), ou None"""
+        with self._lock, self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM web_entries WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE web_entries SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return dict(row) if row is not None else None
+
+    def put(self, cache_key: str, policy: WebCachePolicy, target: str, result: str, url: str = None,
+            etag: str = None, last_modified: str = None):
+        """Enregistre un résultat puis évince les entrées les moins récemment utilisées au-delà de max_bytes"""
+        now = time.time()
+        size = len(result.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO web_entries
+                    (cache_key, tool, target, result, size, url, etag, last_modified, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (cache_key, policy.name, target, result, size, url, etag, last_modified, now, now + policy.ttl_seconds, now))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM web_entries").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for key, entry_size in conn.execute(
+                    "SELECT cache_key, size FROM web_entries WHERE cache_key != ? ORDER BY last_access", (cache_key,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM web_entries WHERE cache_key = ?", (key,))
+                    total -= entry_size
+                    evicted += 1
+                print(f"🧹 Cache web : {evicted} entrée(s) évincée(s)")
+
+    def renew(self, cache_key: str, policy: WebCachePolicy, etag: Optional[str], last_modified: Optional[str]):
+        """Prolonge une entrée revalidée (page inchangée) d'un nouveau TTL"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE web_entries SET expires_at = ?, etag = ?, last_modified = ? WHERE cache_key = ?",
+                (now + policy.ttl_seconds, etag, last_modified, cache_key)
+            )
+
+    def _revalidate(self, entry: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
+        """Vérifie qu'une page expirée n'a pas changé : (inchangée, nouveaux validateurs)"""
+        if not entry["url"] or not (entry["etag"] or entry["last_modified"]):
+            return False, {}
+        try:
+            status, validators = _page_validators(entry["url"], entry["etag"], entry["last_modified"])
+        except Exception as e:
+            print(f"⚠️ Revalidation impossible pour {entry['url']}: {e}")
+            return False, {}
+        unchanged = status == 304 or (
+            status == 200 and
+            (validators["etag"] == entry["etag"] if entry["etag"] else validators["last_modified"] == entry["last_modified"])
+        )
+        return unchanged, validators
+
+    def call(self, policy: WebCachePolicy, tool, call_next, *args, **kwargs) -> Tuple[Any, str]:
+        """Exécute un appel d'outil à travers le cache
+
+        Returns:
+            Tuple[Any, str]: (résultat, statut : hit, revalidated, stale ou miss)
+        """
+        arguments, url = _normalize_arguments(tool, args, kwargs)
+        cache_key = self.make_key(policy, arguments)
+        entry = self.lookup(cache_key)
+        status = "miss"
+        if entry is not None:
+            if entry["expires_at"] > time.time():
+                self._count(policy, "hit")
+                return entry["result"], "hit"
+            if policy.revalidate:
+                unchanged, validators = self._revalidate(entry)
+                if unchanged:
+                    self.renew(cache_key, policy, validators.get("etag"), validators.get("last_modified"))
+                    self._count(policy, "revalidated")
+                    return entry["result"], "revalidated"
+            status = "stale"
+
+        validators = {}
+        if policy.revalidate and url:
+            # Validateurs de la réponse même qui a produit le contenu, sans requête supplémentaire
+            result, validators = _call_capturing_validators(call_next, *args, **kwargs)
+        else:
+            result = call_next(*args, **kwargs)
+        text = str(result) if result is not None else ""
+        # Les réponses vides ne sont pas mises en cache (erreur réseau transformée en texte vide)
+        if text.strip():
+            target = url or json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+            self.put(cache_key, policy, target, text, url=url,
+                     etag=validators.get("etag"), last_modified=validators.get("last_modified"))
+        self._count(policy, status)
+        return result, status
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM web_entries")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Compteurs par outil (hit, revalidated, stale, miss, taux de succès), nombre d'entrées et taille"""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM web_entries").fetchone()
+            tools = {name: dict(counters) for name, counters in self._stats.items()}
+        for counters in tools.values():
+            lookups = sum(counters.values())
+            counters["hit_rate"] = round((counters["hit"] + counters["revalidated"]) / lookups, 3) if lookups else 0.0
+        return {"tools": tools, "entries": entries, "bytes": size}
+
+
+_WEB_CACHE: Optional[WebCache] = None
+_WEB_CACHE_LOCK = threading.Lock()
+
+
+def get_web_cache() -> WebCache:
+    """Retourne le cache web partagé par le processus"""
+    global _WEB_CACHE
+    with _WEB_CACHE_LOCK:
+        if _WEB_CACHE is None:
+            _WEB_CACHE = WebCache()
+        return _WEB_CACHE
+
+
+def web_cache_tool_middleware(tool, call_next, *args, **kwargs):
+    """Middleware d'outil : sert les outils web depuis le cache et note le statut dans le span de l'outil"""
+    policy = WEB_CACHE_POLICIES.get(type(tool).__name__)
+    if policy is None or not WEB_CACHE_ENABLED:
+        return call_next(*args, **kwargs)
+
+    from .tracing import get_current_span
+
+    result, status = get_web_cache().call(policy, tool, call_next, *args, **kwargs)
+    span = get_current_span()
+    if span is not None and span.kind == "tool":
+        span.attributes["cache"] = status
+    return result
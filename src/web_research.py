@@ -0,0 +1,213 @@
+"""Recherche web en lot : plusieurs requêtes Serper et pages lues en un seul appel d'outil
+
+Les requêtes et les pages sont récupérées en parallèle (asyncio, client HTTP partagé) ;
+le texte principal de chaque page est extrait puis les extraits en double sont écartés.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Type
+import os
+import re
+import asyncio
+import hashlib
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+from .plan_cache import normalize_text
+from .web_cache import normalize_url
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+# Requêtes HTTP simultanées, délai par requête et pages lues pour chaque requête de recherche
+BATCH_RESEARCH_CONCURRENCY = int(os.getenv("BATCH_RESEARCH_CONCURRENCY", "8"))
+BATCH_RESEARCH_TIMEOUT = float(os.getenv("BATCH_RESEARCH_TIMEOUT", "15"))
+BATCH_RESEARCH_PAGES_PER_QUERY = int(os.getenv("BATCH_RESEARCH_PAGES_PER_QUERY", "2"))
+BATCH_RESEARCH_RESULTS_PER_QUERY = int(os.getenv("BATCH_RESEARCH_RESULTS_PER_QUERY", "5"))
+# Taille maximale du texte retenu par page (en caractères)
+BATCH_RESEARCH_MAX_PAGE_CHARS = int(os.getenv("BATCH_RESEARCH_MAX_PAGE_CHARS", "1500"))
+# Nombre maximal de requêtes et d'URLs traitées par appel
+BATCH_RESEARCH_MAX_ITEMS = int(os.getenv("BATCH_RESEARCH_MAX_ITEMS", "20"))
+
+_USER_AGENT = "Mozilla/5.0 (compatible; CrewAI-Marketing research bot)"
+# Balises sans contenu éditorial
+_NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe"]
+# Paragraphes trop courts pour être informatifs (menus, boutons, mentions)
+_MIN_PARAGRAPH_CHARS = 40
+
+
+def extract_main_text(html: str, max_chars: int = None) -> str:
+    """Texte principal d'une page HTML (article ou contenu principal, sans navigation ni scripts)"""
+    from bs4 import BeautifulSoup
+
+    max_chars = max_chars or BATCH_RESEARCH_MAX_PAGE_CHARS
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_NOISE_TAGS):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+
+    paragraphs = []
+    for element in root.find_all(["h1", "h2", "h3", "p", "li"]):
+        text = re.sub(r"\s+", " ", element.get_text(" ", strip=True))
+        if len(text) >= _MIN_PARAGRAPH_CHARS or (element.name.startswith("h") and text):
+            paragraphs.append(text)
+    if not paragraphs:
+        paragraphs = [re.sub(r"\s+", " ", root.get_text(" ", strip=True))]
+
+    text = "\n".join(paragraphs)
+    return text[:max_chars].rsplit(" ", 1)[0] + " …" if len(text) > max_chars else text
+
+
+class _Deduplicator:
+    """Écarte les URLs et les paragraphes déjà vus pendant un appel"""
+
+    def __init__(self):
+        self._urls = set()
+        self._fingerprints = set()
+
+    def new_url(self, url: str) -> bool:
+        key = normalize_url(url)
+        if key in self._urls:
+            return False
+        self._urls.add(key)
+        return True
+
+    def unique_lines(self, text: str) -> List[str]:
+        lines = []
+        for line in text.splitlines():
+            fingerprint = hashlib.sha1(normalize_text(line).encode("utf-8")).hexdigest()
+            if line.strip() and fingerprint not in self._fingerprints:
+                self._fingerprints.add(fingerprint)
+                lines.append(line)
+        return lines
+
+
+async def _fetch_page(client, semaphore: asyncio.Semaphore, url: str) -> Dict[str, Any]:
+    async with semaphore:
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            if "html" not in response.headers.get("content-type", "html"):
+                return {"url": url, "error": f"contenu non HTML ({response.headers.get('content-type')})"}
+            # Extraction hors de la boucle : les autres téléchargements continuent pendant le parsing
+            return {"url": str(response.url), "text": await asyncio.to_thread(extract_main_text, response.text)}
+        except Exception as e:
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+
+
+async def _search(client, semaphore: asyncio.Semaphore, query: str, api_key: str) -> Dict[str, Any]:
+    async with semaphore:
+        try:
+            response = await client.post(
+                SERPER_SEARCH_URL,
+                json={"q": query, "num": BATCH_RESEARCH_RESULTS_PER_QUERY},
+                headers={"X-API-KEY": api_key},
+            )
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            return {"query": query, "error": f"{type(e).__name__}: {e}"}
+
+    results = [
+        {"title": item.get("title", ""), "url": item.get("link", ""), "snippet": item.get("snippet", "")}
+        for item in data.get("organic", [])[:BATCH_RESEARCH_RESULTS_PER_QUERY]
+        if item.get("link")
+    ]
+    answer = data.get("answerBox") or {}
+    return {"query": query, "answer": answer.get("answer") or answer.get("snippet") or "", "results": results}
+
+
+async def research(queries: List[str], urls: List[str], api_key: str = None,
+                   pages_per_query: int = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Lance toutes les recherches, puis lit en parallèle les URLs données et les premiers résultats
+
+    Returns:
+        Dict: "searches" (résultats Serper par requête) et "pages" (texte extrait par URL)
+    """
+    import httpx
+
+    pages_per_query = BATCH_RESEARCH_PAGES_PER_QUERY if pages_per_query is None else pages_per_query
+    semaphore = asyncio.Semaphore(BATCH_RESEARCH_CONCURRENCY)
+    limits = httpx.Limits(max_connections=BATCH_RESEARCH_CONCURRENCY, max_keepalive_connections=BATCH_RESEARCH_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=BATCH_RESEARCH_TIMEOUT, limits=limits, follow_redirects=True,
+                                 headers={"User-Agent": _USER_AGENT}) as client:
+        searches = []
+        if queries and api_key:
+            searches = await asyncio.gather(*[_search(client, semaphore, query, api_key) for query in queries])
+        elif queries:
+            searches = [{"query": query, "error": "SERPER_API_KEY manquant"} for query in queries]
+
+        candidates = list(urls)
+        for search in searches:
+            candidates.extend(result["url"] for result in search.get("results", [])[:pages_per_query])
+        # Une page citée par plusieurs recherches n'est lue qu'une fois
+        page_urls: Dict[str, str] = {}
+        for url in candidates:
+            page_urls.setdefault(normalize_url(url), url if "://" in url else f"https://{url}")
+        pages = await asyncio.gather(*[_fetch_page(client, semaphore, url) for url in page_urls.values()])
+    return {"searches": list(searches), "pages": list(pages)}
+
+
+def _run_coroutine(coroutine):
+    """Exécute une coroutine, y compris depuis un thread qui a déjà une boucle asyncio active"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def format_research(report: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Rapport compact : extraits de recherche puis texte des pages, sans doublons"""
+    dedup = _Deduplicator()
+    sections = []
+
+    for search in report["searches"]:
+        lines = [f"## 🔎 {search['query']}"]
+        if search.get("error"):
+            lines.append(f"⚠️ Recherche impossible : {search['error']}")
+        if search.get("answer"):
+            lines.extend(dedup.unique_lines(search["answer"]))
+        for result in search.get("results", []):
+            snippet = " ".join(dedup.unique_lines(result["snippet"]))
+            if dedup.new_url(result["url"]) or snippet:
+                lines.append(f"- {result['title']} — {snippet} ({result['url']})")
+        sections.append("\n".join(lines))
+
+    for page in report["pages"]:
+        if page.get("error"):
+            sections.append(f"## 📄 {page['url']}\n⚠️ Lecture impossible : {page['error']}")
+            continue
+        lines = dedup.unique_lines(page.get("text", ""))
+        if lines:
+            sections.append(f"## 📄 {page['url']}\n" + "\n".join(lines))
+
+    return "\n\n".join(sections) if sections else "Aucun résultat"
+
+
+class BatchResearchInput(BaseModel):
+    """Entrée de l'outil de recherche web en lot"""
+    queries: List[str] = Field(default_factory=list, description="Requêtes de recherche web, une par élément de la liste")
+    urls: List[str] = Field(default_factory=list, description="URLs de pages à lire directement")
+
+
+class BatchWebResearchTool(BaseTool):
+    """Recherche web en lot : plusieurs requêtes et pages en un seul appel
+
+    Une seule décision du LLM suffit pour couvrir toutes les sources d'une recherche,
+    au lieu d'un tour de raisonnement par requête ou par page.
+    """
+    name: str = "Recherche web en lot"
+    description: str = (
+        "Lance en une seule fois plusieurs recherches web (queries) et/ou lit plusieurs pages (urls). "
+        "Les premiers résultats de chaque recherche sont lus automatiquement ; le résultat regroupe "
+        "des extraits compacts et dédoublonnés avec leur source. Préférez cet outil à plusieurs "
+        "recherches successives."
+    )
+    args_schema: Type[BaseModel] = BatchResearchInput
+    pages_per_query: Optional[int] = None  # None = BATCH_RESEARCH_PAGES_PER_QUERY
+
+    def _run(self, queries: List[str] = None, urls: List[str] = None) -> str:
+        queries = [query.strip() for query in (queries or []) if query and query.strip()][:BATCH_RESEARCH_MAX_ITEMS]
+        urls = [url.strip() for url in (urls or []) if url and url.strip()][:BATCH_RESEARCH_MAX_ITEMS]
+        if not queries and not urls:
+            return "Indiquez au moins une requête (queries) ou une URL (urls)"
+        report = _run_coroutine(research(queries, urls, os.getenv("SERPER_API_KEY"), self.pages_per_query))
+        return format_research(report)
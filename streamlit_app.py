@@ -1,15 +1,29 @@
 import os
 import streamlit as st
 import json
+import re
 import pandas as pd
+from dataclasses import replace
 from dotenv import load_dotenv
 from rich.console import Console
+
+# Charger .env avant les modules src : plusieurs réglages y sont lus à l'import (budget de contexte, limites LLM...)
+load_dotenv()
+
 from src.crew import build_dynamic_marketing_crew, build_two_phase_marketing_crew, build_ordered_crew_from_meta_result
+from src.campaign_runner import start_campaign_job, resume_campaign_job, get_campaign_job, list_campaign_jobs
+from src.run_store import get_run_store
+from src.history_store import get_history_store
+from src.context_compaction import DEFAULT_CONTEXT_TOKEN_BUDGET, resolve_context_budget
 from src.agent_config import AgentConfigManager
 from src.crew_config import CrewConfigManager
-from src.tools import get_available_tools
+from src.tools import get_available_tools, get_tool_registry, list_knowledge_collections, match_knowledge_collections
+from src.knowledge_ingestion import get_knowledge_ingestor
+from src.web_cache import get_web_cache
+from src.llm_governor import get_llm_governor
+from src.cassette import activate_cassette_from_env
+from src.result_parser import parse_markdown_result, extract_posts_from_text, smart_parse_result, format_markdown_text
 
-load_dotenv()
 console = Console()
 
 # Désactiver la télémetrie CrewAI pour éviter les erreurs
@@ -25,176 +39,66 @@ if 'config_manager' not in st.session_state:
 if 'crew_config_manager' not in st.session_state:
     st.session_state.crew_config_manager = CrewConfigManager(st.session_state.config_manager)
 
-def parse_markdown_result(result):
-    """Parse le résultat Markdown et extrait les sections structurées"""
-    result_str = str(result)
-    
-    # Dictionnaire pour stocker les sections parsées
-    parsed_sections = {
-        'meta_manager': '',
-        'linkedin_posts': [],
-        'instagram_posts': [],
-        'other_content': []
-    }
-    
-    # Diviser le résultat en lignes
-    lines = result_str.split('\n')
-    current_section = 'other_content'
-    current_post = ''
-    post_counter = 0
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Détecter les sections principales
-        if 'meta manager' in line.lower() or 'meta agent' in line.lower() or 'plan d\'action' in line.lower():
-            current_section = 'meta_manager'
-            continue
-        elif 'linkedin' in line.lower() and ('post' in line.lower() or 'contenu' in line.lower()):
-            current_section = 'linkedin_posts'
-            continue
-        elif 'instagram' in line.lower() and ('post' in line.lower() or 'contenu' in line.lower()):
-            current_section = 'instagram_posts'
-            continue
-        
-        # Traiter les posts
-        if current_section in ['linkedin_posts', 'instagram_posts']:
-            if line.startswith('**') and 'post' in line.lower():
-                # Nouveau post détecté
-                if current_post:
-                    parsed_sections[current_section].append(current_post.strip())
-                current_post = line + '\n'
-                post_counter += 1
-            elif line and not line.startswith('---'):
-                current_post += line + '\n'
-        else:
-            # Contenu général
-            if current_section == 'meta_manager':
-                parsed_sections['meta_manager'] += line + '\n'
-            else:
-                parsed_sections['other_content'].append(line)
-    
-    # Ajouter le dernier post s'il existe
-    if current_post:
-        parsed_sections[current_section].append(current_post.strip())
-    
-    return parsed_sections
+# Watcher d'ingestion incrémentale du dossier knowledge/ (un seul par processus)
+knowledge_ingestor = get_knowledge_ingestor(start=True)
 
-def extract_posts_from_text(text, platform):
-    """Extrait les posts d'une plateforme spécifique du texte"""
-    posts = []
-    lines = text.split('\n')
-    current_post = ''
-    in_post = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Détecter le début d'un post
-        if platform.lower() in line.lower() and ('post' in line.lower() or 'contenu' in line.lower()):
-            if current_post:
-                posts.append(current_post.strip())
-            current_post = line + '\n'
-            in_post = True
-        elif in_post and line and not line.startswith('---'):
-            current_post += line + '\n'
-        elif in_post and line.startswith('---'):
-            in_post = False
-            if current_post:
-                posts.append(current_post.strip())
-                current_post = ''
-    
-    # Ajouter le dernier post s'il existe
-    if current_post:
-        posts.append(current_post.strip())
-    
-    return posts
+# Cassette d'enregistrement / de rejeu du trafic LLM et outils (CASSETTE_MODE)
+active_cassette = activate_cassette_from_env()
 
-def smart_parse_result(result):
-    """Parse intelligent du résultat avec détection automatique des sections"""
-    result_str = str(result)
-    
-    # Dictionnaire pour stocker les sections parsées
-    parsed_sections = {
-        'meta_manager': '',
-        'linkedin_posts': [],
-        'instagram_posts': [],
-        'other_content': []
-    }
-    
-    # Extraire les posts LinkedIn
-    linkedin_posts = extract_posts_from_text(result_str, 'linkedin')
-    parsed_sections['linkedin_posts'] = linkedin_posts
-    
-    # Extraire les posts Instagram
-    instagram_posts = extract_posts_from_text(result_str, 'instagram')
-    parsed_sections['instagram_posts'] = instagram_posts
-    
-    # Extraire le plan du Meta Manager
-    lines = result_str.split('\n')
-    meta_manager_content = []
-    in_meta_section = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        if 'meta manager' in line.lower() or 'meta agent' in line.lower() or 'plan d\'action' in line.lower():
-            in_meta_section = True
-            meta_manager_content.append(line)
-        elif in_meta_section and ('linkedin' in line.lower() or 'instagram' in line.lower()):
-            in_meta_section = False
-            break
-        elif in_meta_section:
-            meta_manager_content.append(line)
-    
-    parsed_sections['meta_manager'] = '\n'.join(meta_manager_content)
-    
-    # Le reste du contenu
-    other_content = []
-    for line in lines:
-        line = line.strip()
-        if line and not any(keyword in line.lower() for keyword in ['meta manager', 'meta agent', 'linkedin', 'instagram', 'post']):
-            other_content.append(line)
-    
-    parsed_sections['other_content'] = other_content
-    
-    return parsed_sections
+KNOWLEDGE_SCOPES = ["Tous les PDFs", "Collections choisies", "Aucun PDF"]
 
-def format_markdown_text(text):
-    """Formate le texte Markdown pour un meilleur affichage"""
-    if not text:
-        return text
-    
-    # Remplacer les éléments Markdown par du HTML pour un meilleur rendu
-    formatted = text
-    
-    # Gras
-    formatted = formatted.replace('**', '<strong>').replace('**', '</strong>')
-    
-    # Italique
-    formatted = formatted.replace('*', '<em>').replace('*', '</em>')
-    
-    # Listes à puces
-    lines = formatted.split('\n')
-    formatted_lines = []
-    in_list = False
-    
-    for line in lines:
-        if line.strip().startswith('- '):
-            if not in_list:
-                formatted_lines.append('<ul>')
-                in_list = True
-            formatted_lines.append(f'<li>{line.strip()[2:]}</li>')
-        else:
-            if in_list:
-                formatted_lines.append('</ul>')
-                in_list = False
-            formatted_lines.append(line)
-    
-    if in_list:
-        formatted_lines.append('</ul>')
-    
-    return '\n'.join(formatted_lines)
+def knowledge_collections_input(key: str, current=None):
+    """Champ d'édition des collections de connaissances (None = tous les PDFs, [] = aucun)"""
+    scope_index = 0 if current is None else (1 if current else 2)
+    scope = st.radio("📚 Connaissances (dossier knowledge/)", KNOWLEDGE_SCOPES, index=scope_index,
+                     horizontal=True, key=f"{key}_scope")
+    folders = list_knowledge_collections()
+    text = st.text_input(
+        "Collections (sous-dossiers ou motifs, séparés par des virgules)",
+        value=", ".join(current or []),
+        key=f"{key}_collections",
+        placeholder="ex: rse, chartes/*.pdf, *catalogue*",
+        help=f"Sous-dossiers disponibles : {', '.join(folders)}" if folders else "Aucun sous-dossier dans knowledge/ : utilisez des motifs sur les noms de fichiers"
+    )
+    if scope == "Tous les PDFs":
+        return None
+    if scope == "Aucun PDF":
+        return []
+    return [collection.strip() for collection in text.split(",") if collection.strip()]
+
+def context_budget_input(key: str, current=None):
+    """Champ du budget de contexte d'un agent (None = suivre le budget global CONTEXT_TOKEN_BUDGET)"""
+    use_global = st.checkbox(
+        f"Budget de contexte global ({DEFAULT_CONTEXT_TOKEN_BUDGET} tokens)", value=current is None, key=f"{key}_global",
+        help="Cochée, l'agent suit le budget global, y compris s'il est modifié plus tard."
+    )
+    budget = st.number_input(
+        "Budget de contexte (tokens)", value=DEFAULT_CONTEXT_TOKEN_BUDGET if current is None else current,
+        min_value=0, step=500, key=f"{key}_context_budget",
+        help="Utilisé si le budget global est décoché. Au-delà, les résultats des agents précédents sont résumés avant d'être transmis. 0 = jamais de résumé."
+    )
+    return None if use_global else int(budget)
+
+def llm_settings_input(key: str, config=None):
+    """Champs du modèle LLM d'un agent : (modèle, température, max_tokens), None = valeur par défaut"""
+    col_model, col_temperature, col_max_tokens = st.columns(3)
+    with col_model:
+        model = st.text_input(
+            "Modèle LLM", value=(config.llm_model or "") if config else "", key=f"{key}_llm_model",
+            placeholder=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            help="Vide = modèle par défaut (OPENAI_MODEL). Un modèle rapide suffit pour la planification."
+        )
+    with col_temperature:
+        temperature = st.number_input(
+            "Température", min_value=0.0, max_value=2.0, step=0.1, key=f"{key}_temperature",
+            value=config.temperature if config else None, placeholder="défaut du modèle"
+        )
+    with col_max_tokens:
+        max_tokens = st.number_input(
+            "Max tokens (réponse)", min_value=1, step=256, key=f"{key}_max_tokens",
+            value=config.max_tokens if config else None, placeholder="sans limite"
+        )
+    return model.strip() or None, temperature, int(max_tokens) if max_tokens else None
 
 def display_parsed_result(result):
     """Affiche le résultat parsé avec un formatage Markdown amélioré"""
@@ -408,6 +312,30 @@ def display_enhanced_result(result):
             st.code(result_str, language="text")
             st.success("Résultat affiché ci-dessus - vous pouvez le copier !")
 
+@st.fragment(run_every=2)
+def render_campaign_progress(job_id):
+    """Affiche la progression d'une campagne en arrière-plan (rafraîchie toutes les 2 secondes)"""
+    job = get_campaign_job(job_id)
+    if job is None:
+        return
+    
+    events = job.poll_events()
+    if job.is_finished:
+        # Rechargement complet pour afficher le résultat final hors du fragment
+        st.rerun()
+    
+    phases = [event for event in events if event.kind == "phase"]
+    with st.status(phases[-1].message if phases else "🤖 Démarrage de la campagne...", expanded=True):
+        steps = [event for event in events if event.kind == "step"]
+        for event in steps[-5:]:
+            st.caption(event.message)
+    
+    # Chaque agent terminé est affiché immédiatement
+    for event in events:
+        if event.kind == "task":
+            with st.expander(event.message, expanded=False):
+                st.markdown(event.output)
+
 def display_generated_posts(result):
     """Affiche les posts générés de manière claire et structurée"""
     # Afficher le résultat parsé
@@ -453,6 +381,8 @@ with tab1:
             st.info(f"**Crew sélectionné :** {selected_crew.name}")
             st.write(f"**Description :** {selected_crew.description}")
             st.write(f"**Agents :** {', '.join(selected_crew.selected_agents)}")
+            if selected_crew.knowledge_collections is not None:
+                st.write(f"**Connaissances :** {', '.join(selected_crew.knowledge_collections) or 'aucun PDF'}")
             st.info("💡 Le Meta Manager créera automatiquement les tâches selon votre problématique")
     else:
         st.warning("Aucun crew configuré. Créez d'abord des agents et des crews dans les onglets correspondants.")
@@ -464,6 +394,8 @@ with tab1:
         serper_key = st.text_input("SERPER_API_KEY", type="password", value=os.getenv("SERPER_API_KEY", ""))
         model = st.text_input("OPENAI_MODEL", value=os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
         st.caption("Ces valeurs peuvent aussi venir de .env")
+        if active_cassette is not None:
+            st.warning(f"📼 Cassette en mode {active_cassette.mode} : {os.path.basename(active_cassette.path)}")
         
         st.markdown("---")
         st.info("""
@@ -490,13 +422,21 @@ with tab1:
         help="Informations sur votre entreprise, secteur, valeurs, clientèle..."
     )
     
-    # Affichage des PDFs disponibles
+    # Affichage des PDFs disponibles (restreints aux collections du crew)
     pdf_paths = st.session_state.get('uploaded_pdfs', [])
+    if selected_crew_name:
+        pdf_paths = match_knowledge_collections(pdf_paths, selected_crew.knowledge_collections)
     if pdf_paths:
         st.success(f"✅ {len(pdf_paths)} PDF(s) disponible(s) pour enrichir les posts")
     else:
         st.info("💡 Uploadez vos PDFs dans l'onglet 'Documents PDF' pour des posts plus précis")
     
+    use_plan_cache = st.checkbox(
+        "♻️ Réutiliser le plan du Meta Manager en cache",
+        value=True,
+        help="Si la même problématique, le même contexte, les mêmes agents et les mêmes PDFs ont déjà été analysés, la phase 1 est sautée. Décochez pour forcer une nouvelle analyse."
+    )
+    
     # Bouton de génération
     run_disabled = not problem_statement.strip() or not selected_crew_name
     
@@ -511,60 +451,67 @@ with tab1:
             if model:
                 os.environ["OPENAI_MODEL"] = model
             
-            with st.spinner(f"🤖 Phase 1 : Le Meta Manager analyse votre problématique..."):
-                try:
-                    # Phase 1: Créer et exécuter le Meta Manager seul
-                    meta_crew, task_manager, available_agents = build_two_phase_marketing_crew(
-                        problem_statement=problem_statement,
-                        company_context=company_context,
-                        config_manager=st.session_state.config_manager,
-                        pdf_paths=pdf_paths,
-                        selected_agents=selected_crew.selected_agents
-                    )
-                    
-                    # Exécuter le Meta Manager
-                    st.info("🧠 Le Meta Manager analyse la problématique et définit l'ordre d'exécution optimal...")
-                    meta_result = meta_crew.kickoff()
-                    
-                    # Afficher le plan du Meta Manager
-                    st.success("✅ Phase 1 terminée : Plan d'exécution créé par le Meta Manager")
-                    with st.expander("📋 Voir le plan du Meta Manager", expanded=True):
-                        st.markdown(str(meta_result))
-                    
-                    # Phase 2: Créer et exécuter les agents dans l'ordre recommandé
-                    st.info("🚀 Phase 2 : Exécution des agents dans l'ordre recommandé...")
-                    
-                    ordered_crew = build_ordered_crew_from_meta_result(
-                        meta_result=str(meta_result),
-                        problem_statement=problem_statement,
-                        company_context=company_context,
-                        config_manager=st.session_state.config_manager,
-                        pdf_paths=pdf_paths,
-                        available_agents=available_agents
-                    )
-                    
-                    # Exécuter les agents dans l'ordre recommandé
-                    agents_result = ordered_crew.kickoff()
-                    
-                    # Combiner les résultats
-                    result = f"{meta_result}\n\n---\n\nRÉSULTATS DES AGENTS:\n\n{agents_result}"
-                    
-                    # Sauvegarder le résultat dans la session state pour l'onglet Outputs Agents
-                    st.session_state.last_campaign_result = result
-                    
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de l'exécution du crew : {str(e)}")
-                    st.error("💡 Vérifiez vos clés API et la configuration des agents")
-                    result = None
-            
-            # Afficher les résultats de manière claire
-            if result is not None:
-                st.success("✅ Campagne terminée avec succès !")
-                
-                # Afficher le résultat avec formatage Markdown amélioré
-                display_enhanced_result(result)
-            else:
-                st.error("❌ La campagne n'a pas pu être exécutée. Vérifiez les erreurs ci-dessus.")
+            # Lancer la campagne en arrière-plan : l'interface reste réactive
+            job = start_campaign_job(
+                problem_statement=problem_statement,
+                company_context=company_context,
+                config_manager=st.session_state.config_manager,
+                pdf_paths=pdf_paths,
+                selected_agents=selected_crew.selected_agents,
+                crew_name=selected_crew.name,
+                use_plan_cache=use_plan_cache
+            )
+            st.session_state.campaign_job_id = job.job_id
+            # L'identifiant dans l'URL permet de retrouver le job après un rafraîchissement
+            st.query_params["job"] = job.job_id
+    
+    # Suivi de la campagne en cours (ou de la dernière campagne de la session)
+    campaign_job_id = st.session_state.get('campaign_job_id') or st.query_params.get("job")
+    campaign_job = get_campaign_job(campaign_job_id) if campaign_job_id else None
+    
+    if campaign_job is not None and not campaign_job.is_finished:
+        render_campaign_progress(campaign_job.job_id)
+    elif campaign_job is not None and campaign_job.status == "completed":
+        # Sauvegarder le résultat dans la session state pour l'onglet Outputs Agents
+        st.session_state.last_campaign_result = campaign_job.result
+        st.session_state.last_campaign_run_id = campaign_job.run_id
+        
+        st.success("✅ Campagne terminée avec succès !")
+        with st.expander("📋 Voir le plan du Meta Manager", expanded=False):
+            st.markdown(campaign_job.meta_result or "")
+        
+        # Afficher le résultat avec formatage Markdown amélioré
+        display_enhanced_result(campaign_job.result)
+    elif campaign_job is not None and campaign_job.status == "failed":
+        st.error(f"❌ Erreur lors de l'exécution du crew : {campaign_job.error}")
+        st.error("💡 Vérifiez vos clés API et la configuration des agents")
+        st.error("❌ La campagne n'a pas pu être exécutée. Vérifiez les erreurs ci-dessus.")
+        if campaign_job.run_id and st.button("⏯️ Reprendre la campagne là où elle s'est arrêtée", type="primary"):
+            job = resume_campaign_job(campaign_job.run_id, st.session_state.config_manager, crew_name=campaign_job.crew_name)
+            st.session_state.campaign_job_id = job.job_id
+            st.query_params["job"] = job.job_id
+            st.rerun()
+    
+    # Exécutions interrompues (échec ou arrêt du serveur) qui ne sont pas en cours dans ce processus
+    active_run_ids = {job.run_id for job in list_campaign_jobs() if not job.is_finished}
+    interrupted_runs = [
+        run for run in get_run_store().list_runs()
+        if run.status != "completed" and run.run_id not in active_run_ids
+    ]
+    if interrupted_runs:
+        with st.expander(f"⏯️ Campagnes interrompues ({len(interrupted_runs)})", expanded=False):
+            for run in interrupted_runs[:10]:
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.markdown(f"**{run.problem_statement[:80]}**")
+                    st.caption(f"{run.run_id} • {len(run.tasks)}/{len(run.order) or '?'} tâche(s) terminée(s)"
+                               f"{' • plan du Meta Manager disponible' if run.meta_result else ''}")
+                with col2:
+                    if st.button("⏯️ Reprendre", key=f"resume_{run.run_id}"):
+                        job = resume_campaign_job(run.run_id, st.session_state.config_manager)
+                        st.session_state.campaign_job_id = job.job_id
+                        st.query_params["job"] = job.job_id
+                        st.rerun()
     
     if not problem_statement.strip():
         st.info("💡 Décrivez votre problématique marketing pour que le Meta Agent Manager puisse créer des tâches adaptées")
@@ -595,6 +542,7 @@ with tab2:
             with col2:
                 new_backstory = st.text_area("Backstory", placeholder="Décrivez l'histoire et les compétences de cet agent", height=100)
                 new_max_iter = st.number_input("Max Iterations", value=3, min_value=1, max_value=10)
+                new_context_budget = context_budget_input("new_agent")
                 new_verbose = st.checkbox("Verbose", value=True)
             
             # Configuration des outils
@@ -605,6 +553,9 @@ with tab2:
                 if st.checkbox(f"{tool_info['name']} - {tool_info['description']}", key=f"new_agent_tool_{tool_name}"):
                     selected_tools.append(tool_name)
             
+            new_knowledge_collections = knowledge_collections_input("new_agent_knowledge")
+            new_llm_model, new_temperature, new_max_tokens = llm_settings_input("new_agent")
+            
             col1, col2 = st.columns(2)
             with col1:
                 if st.form_submit_button("✅ Créer l'agent", type="primary"):
@@ -617,7 +568,12 @@ with tab2:
                                 backstory=new_backstory,
                                 enabled_tools=selected_tools,
                                 max_iter=new_max_iter,
-                                verbose=new_verbose
+                                verbose=new_verbose,
+                                context_token_budget=new_context_budget,
+                                knowledge_collections=new_knowledge_collections,
+                                llm_model=new_llm_model,
+                                temperature=new_temperature,
+                                max_tokens=new_max_tokens
                             )
                             st.success(f"Agent '{agent_name}' créé avec succès !")
                             st.session_state.show_new_agent_form = False
@@ -670,6 +626,19 @@ with tab2:
                             st.write(f"**Backstory :** {agent_config.backstory}")
                             st.write(f"**Outils :** {', '.join(agent_config.enabled_tools) if agent_config.enabled_tools else 'Aucun'}")
                             st.write(f"**Max Iterations :** {agent_config.max_iter}")
+                            context_budget = resolve_context_budget(agent_config)
+                            context_budget_label = f"{context_budget} tokens" if context_budget else "Illimité"
+                            if agent_config.context_token_budget is None:
+                                context_budget_label += " (budget global)"
+                            st.write(f"**Budget de contexte :** {context_budget_label}")
+                            knowledge = agent_config.knowledge_collections
+                            st.write(f"**Connaissances :** {'Tous les PDFs' if knowledge is None else (', '.join(knowledge) or 'Aucun PDF')}")
+                            llm_details = [agent_config.llm_model or f"{os.getenv('OPENAI_MODEL', 'gpt-4o-mini')} (défaut)"]
+                            if agent_config.temperature is not None:
+                                llm_details.append(f"température {agent_config.temperature}")
+                            if agent_config.max_tokens:
+                                llm_details.append(f"max {agent_config.max_tokens} tokens")
+                            st.write(f"**Modèle :** {', '.join(llm_details)}")
                             st.write(f"**Verbose :** {'Oui' if agent_config.verbose else 'Non'}")
                         
                         # Boutons d'action
@@ -704,6 +673,7 @@ with tab2:
                     with col2:
                         edit_backstory = st.text_area("Backstory", value=agent_config.backstory, key=f"edit_backstory_{agent_name}", height=100)
                         edit_max_iter = st.number_input("Max Iterations", value=agent_config.max_iter, min_value=1, max_value=10, key=f"edit_max_iter_{agent_name}")
+                        edit_context_budget = context_budget_input(f"edit_{agent_name}", agent_config.context_token_budget)
                         edit_verbose = st.checkbox("Verbose", value=agent_config.verbose, key=f"edit_verbose_{agent_name}")
                     
                     # Configuration des outils pour cet agent
@@ -719,19 +689,32 @@ with tab2:
                         ):
                             edit_enabled_tools.append(tool_name)
                     
+                    edit_knowledge_collections = knowledge_collections_input(
+                        f"edit_knowledge_{agent_name}", agent_config.knowledge_collections
+                    )
+                    edit_llm_model, edit_temperature, edit_max_tokens = llm_settings_input(f"edit_{agent_name}", agent_config)
+                    
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         if st.form_submit_button("💾 Sauvegarder", type="primary"):
-                            # Mettre à jour la configuration
-                            agent_config.name = edit_name
-                            agent_config.role = edit_role
-                            agent_config.goal = edit_goal
-                            agent_config.backstory = edit_backstory
-                            agent_config.verbose = edit_verbose
-                            agent_config.max_iter = edit_max_iter
-                            agent_config.enabled_tools = edit_enabled_tools
+                            # Nouvelle version de la configuration (l'objet partagé n'est pas modifié en place)
+                            updated_config = replace(
+                                agent_config,
+                                name=edit_name,
+                                role=edit_role,
+                                goal=edit_goal,
+                                backstory=edit_backstory,
+                                verbose=edit_verbose,
+                                max_iter=edit_max_iter,
+                                context_token_budget=edit_context_budget,
+                                enabled_tools=edit_enabled_tools,
+                                knowledge_collections=edit_knowledge_collections,
+                                llm_model=edit_llm_model,
+                                temperature=edit_temperature,
+                                max_tokens=edit_max_tokens
+                            )
                             
-                            st.session_state.config_manager.update_agent_config(agent_name, agent_config)
+                            st.session_state.config_manager.update_agent_config(agent_name, updated_config)
                             st.session_state[f"editing_agent_{agent_name}"] = False
                             st.success(f"Agent '{edit_name}' modifié avec succès !")
                             st.rerun()
@@ -783,6 +766,8 @@ with tab3:
                 st.warning("Aucun agent disponible. Créez d'abord des agents.")
                 selected_agents = []
             
+            new_crew_knowledge_collections = knowledge_collections_input("new_crew_knowledge")
+            
             col1, col2 = st.columns(2)
             with col1:
                 if st.form_submit_button("✅ Créer le crew", type="primary"):
@@ -791,7 +776,8 @@ with tab3:
                             crew_name = st.session_state.crew_config_manager.create_new_crew(
                                 name=new_crew_name,
                                 description=new_crew_description,
-                                selected_agents=selected_agents
+                                selected_agents=selected_agents,
+                                knowledge_collections=new_crew_knowledge_collections
                             )
                             st.success(f"Crew '{crew_name}' créé avec succès !")
                             st.session_state.show_new_crew_form = False
@@ -843,6 +829,8 @@ with tab3:
                             st.write(f"**Description :** {crew_config.description}")
                             st.write(f"**Agents :** {', '.join(crew_config.selected_agents)}")
                             st.write(f"**Type de processus :** {crew_config.process_type}")
+                            crew_knowledge = crew_config.knowledge_collections
+                            st.write(f"**Connaissances :** {'Tous les PDFs' if crew_knowledge is None else (', '.join(crew_knowledge) or 'Aucun PDF')}")
                             st.info("💡 Le Meta Manager créera automatiquement les tâches selon votre problématique")
                         
                         # Boutons d'action
@@ -884,16 +872,24 @@ with tab3:
                         st.warning("Aucun agent disponible.")
                         edit_selected_agents = []
                     
+                    edit_crew_knowledge_collections = knowledge_collections_input(
+                        f"edit_crew_knowledge_{crew_name}", crew_config.knowledge_collections
+                    )
+                    
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         if st.form_submit_button("💾 Sauvegarder", type="primary"):
                             if edit_crew_name and edit_selected_agents:
-                                # Mettre à jour la configuration
-                                crew_config.name = edit_crew_name
-                                crew_config.description = edit_crew_description
-                                crew_config.selected_agents = edit_selected_agents
+                                # Nouvelle version de la configuration (l'objet partagé n'est pas modifié en place)
+                                updated_crew = replace(
+                                    crew_config,
+                                    name=edit_crew_name,
+                                    description=edit_crew_description,
+                                    selected_agents=edit_selected_agents,
+                                    knowledge_collections=edit_crew_knowledge_collections
+                                )
                                 
-                                st.session_state.crew_config_manager.update_crew_config(crew_name, crew_config)
+                                st.session_state.crew_config_manager.update_crew_config(crew_name, updated_crew)
                                 st.session_state[f"editing_crew_{crew_name}"] = False
                                 st.success(f"Crew '{edit_crew_name}' modifié avec succès !")
                                 st.rerun()
@@ -933,69 +929,58 @@ with tab4:
     if 'uploaded_pdfs' not in st.session_state:
         st.session_state.uploaded_pdfs = []
         
-        # Synchroniser avec les PDFs existants dans le dossier knowledge
-        knowledge_dir = "knowledge"
-        if os.path.exists(knowledge_dir):
-            existing_pdfs = []
-            for file in os.listdir(knowledge_dir):
-                if file.lower().endswith('.pdf'):
-                    existing_pdfs.append(os.path.join(knowledge_dir, file))
-            if existing_pdfs:
-                st.session_state.uploaded_pdfs = existing_pdfs
-                st.info(f"🔄 {len(existing_pdfs)} PDF(s) existant(s) détecté(s) dans le dossier knowledge/")
+        # Synchroniser avec les PDFs connus du manifeste d'ingestion
+        existing_pdfs = knowledge_ingestor.list_pdfs()
+        if existing_pdfs:
+            st.session_state.uploaded_pdfs = existing_pdfs
+            st.info(f"🔄 {len(existing_pdfs)} PDF(s) existant(s) détecté(s) dans le dossier knowledge/")
+    
+    # Uploads déjà traités dans cette session : un rerun Streamlit ne les relit pas
+    if 'processed_uploads' not in st.session_state:
+        st.session_state.processed_uploads = {}
     
     if uploaded_files:
-        # Sauvegarder les fichiers directement dans le dossier knowledge
-        import os
-        import shutil
-        
-        # Créer le dossier knowledge s'il n'existe pas
-        knowledge_dir = "knowledge"
-        os.makedirs(knowledge_dir, exist_ok=True)
-        
-        pdf_paths = []
+        upload_results = []
         for uploaded_file in uploaded_files:
-            # Sauvegarder directement dans le dossier knowledge avec le nom original
-            knowledge_file_path = os.path.join(knowledge_dir, uploaded_file.name)
-            try:
-                # Écrire le contenu du fichier uploadé directement dans knowledge/
-                with open(knowledge_file_path, 'wb') as f:
-                    f.write(uploaded_file.getvalue())
-                pdf_paths.append(knowledge_file_path)
-                print(f"📁 PDF sauvegardé dans knowledge/: {uploaded_file.name}")
-            except Exception as e:
-                print(f"⚠️ Erreur lors de la sauvegarde dans knowledge/: {e}")
+            upload_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            result = st.session_state.processed_uploads.get(upload_key)
+            if result is None:
+                try:
+                    # Écriture par blocs dans le stockage adressé par le contenu, puis lien dans knowledge/
+                    result = knowledge_ingestor.add_upload(uploaded_file, uploaded_file.name)
+                    st.session_state.processed_uploads[upload_key] = result
+                except Exception as e:
+                    print(f"⚠️ Erreur lors de la sauvegarde dans knowledge/: {e}")
+                    st.error(f"❌ {uploaded_file.name} : {e}")
+                    continue
+            upload_results.append(result)
         
-        st.session_state.uploaded_pdfs = pdf_paths
+        st.session_state.uploaded_pdfs = knowledge_ingestor.list_pdfs()
         
-        st.success(f"✅ {len(uploaded_files)} PDF(s) uploadé(s) et prêt(s) pour les agents!")
+        added = [result for result in upload_results if result.status != "duplicate"]
+        duplicates = [result for result in upload_results if result.status == "duplicate"]
+        if added:
+            st.success(f"✅ {len(added)} PDF(s) ajouté(s) et en cours d'indexation pour les agents !")
+        if duplicates:
+            st.info(f"♻️ {len(duplicates)} PDF(s) déjà présent(s) : ni copié(s), ni ré-indexé(s)")
         
         # Afficher la liste des PDFs
-        st.write("**PDFs disponibles pour les agents :**")
-        for i, file in enumerate(uploaded_files):
-            st.write(f"📄 {file.name}")
-        
-        # Afficher les chemins pour debug
-        st.write("**Chemins des fichiers :**")
-        for i, path in enumerate(pdf_paths):
-            st.code(f"Fichier {i+1}: {path}")
+        st.write("**PDFs uploadés :**")
+        status_labels = {"added": "ajouté", "renamed": "ajouté sous un autre nom (nom déjà utilisé)", "duplicate": "contenu déjà présent"}
+        for result in upload_results:
+            st.write(f"📄 {result.filename} → `{os.path.basename(result.path)}` ({status_labels[result.status]})")
     
     # Boutons de test et gestion
     col1, col2, col3 = st.columns(3)
     
     with col1:
         if st.button("🔄 Actualiser la détection"):
-            # Re-scanner le dossier knowledge
-            knowledge_dir = "knowledge"
-            if os.path.exists(knowledge_dir):
-                existing_pdfs = []
-                for file in os.listdir(knowledge_dir):
-                    if file.lower().endswith('.pdf'):
-                        existing_pdfs.append(os.path.join(knowledge_dir, file))
-                st.session_state.uploaded_pdfs = existing_pdfs
-                st.success(f"🔄 {len(existing_pdfs)} PDF(s) détecté(s)")
+            # Synchronisation incrémentale : seuls les changements sont ré-indexés
+            changes = knowledge_ingestor.sync()
+            st.session_state.uploaded_pdfs = knowledge_ingestor.list_pdfs()
+            if st.session_state.uploaded_pdfs:
+                st.success(f"🔄 {len(st.session_state.uploaded_pdfs)} PDF(s) détecté(s) - {len(changes['added'])} ajouté(s), {len(changes['modified'])} modifié(s), {len(changes['removed'])} supprimé(s)")
             else:
-                st.session_state.uploaded_pdfs = []
                 st.info("📁 Dossier knowledge vide ou inexistant")
             st.rerun()
     
@@ -1013,16 +998,9 @@ with tab4:
     with col3:
         if st.session_state.uploaded_pdfs:
             if st.button("🗑️ Vider tous les PDFs"):
-                # Supprimer les fichiers du dossier knowledge
-                knowledge_dir = "knowledge"
-                if os.path.exists(knowledge_dir):
-                    import shutil
-                    try:
-                        shutil.rmtree(knowledge_dir)
-                        os.makedirs(knowledge_dir, exist_ok=True)  # Recréer le dossier vide
-                        st.write("📁 Dossier knowledge vidé")
-                    except Exception as e:
-                        st.error(f"Erreur lors de la suppression: {e}")
+                # Supprimer les PDFs du dossier knowledge et leurs vecteurs de l'index
+                removed = knowledge_ingestor.clear()
+                st.write(f"📁 {removed} PDF(s) supprimé(s) du dossier knowledge")
                 
                 st.session_state.uploaded_pdfs = []
                 st.success("Tous les PDFs ont été supprimés!")
@@ -1031,7 +1009,7 @@ with tab4:
     st.info("""
     **Comment ça fonctionne :**
     
-    1. **Uploadez vos PDFs** : Les fichiers sont copiés dans le dossier `knowledge/`
+    1. **Uploadez vos PDFs** : Les fichiers sont ajoutés au dossier `knowledge/` (un contenu déjà présent n'est jamais dupliqué)
     2. **Sources de connaissances** : Les agents accèdent aux PDFs via `PDFKnowledgeSource`
     3. **Recherche automatique** : Les agents peuvent chercher dans le contenu des PDFs
     4. **Enrichissement** : Les réponses des agents sont enrichies avec vos données PDF
@@ -1049,13 +1027,21 @@ with tab4:
     
     if os.path.exists(knowledge_dir):
         st.write("✅ Le dossier knowledge existe")
-        knowledge_files = os.listdir(knowledge_dir)
-        if knowledge_files:
-            st.write(f"📄 {len(knowledge_files)} fichier(s) trouvé(s) :")
-            for file in knowledge_files:
-                file_path = os.path.join(knowledge_dir, file)
-                file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                st.write(f"   - {file} ({file_size} bytes)")
+        knowledge_entries = knowledge_ingestor.get_entries()
+        if knowledge_entries:
+            st.write(f"📄 {len(knowledge_entries)} fichier(s) trouvé(s) :")
+            status_labels = {"pending": "⏳ indexation en cours", "indexed": "✅ indexé", "error": "❌ erreur"}
+            for entry in knowledge_entries:
+                col_file, col_delete = st.columns([4, 1])
+                with col_file:
+                    st.write(f"   - {os.path.basename(entry.path)} ({entry.size} bytes) - {status_labels.get(entry.status, entry.status)}")
+                    if entry.error:
+                        st.caption(entry.error)
+                with col_delete:
+                    if st.button("🗑️", key=f"delete_pdf_{entry.path}"):
+                        knowledge_ingestor.remove_pdf(entry.path)
+                        st.session_state.uploaded_pdfs = knowledge_ingestor.list_pdfs()
+                        st.rerun()
         else:
             st.write("⚠️ Le dossier knowledge est vide")
     else:
@@ -1111,11 +1097,25 @@ with tab5:
                 st.error(f"Erreur lors de l'import: {e}")
 
     with col3:
-        if st.button("🔄 Réinitialiser tout", type="secondary"):
-            st.session_state.config_manager = AgentConfigManager()
-            st.session_state.crew_config_manager = CrewConfigManager(st.session_state.config_manager)
-            st.success("Configuration réinitialisée!")
-            st.rerun()
+        # La configuration est partagée : la réinitialisation concerne toutes les sessions et tous les processus
+        if st.button("🔄 Réinitialiser tout", type="secondary",
+                     help="Remplace les agents et crews de tous les utilisateurs par la configuration par défaut"):
+            st.session_state.confirm_reset_all = True
+        
+        if st.session_state.get("confirm_reset_all"):
+            st.warning("⚠️ La réinitialisation est globale : les agents et crews de tous les utilisateurs seront remplacés par la configuration par défaut.")
+            col_confirm, col_cancel = st.columns(2)
+            with col_confirm:
+                if st.button("✅ Confirmer", type="primary", key="confirm_reset_all_button"):
+                    st.session_state.config_manager.reset_to_defaults()
+                    st.session_state.crew_config_manager.reset_to_defaults()
+                    st.session_state.confirm_reset_all = False
+                    st.success("Configuration réinitialisée!")
+                    st.rerun()
+            with col_cancel:
+                if st.button("❌ Annuler", key="cancel_reset_all_button"):
+                    st.session_state.confirm_reset_all = False
+                    st.rerun()
     
     st.markdown("---")
     
@@ -1124,6 +1124,23 @@ with tab5:
     
     available_tools = get_available_tools()
     
+    registry_stats = get_tool_registry().get_stats()
+    st.caption(f"♻️ Registre d'outils : {registry_stats['entries']} outil(s) en cache - {registry_stats['hits']} hit(s) / {registry_stats['misses']} miss(es)")
+    web_cache_stats = get_web_cache().get_stats()
+    web_cache_rates = ", ".join(
+        f"{name} {counters['hit_rate']:.0%}" for name, counters in web_cache_stats["tools"].items()
+    )
+    st.caption(
+        f"🌐 Cache web : {web_cache_stats['entries']} entrée(s), {web_cache_stats['bytes'] / (1024 * 1024):.1f} Mo"
+        + (f" - taux de succès : {web_cache_rates}" if web_cache_rates else "")
+    )
+    for bucket, metrics in get_llm_governor().get_metrics().items():
+        st.caption(
+            f"🚦 LLM {bucket.split(':', 1)[1]} : {metrics['granted']} appel(s), {metrics['queue_depth']} en attente "
+            f"(max {metrics['max_queue_depth']}), attente moyenne {metrics['avg_wait_seconds']:.1f}s "
+            f"(max {metrics['max_wait_seconds']:.1f}s), {metrics['rate_limited']} erreur(s) 429"
+        )
+    
     st.write("**Outils disponibles dans le système:**")
     
     for tool_name, tool_info in available_tools.items():
@@ -1133,6 +1150,8 @@ with tab5:
             
             if tool_name == "serper_search":
                 st.info("💡 Pour activer Serper, ajoutez SERPER_API_KEY dans la sidebar ou .env")
+            elif tool_name == "batch_web_research":
+                st.info("💡 Les recherches nécessitent SERPER_API_KEY ; la lecture d'URLs fonctionne sans clé")
             elif tool_name in ["website_search", "scrape_website"]:
                 st.info("💡 Ces outils sont toujours disponibles")
             elif tool_name in ["pdf_search", "rag_tool"]:
@@ -1159,47 +1178,63 @@ with tab6:
     # Section pour afficher les outputs de la dernière campagne
     st.markdown("### 🎯 Dernière campagne exécutée")
     
-    if st.session_state.last_campaign_result:
+    # Enregistrement structuré de l'exécution : une entrée par tâche, sans re-découper le texte final
+    last_run_id = st.session_state.get('last_campaign_run_id')
+    last_run = get_run_store().load_run(last_run_id) if last_run_id else None
+    
+    if last_run is not None:
         st.success("✅ Dernière campagne disponible")
         
-        # Parser le résultat pour extraire les outputs par agent
-        result_str = str(st.session_state.last_campaign_result)
-        
-        # Diviser le résultat en sections par agent
+        task_records = last_run.ordered_tasks()
         agent_sections = {}
-        current_agent = None
-        current_content = []
-        
-        lines = result_str.split('\n')
-        for line in lines:
-            line = line.strip()
-            
-            # Détecter les sections d'agents
-            if any(agent_name in line.lower() for agent_name in ['clara', 'julien', 'sophie', 'meta manager', 'meta agent']):
-                # Sauvegarder le contenu précédent
-                if current_agent and current_content:
-                    agent_sections[current_agent] = '\n'.join(current_content)
-                
-                # Nouvelle section d'agent
-                current_agent = line
-                current_content = [line]
-            elif current_agent and line:
-                current_content.append(line)
-        
-        # Sauvegarder la dernière section
-        if current_agent and current_content:
-            agent_sections[current_agent] = '\n'.join(current_content)
+        if last_run.meta_result:
+            agent_sections["🧠 Meta Manager"] = (last_run.meta_result, None)
+        for record in task_records:
+            agent_sections[f"{record.index + 1}. {record.agent}"] = (record.raw, record)
         
         # Afficher les outputs par agent
         if agent_sections:
             st.markdown("### 📋 Outputs par agent")
             
+            total_duration = sum(record.duration_seconds or 0 for record in task_records)
+            total_tokens = sum((record.tokens_in or 0) + (record.tokens_out or 0) for record in task_records)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Tâches terminées", f"{len(task_records)}/{len(last_run.order) or len(task_records)}")
+            with col2:
+                st.metric("Durée des tâches", f"{total_duration:.0f} s")
+            with col3:
+                st.metric("Tokens consommés", f"{total_tokens:,}")
+            
+            # Latence et coût par modèle, résumés une fois à la fin de la campagne
+            model_summary = last_run.model_summary
+            if model_summary:
+                with st.expander("🧠 Latence et coût par modèle", expanded=False):
+                    st.dataframe(pd.DataFrame([
+                        {
+                            "Modèle": model,
+                            "Appels": entry["calls"],
+                            "Latence moyenne (s)": round(entry["avg_latency"], 2),
+                            "Latence max (s)": round(entry["max_latency"], 2),
+                            "Tokens entrée": entry["tokens_in"],
+                            "Tokens sortie": entry["tokens_out"],
+                            "Coût ($)": round(entry["cost"], 4) if entry["priced_calls"] else None,
+                            "Erreurs": entry["errors"],
+                        }
+                        for model, entry in model_summary.items()
+                    ]), hide_index=True, use_container_width=True)
+            
             # Créer des onglets pour chaque agent
             agent_tabs = st.tabs(list(agent_sections.keys()))
             
-            for i, (agent_name, content) in enumerate(agent_sections.items()):
+            for i, (agent_name, (content, record)) in enumerate(agent_sections.items()):
                 with agent_tabs[i]:
                     st.markdown(f"#### 🤖 {agent_name}")
+                    if record is not None:
+                        details = [f"⏱️ {record.duration_seconds:.1f} s" if record.duration_seconds is not None else "",
+                                   f"🔢 {record.tokens_in or 0:,} → {record.tokens_out or 0:,} tokens" if record.tokens_in is not None else ""]
+                        if any(details):
+                            st.caption(" • ".join(detail for detail in details if detail))
                     
                     # Afficher le contenu avec formatage
                     st.markdown(content)
@@ -1208,21 +1243,21 @@ with tab6:
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
-                        if st.button(f"📋 Copier output {agent_name}", key=f"copy_{agent_name}"):
+                        if st.button(f"📋 Copier output {agent_name}", key=f"copy_{i}"):
                             st.code(content, language="text")
                             st.success("Output affiché ci-dessus - vous pouvez le copier !")
                     
                     with col2:
-                        if st.button(f"📥 Télécharger {agent_name}", key=f"download_{agent_name}"):
-                            st.download_button(
-                                label=f"Télécharger output {agent_name}",
-                                data=content,
-                                file_name=f"output_{agent_name.lower().replace(' ', '_')}.txt",
-                                mime="text/plain"
-                            )
+                        st.download_button(
+                            label=f"📥 Télécharger {agent_name}",
+                            data=content,
+                            file_name=f"output_{re.sub(r'[^a-z0-9]+', '_', agent_name.lower()).strip('_')}.txt",
+                            mime="text/plain",
+                            key=f"download_{i}"
+                        )
                     
                     with col3:
-                        if st.button(f"💾 Sauvegarder {agent_name}", key=f"save_{agent_name}"):
+                        if st.button(f"💾 Sauvegarder {agent_name}", key=f"save_{i}"):
                             st.session_state.agent_outputs[agent_name] = content
                             st.success(f"Output de {agent_name} sauvegardé !")
         
@@ -1278,30 +1313,6 @@ with tab6:
         with col3:
             avg_chars = total_chars // len(st.session_state.agent_outputs) if st.session_state.agent_outputs else 0
             st.metric("Moyenne par agent", f"{avg_chars:,}")
-        
-        # Recherche dans les outputs
-        st.markdown("#### 🔍 Recherche dans les outputs")
-        search_term = st.text_input("Rechercher un terme dans les outputs", placeholder="Ex: LinkedIn, stratégie, RSE...")
-        
-        if search_term:
-            matching_agents = []
-            for agent_name, content in st.session_state.agent_outputs.items():
-                if search_term.lower() in content.lower():
-                    matching_agents.append((agent_name, content))
-            
-            if matching_agents:
-                st.success(f"✅ {len(matching_agents)} agent(s) trouvé(s) avec le terme '{search_term}'")
-                
-                for agent_name, content in matching_agents:
-                    with st.expander(f"🤖 {agent_name} - Résultats pour '{search_term}'", expanded=False):
-                        # Mettre en évidence le terme recherché
-                        highlighted_content = content.replace(
-                            search_term, 
-                            f"**{search_term}**"
-                        )
-                        st.markdown(highlighted_content)
-            else:
-                st.warning(f"❌ Aucun agent trouvé avec le terme '{search_term}'")
     
     # Section pour exporter tous les outputs
     st.markdown("---")
@@ -1345,4 +1356,83 @@ with tab6:
                     mime="application/json"
                 )
     else:
-        st.info("💡 Aucun output sauvegardé. Sauvegardez des outputs d'agents pour pouvoir les exporter.")
\ No newline at end of file
+        st.info("💡 Aucun output sauvegardé. Sauvegardez des outputs d'agents pour pouvoir les exporter.")
+    
+    # Historique persistant de toutes les campagnes (SQLite + index plein texte)
+    st.markdown("---")
+    st.markdown("### 🗂️ Historique des campagnes")
+    
+    history_store = get_history_store()
+    HISTORY_PAGE_SIZE = 10
+    
+    # Recherche dans les outputs de toutes les campagnes, classée par pertinence
+    st.markdown("#### 🔍 Recherche dans les outputs")
+    search_term = st.text_input("Rechercher un terme dans les outputs", placeholder="Ex: LinkedIn, stratégie, RSE...")
+    
+    if search_term:
+        total_matches = history_store.count_search(search_term)
+        if total_matches:
+            search_pages = (total_matches - 1) // HISTORY_PAGE_SIZE + 1
+            search_page = st.number_input("Page des résultats", min_value=1, max_value=search_pages, value=1,
+                                          key="history_search_page") if search_pages > 1 else 1
+            st.success(f"✅ {total_matches} output(s) trouvé(s) avec le terme '{search_term}'")
+            
+            for match in history_store.search(search_term, limit=HISTORY_PAGE_SIZE, offset=(search_page - 1) * HISTORY_PAGE_SIZE):
+                st.markdown(f"**🤖 {match['agent']}** • {match['problem_statement'][:80]}")
+                st.caption(f"{match['run_id']} • {pd.Timestamp.fromtimestamp(match['created_at']):%d/%m/%Y %H:%M}")
+                st.markdown(f"> {match['snippet']}")
+        else:
+            st.warning(f"❌ Aucun output trouvé avec le terme '{search_term}'")
+    
+    # Liste paginée des campagnes, avec sélection pour l'export en lot
+    st.markdown("#### 📚 Campagnes enregistrées")
+    total_runs = history_store.count_runs()
+    
+    if total_runs:
+        history_pages = (total_runs - 1) // HISTORY_PAGE_SIZE + 1
+        history_page = st.number_input("Page", min_value=1, max_value=history_pages, value=1,
+                                       key="history_page") if history_pages > 1 else 1
+        st.caption(f"{total_runs} campagne(s) • page {history_page}/{history_pages}")
+        
+        selected_run_ids = []
+        for run in history_store.list_runs(limit=HISTORY_PAGE_SIZE, offset=(history_page - 1) * HISTORY_PAGE_SIZE):
+            col1, col2 = st.columns([1, 12])
+            with col1:
+                if st.checkbox("Sélectionner", key=f"history_select_{run['run_id']}", label_visibility="collapsed"):
+                    selected_run_ids.append(run['run_id'])
+            with col2:
+                status_icon = "✅" if run['status'] == "completed" else "⚠️"
+                with st.expander(f"{status_icon} {run['problem_statement'][:80]} • {run['outputs']} output(s)", expanded=False):
+                    st.caption(f"{run['run_id']} • {pd.Timestamp.fromtimestamp(run['created_at']):%d/%m/%Y %H:%M} • {run['tokens']:,} tokens")
+                    # Le corps d'un expander s'exécute même replié : les outputs ne sont lus qu'à la demande
+                    if st.checkbox("📄 Afficher les outputs", key=f"history_open_{run['run_id']}"):
+                        for output in history_store.get_outputs(run['run_id']):
+                            st.markdown(f"**🤖 {output['agent']}**")
+                            st.markdown(output['content'])
+        
+        if selected_run_ids:
+            exported_runs = history_store.export_runs(selected_run_ids)
+            export_lines = []
+            for run in exported_runs:
+                export_lines.append(f"# {run['problem_statement']}\n")
+                export_lines.append(f"_{run['run_id']} • {run['status']}_\n")
+                for output in run['outputs']:
+                    export_lines.append(f"## {output['agent']}\n\n{output['content']}\n")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label=f"📥 Exporter {len(selected_run_ids)} campagne(s) en Markdown",
+                    data="\n".join(export_lines),
+                    file_name="historique_campagnes.md",
+                    mime="text/markdown"
+                )
+            with col2:
+                st.download_button(
+                    label=f"📊 Exporter {len(selected_run_ids)} campagne(s) en JSON",
+                    data=json.dumps(exported_runs, indent=2, ensure_ascii=False),
+                    file_name="historique_campagnes.json",
+                    mime="application/json"
+                )
+    else:
+        st.info("💡 Aucune campagne dans l'historique. Les campagnes terminées y sont enregistrées automatiquement.")